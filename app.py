@@ -54,5 +54,8 @@ class AutomationApp(ctk.CTk):
         self.current_screen.pack(fill="both", expand=True)
 
 if __name__ == "__main__":
+    # Worker processes re-launch the frozen app; this hands them to multiprocessing
+    import multiprocessing
+    multiprocessing.freeze_support()
     app = AutomationApp()
     app.mainloop()
\ No newline at end of file
@@ -5,7 +5,24 @@ Handles dependent dropdowns with sentinel monitoring
 """
 import customtkinter as ctk
 from tkinter import filedialog
+from screens.virtual_list import VirtualListBox
 from utils.google_sheets import sheets_manager
+from utils.cancellation import CancellationToken, OperationCancelled
+from utils.report_runner import ComponentReportRunner
+from utils.replica_run import ReplicaRun, MAX_REPLICAS
+from utils.process_workers import ProcessCoordinator
+from utils.job_service import ensure_service
+from utils.dropdown_sweep import DropdownSweep, parse_level_cells
+from utils.run_planner import plan_job, format_plan
+from utils.component_order import ORDER_AUTO, ORDER_LABELS
+from utils.post_process import POST_STEPS
+from utils.run_history import run_history, format_report
+from utils.change_precheck import precheck, remember
+from utils.delta_run import apply_delta
+from utils.sentinel_calibration import SentinelCalibration
+from utils.async_sheets import async_bridge
+from utils.sheet_watcher import SheetWatcher
+from utils.retry_policy import FAILURE_LABELS
 from utils.config import DOWNLOADS_DIR
 import os
 from datetime import datetime
@@ -17,11 +34,13 @@ class ComponentReportScreen(ctk.CTkFrame):
         super().__init__(parent)
         self.on_back = on_back
         self.is_running = False
+        self.cancel_token = None
         self.component_dropdown_cell = "B6"
         self.menu_display_cell = "B3"
         self.component_values = []
         self.current_menu_value = None
         self.failed_components = []  # Track failed components
+        self.sheet_watcher = None
         
         # Header
         header = ctk.CTkFrame(self, height=60)
@@ -86,7 +105,7 @@ class ComponentReportScreen(ctk.CTkFrame):
         
         ctk.CTkLabel(
             refresh_frame,
-            text="If you changed B3 in Google Sheets, click refresh:",
+            text="B3 changes in Google Sheets load automatically. To reload everything:",
             anchor="w",
             text_color="gray"
         ).pack(side="left", expand=True)
@@ -101,6 +120,22 @@ class ComponentReportScreen(ctk.CTkFrame):
         )
         self.refresh_btn.pack(side="right")
         
+        sweep_frame = ctk.CTkFrame(menu_frame, fg_color="transparent")
+        sweep_frame.pack(fill="x", pady=(10, 0))
+        
+        self.sweep_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            sweep_frame,
+            text="Sweep all menus (export every B3 value)",
+            variable=self.sweep_var,
+            command=self.on_sweep_toggle
+        ).pack(side="left")
+        
+        self.levels_entry = ctk.CTkEntry(sweep_frame, placeholder_text="B3, B6", width=160, height=30)
+        self.levels_entry.insert(0, f"{self.menu_display_cell}, {self.component_dropdown_cell}")
+        self.levels_entry.pack(side="right")
+        ctk.CTkLabel(sweep_frame, text="Dropdown cells (top → component):", text_color="gray").pack(side="right", padx=(0, 5))
+        
         # COMPONENT PREVIEW
         self.create_section_header("STEP 3: COMPONENT LIST (B6)")
         
@@ -110,7 +145,7 @@ class ComponentReportScreen(ctk.CTkFrame):
         self.component_preview_label = ctk.CTkLabel(component_frame, text="", anchor="w", text_color="gray")
         self.component_preview_label.pack(anchor="w", pady=(0, 10))
         
-        self.component_preview_box = ctk.CTkTextbox(component_frame, height=120)
+        self.component_preview_box = VirtualListBox(component_frame, height=120)
         self.component_preview_box.pack(fill="x")
         
         # DATA RANGE SETTINGS
@@ -161,9 +196,20 @@ class ComponentReportScreen(ctk.CTkFrame):
         sentinel_frame = ctk.CTkFrame(row2, fg_color="transparent")
         sentinel_frame.pack(side="left", fill="x", expand=True, padx=(5, 0))
         ctk.CTkLabel(sentinel_frame, text="Sentinel Range (change detection):", anchor="w").pack(anchor="w")
-        self.sentinel_entry = ctk.CTkEntry(sentinel_frame, placeholder_text="B9:B17", height=35)
+        sentinel_input_frame = ctk.CTkFrame(sentinel_frame, fg_color="transparent")
+        sentinel_input_frame.pack(fill="x", pady=(5, 0))
+        self.sentinel_entry = ctk.CTkEntry(sentinel_input_frame, placeholder_text="B9:B17", height=35)
         self.sentinel_entry.insert(0, "B9:B17")
-        self.sentinel_entry.pack(fill="x", pady=(5, 0))
+        self.sentinel_entry.pack(side="left", fill="x", expand=True)
+        self.calibrate_btn = ctk.CTkButton(
+            sentinel_input_frame,
+            text="Auto",
+            command=self.calibrate_sentinel,
+            width=50,
+            height=35,
+            state="disabled"
+        )
+        self.calibrate_btn.pack(side="right", padx=(5, 0))
         
         timeout_frame = ctk.CTkFrame(row2, fg_color="transparent")
         timeout_frame.pack(side="left", fill="x", expand=True, padx=(5, 0))
@@ -193,9 +239,11 @@ class ComponentReportScreen(ctk.CTkFrame):
         format_frame = ctk.CTkFrame(self.scrollable, fg_color="transparent")
         format_frame.pack(fill="x", pady=10)
         
-        ctk.CTkLabel(format_frame, text="File Format:", anchor="w").pack(anchor="w", pady=(0, 5))
-        self.format_dropdown = ctk.CTkComboBox(format_frame, values=["PDF", "Excel (XLSX)", "CSV"], height=35)
-        self.format_dropdown.pack(fill="x")
+        ctk.CTkLabel(format_frame, text="File Formats (the range is read once for all of them):", anchor="w").pack(anchor="w", pady=(0, 5))
+        self.format_vars = {}
+        for file_format in ["PDF", "Excel (XLSX)", "CSV", "JSON Lines", "Formatted Excel (XLSX)", "HTML (printable)"]:
+            self.format_vars[file_format] = ctk.BooleanVar(value=(file_format == "PDF"))
+            ctk.CTkCheckBox(format_frame, text=file_format, variable=self.format_vars[file_format]).pack(anchor="w", pady=2)
         
         naming_frame = ctk.CTkFrame(self.scrollable, fg_color="transparent")
         naming_frame.pack(fill="x", pady=10)
@@ -207,18 +255,129 @@ class ComponentReportScreen(ctk.CTkFrame):
         ctk.CTkRadioButton(naming_frame, text="Sequential numbering", variable=self.naming_var, value="sequential").pack(anchor="w", pady=2)
         ctk.CTkRadioButton(naming_frame, text="Timestamp", variable=self.naming_var, value="timestamp").pack(anchor="w", pady=2)
         
+        output_frame = ctk.CTkFrame(self.scrollable, fg_color="transparent")
+        output_frame.pack(fill="x", pady=10)
+        
+        ctk.CTkLabel(output_frame, text="Output:", anchor="w").pack(anchor="w", pady=(0, 10))
+        
+        self.output_var = ctk.StringVar(value="files")
+        ctk.CTkRadioButton(output_frame, text="Separate files", variable=self.output_var, value="files").pack(anchor="w", pady=2)
+        ctk.CTkRadioButton(output_frame, text="One ZIP archive (with manifest)", variable=self.output_var, value="zip").pack(anchor="w", pady=2)
+        ctk.CTkRadioButton(output_frame, text="One tar.gz archive (with manifest)", variable=self.output_var, value="tar.gz").pack(anchor="w", pady=2)
+        
+        post_frame = ctk.CTkFrame(self.scrollable, fg_color="transparent")
+        post_frame.pack(fill="x", pady=10)
+        
+        ctk.CTkLabel(post_frame, text="Post-processing (runs on other CPU cores as each file is saved):", anchor="w").pack(anchor="w", pady=(0, 5))
+        self.post_vars = {}
+        for step, (_, label) in POST_STEPS.items():
+            self.post_vars[step] = ctk.BooleanVar(value=False)
+            ctk.CTkCheckBox(post_frame, text=label, variable=self.post_vars[step]).pack(anchor="w", pady=2)
+        
+        order_frame = ctk.CTkFrame(self.scrollable, fg_color="transparent")
+        order_frame.pack(fill="x", pady=10)
+        
+        ctk.CTkLabel(order_frame, text="Processing Order:", anchor="w").pack(anchor="w", pady=(0, 10))
+        
+        self.order_var = ctk.StringVar(value=ORDER_AUTO)
+        for policy, label in ORDER_LABELS.items():
+            ctk.CTkRadioButton(order_frame, text=label, variable=self.order_var, value=policy).pack(anchor="w", pady=2)
+        ctk.CTkLabel(
+            order_frame,
+            text="Automatic runs the slowest components first with spreadsheet copies (predicted from past runs)",
+            anchor="w",
+            text_color="gray"
+        ).pack(anchor="w", pady=(5, 0))
+        
         # EXECUTION
         self.create_section_header("STEP 6: START AUTOMATION")
         
-        self.start_btn = ctk.CTkButton(
+        replicas_frame = ctk.CTkFrame(self.scrollable, fg_color="transparent")
+        replicas_frame.pack(fill="x", pady=(10, 0))
+        ctk.CTkLabel(
+            replicas_frame,
+            text=f"Spreadsheet copies (parallel workers, 1 = off, max {MAX_REPLICAS}):",
+            anchor="w"
+        ).pack(side="left")
+        self.replicas_entry = ctk.CTkEntry(replicas_frame, width=60, height=30)
+        self.replicas_entry.insert(0, "1")
+        self.replicas_entry.pack(side="left", padx=(10, 0))
+        
+        self.adaptive_concurrency_var = ctk.BooleanVar(value=True)
+        ctk.CTkCheckBox(
+            self.scrollable,
+            text="Adapt the number of busy copies to throttling and recalculation speed",
+            variable=self.adaptive_concurrency_var
+        ).pack(anchor="w", pady=(10, 0))
+        
+        self.worker_processes_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
             self.scrollable,
+            text="Run each copy in its own worker process (uses several CPU cores)",
+            variable=self.worker_processes_var
+        ).pack(anchor="w", pady=(10, 0))
+        
+        self.skip_unchanged_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            self.scrollable,
+            text="Skip the run if the spreadsheet is unchanged since the last successful run",
+            variable=self.skip_unchanged_var
+        ).pack(anchor="w", pady=(10, 0))
+        
+        self.delta_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            self.scrollable,
+            text="Delta run: export only components added since the last run of this menu (removed ones are archived)",
+            variable=self.delta_var
+        ).pack(anchor="w", pady=(10, 0))
+        
+        run_buttons = ctk.CTkFrame(self.scrollable, fg_color="transparent")
+        run_buttons.pack(pady=20, fill="x")
+        
+        self.start_btn = ctk.CTkButton(
+            run_buttons,
             text="Start Automation",
             command=self.start_automation,
             height=50,
             font=("Arial", 16, "bold"),
             state="disabled"
         )
-        self.start_btn.pack(pady=20, fill="x")
+        self.start_btn.pack(side="left", fill="x", expand=True)
+        
+        self.stop_btn = ctk.CTkButton(
+            run_buttons,
+            text="Stop",
+            command=self.stop_automation,
+            width=100,
+            height=50,
+            font=("Arial", 16, "bold"),
+            fg_color="#f56c6c",
+            hover_color="#c45656",
+            state="disabled"
+        )
+        self.stop_btn.pack(side="right", padx=(10, 0))
+        
+        self.plan_btn = ctk.CTkButton(
+            run_buttons,
+            text="Plan Run",
+            command=self.plan_run,
+            width=110,
+            height=50,
+            font=("Arial", 14, "bold"),
+            state="disabled"
+        )
+        self.plan_btn.pack(side="right", padx=(10, 0))
+        
+        self.queue_btn = ctk.CTkButton(
+            run_buttons,
+            text="Queue",
+            command=self.queue_job,
+            width=90,
+            height=50,
+            font=("Arial", 14, "bold"),
+            state="disabled"
+        )
+        self.queue_btn.pack(side="right", padx=(10, 0))
         
         self.progress_label = ctk.CTkLabel(self.scrollable, text="Progress: 0/0 (0%)", anchor="w")
         self.progress_label.pack(anchor="w", pady=(10, 5))
@@ -233,6 +392,15 @@ class ComponentReportScreen(ctk.CTkFrame):
         # LOG
         self.create_section_header("LOG")
         
+        self.history_btn = ctk.CTkButton(
+            self.scrollable,
+            text="Run History Report",
+            command=self.show_history_report,
+            width=160,
+            height=30
+        )
+        self.history_btn.pack(anchor="w")
+        
         self.log_text = ctk.CTkTextbox(self.scrollable, height=150)
         self.log_text.pack(fill="x", pady=10)
         self.log_text.configure(state="disabled")
@@ -255,6 +423,8 @@ WORKFLOW:
    - Auto-select 'Extra Component Report' sheet (if exists)
    - Display your current B3 menu selection
    - Load all B6 component values
+   - Keep watching B3 and the B6 list: when you change B3 in the browser,
+     the menu and component list update by themselves (paused during runs)
 4. Review the component list
 5. Configure data range settings (defaults usually work)
 6. Click 'Start Automation'
@@ -262,13 +432,32 @@ WORKFLOW:
    - Sets B6 to value
    - Waits for sheet to update (monitors B9:B17)
    - Scans backwards from max row to find data end
-   - Exports selected range as PDF/Excel/CSV
+   - Exports selected range in every selected format (PDF/Excel/CSV/JSON Lines)
+   - Formatted Excel and HTML are rendered locally from the sheet's formatting
+     (no PDF export endpoint, so they are not held up by its rate limit)
    - Moves to next value
 
 TIPS:
-- Sentinel Range monitors cells for changes (B9:B17 catches most updates)
+- Sentinel Range monitors cells for changes (B9:B17 catches most updates);
+  'Auto' samples a few components and picks the smallest range that always changes
 - Max Row should be set to your table's maximum possible row
 - System scans backwards to find actual data end
+- Sweep mode walks every B3 menu (and any extra dropdown levels, e.g. B3, B4, B6)
+  and saves each menu into its own subfolder - no need to set B3 by hand
+- Delta run compares the B6 list with the last run of the same menu: only new
+  components (or ones whose files are missing) are exported, files of removed
+  components are moved into a _removed folder, everything else is left alone
+- Archive output writes every file into one ZIP / tar.gz with a manifest.json
+  (names, SHA-256 checksums, timings); a stopped run still leaves a readable archive
+- Spreadsheet copies > 1 runs that many temporary Drive copies side by side, each
+  recalculating its own share of the components; the copies are always deleted
+  (copies left by a crash are deleted the next time you connect)
+- Worker processes run each copy in its own process, claiming components from a
+  shared work queue (work_queue.db); a crashed worker's components are picked up
+  by the others once its lease expires
+- Queue hands the job to the local job service (started here if none is running),
+  which runs queued and scheduled jobs one sheet at a time within a quota budget;
+  see utils/job_service.py for its HTTP API
         """
         self.log(help_text)
     
@@ -411,6 +600,38 @@ TIPS:
         """Load data from the selected sheet"""
         self.log(f"Loading data from '{sheet_name}'...")
         
+        if async_bridge.available and sheets_manager.spreadsheet_id:
+            self.load_sheet_data_async(sheet_name)
+            return
+        self.load_sheet_data_threaded(sheet_name)
+    
+    def load_sheet_data_async(self, sheet_name):
+        """Read B3 and the B6 dropdown concurrently on the async client (falls back to the threaded loader)"""
+        import asyncio
+        
+        self.update_loading_status("Loading Components", "Reading menu value and component dropdown...")
+        spreadsheet_id = sheets_manager.spreadsheet_id
+        
+        async def load(client):
+            return await asyncio.gather(
+                client.get_cell_value(spreadsheet_id, sheet_name, self.menu_display_cell),
+                client.read_dropdown(spreadsheet_id, sheet_name, self.component_dropdown_cell),
+            )
+        
+        def loaded(result):
+            menu_value, component_values = result
+            self.update_loading_status("Complete", f"Loaded {len(component_values)} components")
+            self.handle_loaded_data(menu_value, component_values)
+            self.hide_loading_overlay()
+        
+        def failed(error):
+            print(f"[DEBUG] Async load failed, using threaded loader: {error}")
+            self.load_sheet_data_threaded(sheet_name)
+        
+        async_bridge.deliver(self, async_bridge.submit(load), loaded, failed)
+    
+    def load_sheet_data_threaded(self, sheet_name):
+        """Load sheet data on a worker thread with the blocking client"""
         def load_thread():
             # Update status: Getting worksheet
             self.after(0, lambda: self.update_loading_status(
@@ -479,11 +700,14 @@ TIPS:
                 text_color="#2fa572"
             )
             
-            self.component_preview_box.delete("1.0", "end")
-            for i, comp in enumerate(component_values, 1):
-                self.component_preview_box.insert("end", f"{i}. {comp}\n")
+            self.component_preview_box.set_items(
+                [f"{i}. {comp}" for i, comp in enumerate(component_values, 1)]
+            )
             
             self.start_btn.configure(state="normal")
+            self.plan_btn.configure(state="normal")
+            self.queue_btn.configure(state="normal")
+            self.calibrate_btn.configure(state="normal")
             self.refresh_btn.configure(state="normal")
             self.log("Ready! Click 'Start Automation' when ready")
         else:
@@ -493,6 +717,64 @@ TIPS:
                 text_color="#f56c6c"
             )
             self.refresh_btn.configure(state="normal")
+        
+        self.watch_sheet(menu_value, component_values)
+    
+    def watch_sheet(self, menu_value, component_values):
+        """Start (or re-baseline) the background watcher on B3 and the B6 source range"""
+        if self.sheet_watcher and self.sheet_watcher.spreadsheet_id == sheets_manager.spreadsheet_id:
+            self.sheet_watcher.reset(menu_value, component_values)
+            return
+        if self.sheet_watcher:
+            self.sheet_watcher.stop()
+        
+        self.sheet_watcher = SheetWatcher(
+            "Extra Component Report",
+            self.menu_display_cell,
+            self.component_dropdown_cell,
+            on_change=lambda menu, components: self.after(0, lambda: self.apply_sheet_change(menu, components)),
+            is_busy=lambda: self.is_running,
+            log=self.log
+        )
+        self.sheet_watcher.start(menu_value, component_values)
+        # The screen is hidden (not destroyed) when going back: only poll while it is shown
+        self.bind("<Unmap>", lambda event: event.widget is self and self.sheet_watcher.pause())
+        self.bind("<Map>", lambda event: event.widget is self and self.sheet_watcher.resume())
+    
+    def apply_sheet_change(self, menu_value, component_values):
+        """Show a B3 / B6 list change picked up by the watcher"""
+        if self.is_running:
+            # A run started in the meantime: keep its list, report the change once the run is over
+            self.sheet_watcher.reset(self.current_menu_value, self.component_values)
+            return
+        
+        if menu_value != self.current_menu_value:
+            self.current_menu_value = menu_value
+            self.menu_display.configure(state="normal")
+            self.menu_display.delete(0, "end")
+            self.menu_display.insert(0, menu_value or "")
+            self.menu_display.configure(state="disabled")
+            self.log(f"B3 changed in Google Sheets: {menu_value or '(empty)'}")
+        
+        self.component_values = component_values
+        self.component_preview_box.set_items(
+            [f"{i}. {comp}" for i, comp in enumerate(component_values, 1)]
+        )
+        state = "normal" if component_values else "disabled"
+        for button in (self.start_btn, self.plan_btn, self.queue_btn, self.calibrate_btn):
+            button.configure(state=state)
+        if component_values:
+            self.component_preview_label.configure(
+                text=f"Found {len(component_values)} components to process",
+                text_color="#2fa572"
+            )
+            self.log(f"Component list updated: {len(component_values)} component(s) from B6")
+        else:
+            self.component_preview_label.configure(
+                text="No components found for this B3 value",
+                text_color="#f56c6c"
+            )
+            self.log("Component list updated: B6 dropdown is empty for this B3 value")
     
     def refresh_component_values(self):
         """Refresh B6 values after user changes B3"""
@@ -512,146 +794,302 @@ TIPS:
             self.log("Automation already running")
             return
         
-        if not self.component_values:
+        if not self.component_values and not self.sweep_var.get():
             self.log("Error: No components to process")
             return
         
+        try:
+            job = self.build_job()
+        except ValueError as e:
+            self.log(f"Error: Invalid settings - {str(e)}")
+            return
+        
         # Reset failed components list
         self.failed_components = []
         
         self.start_btn.configure(state="disabled", text="Running...", fg_color="#e6a23c")
+        self.stop_btn.configure(state="normal")
         self.is_running = True
+        self.cancel_token = CancellationToken()
         
         self.log("=" * 40)
         self.log("Starting automation...")
-        self.log(f"Menu: {self.current_menu_value}")
-        self.log(f"Processing {len(self.component_values)} components")
+        if job['sweep_levels']:
+            self.log(f"Sweep mode: {' → '.join(job['sweep_levels'])}")
+        else:
+            self.log(f"Menu: {self.current_menu_value}")
+            self.log(f"Processing {len(self.component_values)} components")
         self.log("=" * 40)
         
-        thread = threading.Thread(target=self.run_automation, daemon=True)
+        thread = threading.Thread(target=self.run_automation, args=(job,), daemon=True)
         thread.start()
     
-    def run_automation(self):
+    def build_job(self):
+        """Collect run settings from the form into a job dict"""
+        start_cell = self.start_entry.get().strip()
+        
+        return {
+            'sheet_name': "Extra Component Report",
+            'spreadsheet_id': sheets_manager.spreadsheet_id,
+            'dropdown_cell': self.component_dropdown_cell,
+            'menu_value': self.current_menu_value,
+            'components': list(self.component_values),
+            'start_row': int(''.join(filter(str.isdigit, start_cell))),
+            'start_col': ''.join(filter(str.isalpha, start_cell)),
+            'end_column': self.end_entry.get().strip().upper(),
+            'check_column': self.check_entry.get().strip().upper(),
+            'max_row': int(self.maxrow_entry.get().strip()),
+            'sentinel_range': self.sentinel_entry.get().strip(),
+            'timeout': int(self.timeout_entry.get().strip()),
+            'save_location': self.save_entry.get().strip(),
+            'file_formats': self.get_file_formats(),
+            'naming_mode': self.naming_var.get(),
+            'output_mode': self.output_var.get(),
+            'component_order': self.order_var.get(),
+            'post_steps': [step for step, var in self.post_vars.items() if var.get()],
+            'skip_unchanged': self.skip_unchanged_var.get(),
+            'delta': self.delta_var.get(),
+            'replicas': int(self.replicas_entry.get().strip() or 1),
+            'worker_processes': self.worker_processes_var.get(),
+            'adaptive_concurrency': self.adaptive_concurrency_var.get(),
+            'sweep_levels': self.get_sweep_levels(),
+        }
+    
+    def get_file_formats(self):
+        file_formats = [file_format for file_format, var in self.format_vars.items() if var.get()]
+        if not file_formats:
+            raise ValueError("Select at least one file format")
+        return file_formats
+    
+    def get_sweep_levels(self):
+        """Dropdown cells to sweep, or None when sweep mode is off"""
+        if not self.sweep_var.get():
+            return None
+        
+        levels = parse_level_cells(self.levels_entry.get())
+        if len(levels) < 2:
+            raise ValueError("Sweep mode needs at least two dropdown cells (e.g. B3, B6)")
+        return levels
+    
+    def on_sweep_toggle(self):
+        if self.sweep_var.get():
+            self.start_btn.configure(state="normal")
+            self.log("Sweep mode: every menu value will be exported into its own subfolder")
+        elif not self.component_values:
+            self.start_btn.configure(state="disabled")
+    
+    def queue_job(self):
+        """Submit the job to the local job service instead of running it here"""
+        try:
+            job = self.build_job()
+        except ValueError as e:
+            self.log(f"Error: Invalid settings - {str(e)}")
+            return
+        if job['sweep_levels']:
+            self.log("Error: Sweep mode runs only from this screen")
+            return
+        
+        self.queue_btn.configure(state="disabled", text="...")
+        
+        def queue_thread():
             try:
-                sheet_name = "Extra Component Report"
-                dropdown_cell = self.component_dropdown_cell
-                start_cell = self.start_entry.get().strip()
-                end_column = self.end_entry.get().strip().upper()
-                check_column = self.check_entry.get().strip().upper()
-                max_row = int(self.maxrow_entry.get().strip())
-                sentinel_range = self.sentinel_entry.get().strip()
-                timeout = int(self.timeout_entry.get().strip())
-                save_location = self.save_entry.get().strip()
-                file_format = self.format_dropdown.get()
-                naming_mode = self.naming_var.get()
-                
-                if not os.path.exists(save_location):
-                    os.makedirs(save_location, exist_ok=True)
-                
-                start_row = int(''.join(filter(str.isdigit, start_cell)))
-                start_col = ''.join(filter(str.isalpha, start_cell))
-                
-                worksheet = sheets_manager.get_worksheet(sheet_name)
-                if not worksheet:
-                    self.log("Error: Could not access worksheet")
+                client = ensure_service()
+                job_id = client.submit(job)
+                self.after(0, lambda: self.log(f"Queued as job {job_id} on {client.base_url}"))
+                self.follow_service_job(client, job_id)
+            except Exception as e:
+                self.after(0, lambda: self.log(f"Error: Could not queue the job: {str(e)}"))
+            finally:
+                self.after(0, lambda: self.queue_btn.configure(state="normal", text="Queue"))
+        
+        threading.Thread(target=queue_thread, daemon=True).start()
+    
+    def follow_service_job(self, client, job_id):
+        """Log when a queued job starts and finishes (runs in a background thread)"""
+        def follow():
+            reported = 'queued'
+            while True:
+                time.sleep(5)
+                try:
+                    info = client.job(job_id)
+                except Exception:
+                    continue
+                if info['state'] != reported:
+                    reported = info['state']
+                    summary = info.get('result') or {}
+                    if reported == 'running':
+                        self.after(0, lambda: self.log(f"Service job {job_id} started"))
+                    elif 'success_count' in summary:
+                        self.after(0, lambda: self.log(
+                            f"Service job {job_id} {reported}: {summary['success_count']} succeeded, "
+                            f"{summary['failed_count']} failed"
+                        ))
+                    else:
+                        self.after(0, lambda: self.log(f"Service job {job_id} {reported} {summary.get('error', '')}".rstrip()))
+                if reported not in ('queued', 'running'):
                     return
+        
+        threading.Thread(target=follow, daemon=True).start()
+    
+    def plan_run(self):
+        """Estimate duration, API calls and quota use without touching the sheet"""
+        if not self.component_values:
+            self.log("Error: No components to plan")
+            return
+        
+        try:
+            job = self.build_job()
+        except ValueError as e:
+            self.log(f"Error: Invalid settings - {str(e)}")
+            return
+        
+        self.plan_btn.configure(state="disabled", text="Planning...")
+        self.log("Planning run (dry run - nothing in the sheet is changed)...")
+        
+        def plan_thread():
+            try:
+                menu_count = 1
+                if job['sweep_levels']:
+                    # Read-only lookup of the top-level menu list
+                    worksheet = sheets_manager.get_worksheet(job['sheet_name'])
+                    menus = sheets_manager.read_dropdown_values_from_cell(
+                        worksheet,
+                        job['sweep_levels'][0],
+                        job['sheet_name']
+                    ) if worksheet else []
+                    menu_count = max(1, len(menus))
                 
-                original_value = sheets_manager.get_cell_value(worksheet, dropdown_cell)
-                
-                total = len(self.component_values)
-                success_count = 0
-                failed_count = 0
-                
-                for idx, value in enumerate(self.component_values, 1):
-                    if not self.is_running:
-                        self.log("Automation stopped by user")
-                        break
-                    
-                    progress = idx / total
-                    self.update_progress(idx, total, progress, f"Processing: {value}")
-                    
-                    self.log(f"[{idx}/{total}] Processing: '{value}'")
-                    
-                    try:
-                        # Read sentinel values BEFORE setting B6
-                        self.log(f"  Reading sentinel range: {sentinel_range}")
-                        initial_sentinel = worksheet.get(sentinel_range)
-                        
-                        # Set B6 to new value
-                        self.log(f"  Setting {dropdown_cell} to: {value}")
-                        if not sheets_manager.set_cell_value(worksheet, dropdown_cell, value):
-                            self.log("  Error: Could not set dropdown value")
-                            self.failed_components.append({
-                                'name': value,
-                                'reason': 'Could not set dropdown value'
-                            })
-                            failed_count += 1
-                            continue
-                        
-                        # Wait for sheet to update (monitor sentinel)
-                        self.log(f"  Waiting for sheet update (monitoring {sentinel_range})...")
-                        change_detected = self.wait_for_change(
-                            worksheet, 
-                            sentinel_range, 
-                            initial_sentinel, 
-                            timeout
-                        )
-                        
-                        if change_detected:
-                            self.log("  Sheet updated successfully")
-                        else:
-                            self.log(f"  Warning: No change detected after {timeout}s, proceeding anyway")
-                        
-                        # Find last row by scanning backwards from max_row
-                        self.log(f"  Scanning backwards from row {max_row}...")
-                        last_row = self.find_last_row_backwards(worksheet, check_column, start_row, max_row)
-                        self.log(f"  Data ends at row: {last_row}")
-                        
-                        data_range = f"{start_col}{start_row}:{end_column}{last_row}"
-                        self.log(f"  Exporting range: {data_range}")
-                        
-                        filename = self.generate_filename(value, idx, naming_mode, file_format)
-                        output_path = os.path.join(save_location, filename)
-                        
-                        if file_format == "PDF":
-                            success, msg = sheets_manager.export_range_as_pdf(sheet_name, data_range, output_path)
-                        elif file_format == "Excel (XLSX)":
-                            success, msg = sheets_manager.export_range_as_excel(sheet_name, data_range, output_path)
-                        elif file_format == "CSV":
-                            success, msg = sheets_manager.export_range_as_csv(sheet_name, data_range, output_path)
-                        else:
-                            success, msg = False, "Unknown format"
-                        
-                        if success:
-                            self.log(f"  ✓ Saved: {filename}")
-                            success_count += 1
-                        else:
-                            self.log(f"  ✗ Failed: {msg}")
-                            self.failed_components.append({
-                                'name': value,
-                                'reason': msg
-                            })
-                            failed_count += 1
-                        
-                    except Exception as e:
-                        error_msg = str(e)
-                        self.log(f"  ✗ Error: {error_msg}")
-                        self.failed_components.append({
-                            'name': value,
-                            'reason': error_msg
-                        })
-                        failed_count += 1
-                
-                # Restore original value
-                if original_value:
-                    self.log(f"Restoring original {dropdown_cell} value: {original_value}")
-                    sheets_manager.set_cell_value(worksheet, dropdown_cell, original_value)
-                
+                plan = plan_job(job, sheets_manager.spreadsheet_id, menu_count, len(sheets_manager.pool))
                 self.log("=" * 40)
-                self.log(f"COMPLETE! Success: {success_count}, Failed: {failed_count}")
+                self.log("RUN PLAN")
+                for line in format_plan(plan):
+                    self.log(f"  {line}")
                 self.log("=" * 40)
+            except Exception as e:
+                self.log(f"Error: Could not plan run - {str(e)}")
+            finally:
+                self.after(0, lambda: self.plan_btn.configure(state="normal", text="Plan Run"))
+        
+        threading.Thread(target=plan_thread, daemon=True).start()
+    
+    def calibrate_sentinel(self):
+        """Find the smallest sentinel range by sampling a few components"""
+        if self.is_running:
+            self.log("Automation already running")
+            return
+        if len(self.component_values) < 2:
+            self.log("Error: Calibration needs at least two components")
+            return
+        
+        try:
+            job = self.build_job()
+        except ValueError as e:
+            self.log(f"Error: Invalid settings - {str(e)}")
+            return
+        
+        self.is_running = True
+        self.cancel_token = CancellationToken()
+        self.start_btn.configure(state="disabled")
+        self.stop_btn.configure(state="normal")
+        self.calibrate_btn.configure(state="disabled", text="...")
+        self.log("Calibrating sentinel range (sets a few components, then restores B6)...")
+        
+        def calibrate_thread():
+            try:
+                result = SentinelCalibration(job, self.cancel_token, log=self.log).run()
+                if result:
+                    kind = "fingerprint cell" if result['fingerprint'] else f"{result['cells']} cells"
+                    self.log(f"Sentinel range: {result['range']} ({kind}, changed across all {result['samples']} samples)")
+                    self.after(0, lambda: self.set_sentinel_range(result['range']))
+                else:
+                    self.log("No cell changed reliably between the samples - keeping the current sentinel range")
+            except OperationCancelled:
+                self.log("Calibration stopped by user")
+            except Exception as e:
+                self.log(f"Error: Calibration failed - {str(e)}")
+            finally:
+                self.is_running = False
+                self.after(0, lambda: self.calibrate_btn.configure(state="normal", text="Auto"))
+                self.after(0, lambda: self.start_btn.configure(state="normal"))
+                self.after(0, lambda: self.stop_btn.configure(state="disabled", text="Stop"))
+        
+        threading.Thread(target=calibrate_thread, daemon=True).start()
+    
+    def set_sentinel_range(self, sentinel_range):
+        self.sentinel_entry.delete(0, "end")
+        self.sentinel_entry.insert(0, sentinel_range)
+    
+    def log_history_report(self, spreadsheet_id, sheet_name):
+        """Log the latest run compared with the rolling baseline"""
+        try:
+            report = run_history.throughput_report(spreadsheet_id, sheet_name)
+            self.log("RUN HISTORY")
+            for line in format_report(report):
+                self.log(f"  {line}")
+        except Exception as e:
+            self.log(f"Warning: Could not read run history: {str(e)}")
+    
+    def show_history_report(self):
+        if not sheets_manager.spreadsheet_id:
+            self.log("Error: Connect to a spreadsheet first")
+            return
+        threading.Thread(
+            target=self.log_history_report,
+            args=(sheets_manager.spreadsheet_id, "Extra Component Report"),
+            daemon=True
+        ).start()
+    
+    def run_automation(self, job):
+            try:
+                if job['skip_unchanged'] and self.skip_if_unchanged(job):
+                    return
+                if job['delta'] and not self.narrow_to_delta(job):
+                    return
+                
+                if job['sweep_levels']:
+                    runner = DropdownSweep(
+                        job,
+                        job['sweep_levels'],
+                        self.cancel_token,
+                        log=self.log,
+                        progress=self.update_progress
+                    )
+                elif job['replicas'] > 1 and job['worker_processes']:
+                    runner = ProcessCoordinator(
+                        job,
+                        job['replicas'],
+                        self.cancel_token,
+                        log=self.log,
+                        progress=self.update_progress
+                    )
+                elif job['replicas'] > 1:
+                    runner = ReplicaRun(
+                        job,
+                        job['replicas'],
+                        self.cancel_token,
+                        log=self.log,
+                        progress=self.update_progress
+                    )
+                else:
+                    runner = ComponentReportRunner(
+                        job,
+                        self.cancel_token,
+                        log=self.log,
+                        progress=self.update_progress
+                    )
+                result = runner.run()
                 
-                self.show_completion_dialog(success_count, failed_count, save_location)
+                if result:
+                    self.failed_components = result['failed_components']
+                    run_ids = result.get('run_ids') or [result.get('run_id')]
+                    if not self.cancel_token.cancelled and not result['failed_count'] and all(run_ids):
+                        self.remember_state(job, run_ids)
+                    self.log_history_report(job['spreadsheet_id'], job['sheet_name'])
+                    self.show_completion_dialog(
+                        result['success_count'],
+                        result['failed_count'],
+                        result['save_location']
+                    )
                 
             except Exception as e:
                 self.log(f"Critical error: {str(e)}")
@@ -661,59 +1099,43 @@ TIPS:
             finally:
                 self.is_running = False
                 self.after(0, lambda: self.start_btn.configure(state="normal", text="Start Automation", fg_color=["#3B8ED0", "#1F6AA5"]))
+                self.after(0, lambda: self.stop_btn.configure(state="disabled", text="Stop"))
                 self.after(0, lambda: self.update_progress(0, 0, 0, ""))
     
-    def wait_for_change(self, worksheet, sentinel_range, initial_values, timeout):
-        """Wait for sentinel range to change (indicates sheet has updated)"""
-        start_time = time.time()
-        check_interval = 0.5  # Check every 0.5 seconds
-        
-        while time.time() - start_time < timeout:
-            try:
-                current_values = worksheet.get(sentinel_range)
-                if current_values != initial_values:
-                    return True  # Change detected
-            except Exception as e:
-                self.log(f"  Warning: Error reading sentinel: {e}")
-            
-            time.sleep(check_interval)
+    def skip_if_unchanged(self, job):
+        """Run the modification precheck; True if the whole run can be skipped"""
+        self.log("Checking for changes since the last successful run...")
+        try:
+            unchanged, message = precheck(job, self.cancel_token)
+        except Exception as e:
+            unchanged, message = False, f"Precheck failed ({str(e)}), running anyway"
         
-        return False  # Timeout reached
+        self.log(message)
+        if unchanged:
+            self.log("Run skipped - nothing to export")
+        return unchanged
     
-    def find_last_row_backwards(self, worksheet, column_letter, start_row, max_row):
-        """Scan backwards from max_row to find last row with data"""
+    def narrow_to_delta(self, job):
+        """Limit the job to new components; False if there is nothing to export"""
+        if job['sweep_levels']:
+            self.log("Delta runs are not available in sweep mode; processing every menu in full")
+            return True
         try:
-            col_num = sheets_manager._col_letter_to_num(column_letter)
-            column_values = worksheet.col_values(col_num)
-            
-            # Scan backwards from max_row
-            for row_num in range(min(max_row, len(column_values)), start_row - 1, -1):
-                if row_num - 1 < len(column_values):
-                    cell_value = column_values[row_num - 1]
-                    if cell_value and str(cell_value).strip():
-                        return row_num
-            
-            # If no data found, return start_row
-            return start_row
-            
+            remaining = apply_delta(job, self.log)
         except Exception as e:
-            self.log(f"  Error in backward scan: {e}")
-            return start_row
-    
-    def generate_filename(self, dropdown_value, index, naming_mode, file_format):
-        clean_value = "".join(c for c in dropdown_value if c.isalnum() or c in (' ', '_', '-')).strip()
-        clean_value = clean_value.replace(' ', '_')
+            self.log(f"Delta check failed ({str(e)}), processing all components")
+            return True
         
-        ext_map = {"PDF": "pdf", "Excel (XLSX)": "xlsx", "CSV": "csv"}
-        ext = ext_map.get(file_format, "pdf")
-        
-        if naming_mode == "dropdown":
-            return f"{clean_value}.{ext}"
-        elif naming_mode == "sequential":
-            return f"Report_{index}.{ext}"
-        else:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            return f"{timestamp}_{index}.{ext}"
+        if not remaining:
+            self.log("Run skipped - no new components to export")
+        return bool(remaining)
+    
+    def remember_state(self, job, run_ids):
+        """Store the spreadsheet state after a successful run for the next precheck"""
+        try:
+            remember(job, run_ids)
+        except Exception as e:
+            self.log(f"Warning: Could not record spreadsheet state: {str(e)}")
     
     def show_completion_dialog(self, success, failed, location):
         def show():
@@ -785,22 +1207,23 @@ TIPS:
                 )
                 failed_list_label.pack(anchor="w", pady=(5, 5))
                 
-                # Scrollable text box for failed components
-                failed_textbox = ctk.CTkTextbox(
-                    main_frame,
-                    height=200,
-                    wrap="word"
-                )
-                failed_textbox.pack(fill="both", expand=True, pady=(0, 10))
+                # Virtualized list for failed components (filterable by reason)
+                failed_list = VirtualListBox(main_frame, height=200)
+                failed_list.pack(fill="both", expand=True, pady=(0, 10))
                 
-                # Populate failed components list
+                categories = []
+                items = []
                 for i, failed_item in enumerate(self.failed_components, 1):
                     component_name = failed_item['name']
                     reason = failed_item['reason']
-                    failed_textbox.insert("end", f"{i}. {component_name}\n")
-                    failed_textbox.insert("end", f"   Reason: {reason}\n\n")
+                    category = FAILURE_LABELS.get(failed_item.get('kind'), "Error")
+                    if category not in categories:
+                        categories.append(category)
+                    attempts = failed_item.get('attempts', 1)
+                    items.append((f"{i}. {component_name}  -  Reason: {reason} ({attempts} attempt(s))", category))
                 
-                failed_textbox.configure(state="disabled")
+                failed_list.set_filters(categories)
+                failed_list.set_items(items)
             
             # Button frame
             button_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
@@ -877,4 +1300,7 @@ TIPS:
     
     def stop_automation(self):
         self.is_running = False
+        if self.cancel_token:
+            self.cancel_token.cancel()
+        self.stop_btn.configure(state="disabled", text="Stopping...")
         self.log("Stopping automation...")
\ No newline at end of file
@@ -4,6 +4,7 @@ Auto-connects to Google Sheets on startup
 """
 import customtkinter as ctk
 from utils.google_sheets import sheets_manager
+import threading
 
 class MainHubScreen(ctk.CTkFrame):
     def __init__(self, parent, on_automation_select):
@@ -149,6 +150,10 @@ class MainHubScreen(ctk.CTkFrame):
                 text_color="#2fa572"
             )
             self.connect_btn.configure(text="Connected ✓", state="disabled")
+            
+            # Spreadsheet copies left behind by a crashed replica run
+            from utils.replica_run import cleanup_leftovers
+            threading.Thread(target=cleanup_leftovers, daemon=True).start()
         else:
             self.status_label.configure(
                 text="● Connection Failed",
@@ -0,0 +1,179 @@
+"""
+Virtualized list widget for long component lists
+Only the rows that fit in the visible area are drawn, so thousands of
+entries load instantly. Includes a search box and an optional category filter.
+"""
+import customtkinter as ctk
+import tkinter as tk
+
+class VirtualListBox(ctk.CTkFrame):
+    def __init__(self, parent, height=120, row_height=22, font=("Arial", 12), show_search=True, **kwargs):
+        super().__init__(parent, height=height, **kwargs)
+        self.row_height = row_height
+        self.font = font
+        self.items = []             # list of (text, category)
+        self.filtered = []          # indices into self.items
+        self.top_index = 0
+        self.visible_rows = 0
+        self.row_pool = []          # canvas text items reused while scrolling
+        self._search_job = None
+        
+        # Search / filter bar
+        if show_search:
+            search_frame = ctk.CTkFrame(self, fg_color="transparent")
+            search_frame.pack(fill="x", padx=5, pady=(5, 0))
+            
+            self.search_entry = ctk.CTkEntry(search_frame, placeholder_text="Search...", height=28)
+            self.search_entry.pack(side="left", fill="x", expand=True)
+            self.search_entry.bind("<KeyRelease>", self._schedule_search)
+            
+            self.filter_dropdown = ctk.CTkComboBox(
+                search_frame,
+                values=["All"],
+                width=160,
+                height=28,
+                command=lambda _: self.apply_filter()
+            )
+            self.filter_dropdown.set("All")
+            
+            self.count_label = ctk.CTkLabel(search_frame, text="", text_color="gray", width=90)
+            self.count_label.pack(side="right", padx=(5, 0))
+        else:
+            self.search_entry = None
+            self.filter_dropdown = None
+            self.count_label = None
+        
+        # List area
+        list_frame = ctk.CTkFrame(self, fg_color="transparent")
+        list_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        self.canvas = tk.Canvas(
+            list_frame,
+            height=height,
+            highlightthickness=0,
+            bd=0,
+            bg=self._apply_appearance_mode(ctk.ThemeManager.theme["CTkTextbox"]["fg_color"])
+        )
+        self.canvas.pack(side="left", fill="both", expand=True)
+        
+        self.scrollbar = ctk.CTkScrollbar(list_frame, command=self._yview)
+        self.scrollbar.pack(side="right", fill="y")
+        
+        self.canvas.bind("<Configure>", lambda e: self._render())
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", lambda e: self._scroll_rows(-3))
+        self.canvas.bind("<Button-5>", lambda e: self._scroll_rows(3))
+    
+    def set_items(self, items):
+        """
+        Replace the list contents
+        Args:
+            items: list of strings or (text, category) tuples
+        """
+        self.items = [item if isinstance(item, tuple) else (item, None) for item in items]
+        self.top_index = 0
+        self.apply_filter()
+    
+    def set_filters(self, categories):
+        """Show a category filter dropdown with the given category names"""
+        if not self.filter_dropdown:
+            return
+        if categories:
+            self.filter_dropdown.configure(values=["All"] + list(categories))
+            self.filter_dropdown.pack(side="left", padx=(5, 0))
+        else:
+            self.filter_dropdown.pack_forget()
+        self.filter_dropdown.set("All")
+    
+    def clear(self):
+        self.set_items([])
+    
+    def _schedule_search(self, event=None):
+        """Debounce search so typing does not refilter on every key"""
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(150, self.apply_filter)
+    
+    def apply_filter(self):
+        """Rebuild the filtered index list from the search text and category filter"""
+        self._search_job = None
+        query = self.search_entry.get().strip().lower() if self.search_entry else ""
+        category = self.filter_dropdown.get() if self.filter_dropdown else "All"
+        
+        self.filtered = [
+            i for i, (text, item_category) in enumerate(self.items)
+            if (not query or query in text.lower())
+            and (category == "All" or item_category == category)
+        ]
+        self.top_index = 0
+        
+        if self.count_label:
+            if len(self.filtered) == len(self.items):
+                self.count_label.configure(text=f"{len(self.items)} items")
+            else:
+                self.count_label.configure(text=f"{len(self.filtered)}/{len(self.items)}")
+        self._render()
+    
+    def _render(self):
+        """Draw only the rows that fit in the canvas"""
+        canvas_height = max(self.canvas.winfo_height(), 1)
+        self.visible_rows = canvas_height // self.row_height + 1
+        
+        # Grow the pool of reusable text items if the canvas got taller
+        text_color = self._apply_appearance_mode(ctk.ThemeManager.theme["CTkLabel"]["text_color"])
+        while len(self.row_pool) < self.visible_rows:
+            y = len(self.row_pool) * self.row_height + 2
+            self.row_pool.append(
+                self.canvas.create_text(6, y, anchor="nw", font=self.font, fill=text_color)
+            )
+        
+        max_top = max(0, len(self.filtered) - self.visible_rows + 1)
+        self.top_index = max(0, min(self.top_index, max_top))
+        
+        for slot, text_item in enumerate(self.row_pool):
+            index = self.top_index + slot
+            if slot < self.visible_rows and index < len(self.filtered):
+                self.canvas.itemconfigure(text_item, text=self.items[self.filtered[index]][0])
+            else:
+                self.canvas.itemconfigure(text_item, text="")
+        
+        # Update scrollbar thumb
+        total = len(self.filtered)
+        if total == 0:
+            self.scrollbar.set(0, 1)
+        else:
+            first = self.top_index / total
+            last = min(1.0, (self.top_index + self.visible_rows) / total)
+            self.scrollbar.set(first, last)
+    
+    def _set_appearance_mode(self, mode_string):
+        super()._set_appearance_mode(mode_string)
+        if hasattr(self, "canvas"):
+            self.canvas.configure(bg=self._apply_appearance_mode(ctk.ThemeManager.theme["CTkTextbox"]["fg_color"]))
+            text_color = self._apply_appearance_mode(ctk.ThemeManager.theme["CTkLabel"]["text_color"])
+            for text_item in self.row_pool:
+                self.canvas.itemconfigure(text_item, fill=text_color)
+    
+    def _scroll_rows(self, delta):
+        self.top_index += delta
+        self._render()
+    
+    def _yview(self, *args):
+        """Scrollbar callback (same protocol as tkinter yview)"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.top_index = int(float(args[1]) * len(self.filtered))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                amount *= max(1, self.visible_rows - 1)
+            self.top_index += amount
+        self._render()
+    
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS reports small deltas
+        if abs(event.delta) >= 120:
+            self._scroll_rows(-int(event.delta / 120) * 3)
+        else:
+            self._scroll_rows(-event.delta)
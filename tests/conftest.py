@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app runs from the repository root (python app.py); tests import utils.* the same way
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,86 @@
+"""
+Archive output after a crash
+An archive the app never closed opens as it is if the app stopped between
+members; cut off in the middle of a member, it is readable again after
+recover_archives.
+"""
+import json
+import os
+import random
+import tarfile
+import zipfile
+import pytest
+from utils.archive_output import ArchiveSink, MANIFEST_NAME, OPEN_SUFFIX, archive_members, recover_archives
+
+MEMBERS = {"Part_A.csv": b"Part,Qty\r\nBolt,4\r\n", "Part_B.csv": b"Part,Qty\r\nNut,8\r\n"}
+
+def crash_mid_member(path, archive_format):
+    """Write two members, then die half-way through the third"""
+    sink = ArchiveSink(path, archive_format)
+    for name, data in MEMBERS.items():
+        sink.add_bytes(name, data)
+    complete = os.path.getsize(path)
+    # Random bytes barely compress, so the third member is large on disk
+    sink.add_bytes("Part_C.csv", random.Random(0).randbytes(256 * 1024))
+    abandon(sink)
+    os.truncate(path, complete + (os.path.getsize(path) - complete) // 2)
+
+def abandon(sink):
+    """The process dies between members: nothing else reaches the file"""
+    if sink.zip:
+        sink.zip.fp = None
+    sink.file.close()
+
+def throw(error):
+    raise error
+
+def read_members(path):
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return {name: archive.read(name) for name in archive.namelist()}
+    with tarfile.open(path, 'r:gz') as archive:
+        return {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+
+@pytest.mark.parametrize("archive_format, extension", [("zip", "zip"), ("tar.gz", "tar.gz")])
+def test_archive_cut_off_mid_member_is_recovered(tmp_path, archive_format, extension):
+    path = str(tmp_path / f"Report.{extension}")
+    crash_mid_member(path, archive_format)
+    assert os.path.exists(path + OPEN_SUFFIX)
+    
+    lines = []
+    assert recover_archives(str(tmp_path), log=lines.append) == [path]
+    assert read_members(path) == MEMBERS
+    assert not os.path.exists(path + OPEN_SUFFIX)
+    assert "2 member(s)" in lines[0]
+    # Nothing left to repair
+    assert recover_archives(str(tmp_path), log=lines.append) == []
+
+@pytest.mark.parametrize("archive_format, extension", [("zip", "zip"), ("tar.gz", "tar.gz")])
+def test_closed_archive_has_manifest_and_no_marker(tmp_path, archive_format, extension):
+    path = str(tmp_path / f"Report.{extension}")
+    sink = ArchiveSink(path, archive_format)
+    for name, data in MEMBERS.items():
+        sink.add_bytes(name, data)
+    sink.close()
+    
+    assert not os.path.exists(path + OPEN_SUFFIX)
+    assert archive_members(path) == set(MEMBERS) | {MANIFEST_NAME}
+    assert recover_archives(str(tmp_path)) == []
+
+@pytest.mark.parametrize("archive_format, extension", [("zip", "zip"), ("tar.gz", "tar.gz")])
+def test_archive_abandoned_between_members_is_readable(tmp_path, archive_format, extension):
+    path = str(tmp_path / f"Report.{extension}")
+    sink = ArchiveSink(path, archive_format)
+    for name, data in MEMBERS.items():
+        sink.add_bytes(name, data)
+    sink.record({'component': "Part A"})
+    with pytest.raises(ConnectionError):
+        sink.add("Part_C.csv", lambda stream: (stream.write(b"Part,Qty\r\n"), throw(ConnectionError())))
+    abandon(sink)
+    
+    # Opened as it is, without recover_archives
+    members = read_members(path)
+    manifest = json.loads(members.pop(MANIFEST_NAME))
+    assert members == MEMBERS
+    assert manifest['closed'] is None
+    assert manifest['components'] == [{'component': "Part A"}]
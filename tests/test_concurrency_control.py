@@ -0,0 +1,94 @@
+"""
+AIMD concurrency controller
+Outcomes are fed in directly; no spreadsheet or worker is involved.
+"""
+import time
+import pytest
+from utils.cancellation import CancellationToken, OperationCancelled
+from utils.concurrency_control import ConcurrencyController, GatedWork
+from utils.retry_policy import FAILURE_QUOTA, FAILURE_TIMEOUT, FAILURE_ERROR
+
+def outcome(success=True, kind=None, expected=2.0, recalc=2.0, throttled=0, started=None):
+    return {
+        'success': success,
+        'kind': kind,
+        'expected': expected,
+        'recalc': recalc,
+        'throttled': throttled,
+        'started': time.time() if started is None else started,
+    }
+
+@pytest.fixture
+def controller():
+    return ConcurrencyController(8, log=lambda line: None)
+
+@pytest.mark.parametrize("result, signal", [
+    (outcome(), 'healthy'),
+    (outcome(recalc=3.0), 'hold'),
+    (outcome(recalc=4.5), 'slow'),
+    (outcome(kind=FAILURE_TIMEOUT, success=False), 'slow'),
+    (outcome(throttled=1), 'throttled'),
+    (outcome(kind=FAILURE_QUOTA, success=False), 'throttled'),
+    (outcome(kind=FAILURE_ERROR, success=False), 'failed'),
+    (outcome(expected=None), 'healthy'),
+])
+def test_classify(result, signal):
+    assert ConcurrencyController.classify(result) == signal
+
+def test_slow_start_then_multiplicative_backoff(controller):
+    for _ in range(4):
+        controller.observe(outcome())
+    assert controller.allowed() == 6
+    
+    controller.observe(outcome(throttled=1))
+    assert controller.allowed() == 3
+    # Additive increase after the first backoff: about one worker per round
+    for _ in range(3):
+        controller.observe(outcome())
+    assert controller.allowed() == 4
+
+def test_limit_stays_within_bounds(controller):
+    for _ in range(20):
+        controller.observe(outcome())
+    assert controller.allowed() == 8
+    for _ in range(10):
+        controller.observe(outcome(throttled=1))
+        time.sleep(0.001)
+    assert controller.allowed() == 1
+
+def test_one_congestion_event_backs_off_once(controller):
+    started = time.time()
+    controller.observe(outcome(recalc=5.0, started=started))
+    assert controller.allowed() == 1
+    # Another component that was already running saw the same congestion
+    controller.observe(outcome(recalc=5.0, started=started))
+    assert controller.allowed() == 1
+    assert controller.summary()['decreases'] == 1
+
+def test_hold_and_failures_leave_the_limit(controller):
+    controller.observe(outcome(recalc=3.0))
+    controller.observe(outcome(kind=FAILURE_ERROR, success=False))
+    assert controller.allowed() == 2
+    assert controller.summary()['signals']['hold'] == 1
+
+def test_slots_wait_for_release_and_cancel():
+    controller = ConcurrencyController(4, log=lambda line: None, initial=1)
+    token = CancellationToken()
+    controller.acquire(token)
+    token.cancel()
+    with pytest.raises(OperationCancelled):
+        controller.acquire(token)
+    
+    controller.release(outcome())
+    assert controller.allowed() == 2
+    controller.acquire(CancellationToken())
+    assert controller.active == 1
+
+def test_gated_work_frees_the_slot_when_work_runs_out(controller):
+    work = GatedWork([(1, "Part A")], controller, CancellationToken())
+    assert next(work) == (1, "Part A")
+    assert controller.active == 1
+    controller.release(None)
+    with pytest.raises(StopIteration):
+        next(work)
+    assert controller.active == 0
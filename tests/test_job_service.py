@@ -0,0 +1,51 @@
+"""
+Cron schedules of the job service
+"""
+from datetime import datetime
+import pytest
+
+# The service module imports the Sheets client
+pytest.importorskip("gspread")
+from utils import job_service
+
+@pytest.mark.parametrize("field, low, high, values", [
+    ("*", 0, 5, {0, 1, 2, 3, 4, 5}),
+    ("5", 0, 59, {5}),
+    ("1-5", 0, 7, {1, 2, 3, 4, 5}),
+    ("*/15", 0, 59, {0, 15, 30, 45}),
+    ("10/20", 0, 59, {10, 30, 50}),
+    ("0,30", 0, 59, {0, 30}),
+    ("1-10/3,20", 1, 31, {1, 4, 7, 10, 20}),
+])
+def test_parse_cron_field(field, low, high, values):
+    assert job_service.parse_cron_field(field, low, high) == values
+
+@pytest.mark.parametrize("field", ["60", "*/0", "5-1", "x", ""])
+def test_parse_cron_field_rejects(field):
+    with pytest.raises(ValueError):
+        job_service.parse_cron_field(field, 0, 59)
+
+def test_cron_needs_five_fields():
+    with pytest.raises(ValueError):
+        job_service.CronSchedule("0 6 * *")
+
+def test_weekdays_at_six():
+    schedule = job_service.CronSchedule("0 6 * * 1-5")
+    assert schedule.matches(datetime(2024, 1, 1, 6, 0))        # Monday
+    assert not schedule.matches(datetime(2024, 1, 6, 6, 0))    # Saturday
+    assert not schedule.matches(datetime(2024, 1, 1, 6, 1))
+
+def test_sunday_is_zero_or_seven():
+    sunday = datetime(2024, 1, 7, 0, 0)
+    assert job_service.CronSchedule("0 0 * * 0").matches(sunday)
+    assert job_service.CronSchedule("0 0 * * 7").matches(sunday)
+
+def test_restricted_day_and_weekday_match_either():
+    schedule = job_service.CronSchedule("0 0 1 * 1")
+    assert schedule.matches(datetime(2024, 2, 1, 0, 0))        # 1st, a Thursday
+    assert schedule.matches(datetime(2024, 2, 5, 0, 0))        # a Monday
+    assert not schedule.matches(datetime(2024, 2, 6, 0, 0))
+    
+    monthly = job_service.CronSchedule("30 2 15 * *")
+    assert monthly.matches(datetime(2024, 3, 15, 2, 30))
+    assert not monthly.matches(datetime(2024, 3, 16, 2, 30))
@@ -0,0 +1,112 @@
+"""
+Post-processing inside worker processes
+ProcessCoordinator starts its workers as daemonic spawn processes, which may
+not start a process pool of their own.
+"""
+import multiprocessing
+import os
+import queue
+import pytest
+
+ROWS = [["Part", "Qty", "Price"], ["Bolt", "4", "0.10"], ["Nut", "8", "0.05"]]
+
+def _post_process_in_worker(save_location, results):
+    from utils.post_process import PostProcessor
+    try:
+        path = os.path.join(save_location, "Part_A.csv")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write("Part,Qty\r\nBolt,4\r\n")
+        processor = PostProcessor(['validate', 'compress'])
+        try:
+            post = processor.submit([path], {'rows': 2}).result()
+        finally:
+            processor.close()
+        results.put((processor.in_process, post['errors'], post['paths']))
+    except BaseException as e:
+        results.put(('error', repr(e), None))
+
+def _run_worker_component(save_location, results):
+    """What a worker process does for one component: stream the rows, write, post-process"""
+    try:
+        from utils import report_runner
+        from utils.cancellation import CancellationToken
+        
+        report_runner.sheets_manager.iter_range_rows = lambda worksheet, cell_range, options, cancel_token: iter(ROWS)
+        job = {
+            'sheet_name': "Extra Component Report",
+            'spreadsheet_id': "test",
+            'save_location': save_location,
+            'file_formats': ["CSV", "JSON Lines"],
+            'post_steps': ['validate'],
+        }
+        runner = report_runner.ComponentReportRunner(job, CancellationToken(), log=lambda line: None)
+        runner.start_post_processing()
+        try:
+            base_path = os.path.join(save_location, "Part_A")
+            success, message, data = runner.fetch("A9:C11", base_path)
+            written = runner.write_files(base_path, data)
+            post = written['post'].result()
+        finally:
+            runner.post_processor.close()
+            runner.disk_writer.close()
+        results.put((success, post['errors'], post['paths']))
+    except BaseException as e:
+        results.put(('error', repr(e), None))
+
+def run_in_daemon_worker(target, save_location):
+    """Run target in a daemonic spawn process, like ProcessCoordinator does"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=target, args=(str(save_location), results), daemon=True)
+    process.start()
+    try:
+        return results.get(timeout=120)
+    except queue.Empty:
+        pytest.fail("Worker process did not report a result")
+    finally:
+        process.join(30)
+
+def test_post_processor_runs_inside_daemon_worker(tmp_path):
+    in_process, errors, paths = run_in_daemon_worker(_post_process_in_worker, tmp_path)
+    assert in_process is True, errors
+    assert errors == []
+    assert paths == [os.path.join(str(tmp_path), "Part_A.csv.gz")]
+    assert os.path.exists(paths[0])
+
+def test_worker_mode_component_with_post_steps(tmp_path):
+    pytest.importorskip("gspread")
+    success, errors, paths = run_in_daemon_worker(_run_worker_component, tmp_path)
+    assert success is True, errors
+    assert errors == []
+    assert sorted(os.path.basename(path) for path in paths) == ["Part_A.csv", "Part_A.jsonl"]
+
+def test_post_processor_uses_process_pool_outside_workers(tmp_path):
+    from utils.post_process import PostProcessor
+    path = tmp_path / "Part_A.jsonl"
+    path.write_text('["Bolt", "4"]\n["Nut", "8"]\n', encoding='utf-8')
+    processor = PostProcessor(['validate'], workers=1)
+    try:
+        post = processor.submit([str(path)], {'rows': 2}).result(timeout=120)
+    finally:
+        processor.close()
+    assert processor.in_process is False
+    assert post['errors'] == []
+
+def test_validate_compares_rows_with_rows_written(tmp_path):
+    from utils.export_writers import CsvRowWriter, JsonLinesRowWriter, write_rows
+    from utils.post_process import validate, PostProcessingError
+    # An empty row inside the range is written; the range had trailing empty rows that were not
+    rows = [["Bolt", "4"], [], ["Nut", "8"]]
+    writers = [CsvRowWriter(str(tmp_path / "a.csv")), JsonLinesRowWriter(str(tmp_path / "a.jsonl"))]
+    count = write_rows(rows, writers)
+    for writer in writers:
+        assert validate(writer.output_path, {'rows': count})['detail']['rows'] == 3
+        with pytest.raises(PostProcessingError):
+            validate(writer.output_path, {'rows': count + 2})
+
+def test_validate_accepts_range_without_rows(tmp_path):
+    from utils.export_writers import CsvRowWriter, write_rows
+    from utils.post_process import validate
+    writer = CsvRowWriter(str(tmp_path / "empty.csv"))
+    count = write_rows([], [writer])
+    assert validate(writer.output_path, {'rows': count})['detail']['rows'] == 0
@@ -0,0 +1,75 @@
+"""
+Row exports in the component loop
+The rows are read before the next dropdown change, but nothing may be written
+to the save location until the disk-writer stage runs.
+"""
+import os
+import zipfile
+import pytest
+
+ROWS = [["Part", "Qty"], ["Bolt", "4"], ["Nut", "8"]]
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    pytest.importorskip("gspread")
+    from utils import report_runner
+    from utils.cancellation import CancellationToken
+    
+    monkeypatch.setattr(report_runner.sheets_manager, 'iter_range_rows',
+                        lambda worksheet, cell_range, options, cancel_token: iter(ROWS))
+    job = {
+        'sheet_name': "Extra Component Report",
+        'spreadsheet_id': "test",
+        'save_location': str(tmp_path),
+        'file_formats': ["CSV", "JSON Lines"],
+    }
+    runner = report_runner.ComponentReportRunner(job, CancellationToken(), log=lambda line: None)
+    yield runner
+    runner.disk_writer.close()
+
+def test_row_files_reach_the_save_location_through_the_disk_writer(runner, tmp_path):
+    base_path = os.path.join(str(tmp_path), "Part_A")
+    success, message, data = runner.fetch("A9:B11", base_path)
+    assert success, message
+    assert data['rows_written'] == 3
+    assert os.listdir(str(tmp_path)) == []
+    
+    written = runner.disk_writer.submit(runner.write_files, base_path, data).result()
+    assert sorted(os.listdir(str(tmp_path))) == ["Part_A.csv", "Part_A.jsonl"]
+    assert sorted(written['paths']) == [base_path + ".csv", base_path + ".jsonl"]
+    with open(base_path + ".csv", encoding='utf-8', newline='') as f:
+        assert f.read() == "Part,Qty\r\nBolt,4\r\nNut,8\r\n"
+
+def test_archive_rows_stream_into_members(runner, tmp_path):
+    from utils.archive_output import ArchiveSink
+    archive_path = os.path.join(str(tmp_path), "Report.zip")
+    runner.archive = ArchiveSink(archive_path, "zip")
+    base_path = os.path.join(str(tmp_path), "Part_A")
+    success, message, data = runner.fetch("A9:B11", base_path)
+    assert success, message
+    
+    written = runner.disk_writer.submit(runner.write_files, base_path, data).result()
+    runner.archive.close()
+    assert [member['name'] for member in written['files']] == ["Part_A.csv", "Part_A.jsonl"]
+    assert os.listdir(str(tmp_path)) == ["Report.zip"]
+    with zipfile.ZipFile(archive_path) as archive:
+        assert archive.read("Part_A.csv") == b"Part,Qty\r\nBolt,4\r\nNut,8\r\n"
+        assert archive.read("Part_A.jsonl").count(b"\n") == 3
+
+def test_archive_keeps_no_member_of_a_failed_read(runner, tmp_path, monkeypatch):
+    from utils import report_runner
+    from utils.archive_output import ArchiveSink, MANIFEST_NAME
+    
+    def broken_rows(worksheet, cell_range, options, cancel_token):
+        yield ROWS[0]
+        raise ConnectionError("Read timed out")
+    
+    monkeypatch.setattr(report_runner.sheets_manager, 'iter_range_rows', broken_rows)
+    archive_path = os.path.join(str(tmp_path), "Report.zip")
+    runner.archive = ArchiveSink(archive_path, "zip")
+    success, message, data = runner.fetch("A9:B11", os.path.join(str(tmp_path), "Part_A"))
+    runner.disk_writer.close()
+    assert not success and "Read timed out" in message
+    # Still readable without closing, and the half-written member is gone
+    with zipfile.ZipFile(archive_path) as archive:
+        assert archive.namelist() == [MANIFEST_NAME]
@@ -0,0 +1,124 @@
+"""
+Leases in the SQLite work queue
+Two fake workers share one queue database; a fake clock stands in for time
+passing, so lease expiry needs no waiting.
+"""
+import time
+import pytest
+from utils import work_queue as work_queue_module
+from utils.work_queue import WorkQueue, LEASE_SECONDS, STALE_SECONDS, MAX_TASK_ATTEMPTS
+
+JOB = {'sheet_name': "Extra Component Report", 'components': ["Part A", "Part B", "Part C"]}
+DONE = {'success': True, 'kind': None, 'reason': ""}
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+    
+    def time(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(work_queue_module, 'time', clock)
+    return clock
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return WorkQueue(str(tmp_path / "work_queue.db"))
+
+def test_workers_claim_tasks_in_order_and_complete_them(queue):
+    job_id = queue.create_job(JOB, order=[(3, "Part C"), (1, "Part A"), (2, "Part B")])
+    assert queue.claim(job_id, "w1") == (3, "Part C")
+    assert queue.claim(job_id, "w2") == (1, "Part A")
+    
+    assert queue.complete(job_id, 3, "w1", DONE, [])
+    # Only the lease holder can store an outcome
+    assert not queue.complete(job_id, 1, "w1", DONE, [])
+    assert queue.counts(job_id) == {'done': 1, 'leased': 1, 'pending': 1}
+
+def test_renewed_lease_is_kept(queue, clock):
+    job_id = queue.create_job(dict(JOB, components=["Part A"]))
+    assert queue.claim(job_id, "w1") == (1, "Part A")
+    
+    clock.advance(LEASE_SECONDS - 10)
+    assert queue.renew(job_id, "w1") == 'running'
+    clock.advance(20)
+    assert queue.claim(job_id, "w2") is None
+    assert queue.complete(job_id, 1, "w1", DONE, [])
+
+def test_expired_lease_goes_to_another_worker(queue, clock):
+    job_id = queue.create_job(dict(JOB, components=["Part A"]))
+    assert queue.claim(job_id, "w1") == (1, "Part A")
+    assert queue.stale_leases(job_id, "w2") == 0
+    
+    clock.advance(STALE_SECONDS + 1)
+    assert queue.stale_leases(job_id, "w2") == 1
+    clock.advance(LEASE_SECONDS)
+    assert queue.claim(job_id, "w2") == (1, "Part A")
+    # The first worker lost the task and cannot overwrite the new holder's result
+    assert not queue.complete(job_id, 1, "w1", DONE, [])
+    assert queue.complete(job_id, 1, "w2", DONE, [])
+
+def test_task_fails_after_too_many_lost_leases(queue, clock):
+    job_id = queue.create_job(dict(JOB, components=["Part A"]))
+    for n in range(MAX_TASK_ATTEMPTS):
+        assert queue.claim(job_id, f"w{n % 2 + 1}") == (1, "Part A")
+        clock.advance(LEASE_SECONDS + 1)
+    
+    assert queue.claim(job_id, "w1") is None
+    tasks, _ = queue.results(job_id)
+    assert tasks[0]['state'] == 'failed'
+    assert tasks[0]['leases'] == MAX_TASK_ATTEMPTS
+    assert "lease expired" in tasks[0]['outcome']['reason']
+
+def test_concurrency_limit_holds_back_later_workers(queue, clock):
+    job_id = queue.create_job(JOB)
+    queue.set_concurrency(job_id, 1)
+    assert queue.claim(job_id, "w1") == (1, "Part A")
+    assert queue.claim(job_id, "w2") is None
+    assert queue.held_back(job_id, "w2")
+    assert not queue.held_back(job_id, "w1")
+    
+    # A worker that stops checking in no longer holds its place
+    clock.advance(STALE_SECONDS + 1)
+    assert queue.claim(job_id, "w2") == (2, "Part B")
+    
+    queue.set_concurrency(job_id, None)
+    assert queue.claim(job_id, "w1") == (3, "Part C")
+
+def test_finished_worker_frees_its_place(queue):
+    job_id = queue.create_job(JOB)
+    queue.set_concurrency(job_id, 1)
+    assert queue.claim(job_id, "w1") == (1, "Part A")
+    assert queue.claim(job_id, "w2") is None
+    
+    queue.complete(job_id, 1, "w1", DONE, [])
+    queue.finish_worker(job_id, "w1", {}, {})
+    assert queue.claim(job_id, "w2") == (2, "Part B")
+
+def test_release_returns_unfinished_tasks(queue):
+    job_id = queue.create_job(JOB)
+    assert queue.claim(job_id, "w1") == (1, "Part A")
+    assert queue.claim(job_id, "w1") == (2, "Part B")
+    queue.complete(job_id, 1, "w1", DONE, [])
+    
+    # Worker exit: the task it still held is claimable right away, after the
+    # tasks nobody has leased yet (its lease still counts)
+    queue.release(job_id, "w1")
+    assert queue.claim(job_id, "w2") == (3, "Part C")
+    assert queue.claim(job_id, "w2") == (2, "Part B")
+    tasks, _ = queue.results(job_id)
+    assert tasks[1]['leases'] == 2
+
+def test_cancelled_job_hands_out_nothing(queue):
+    job_id = queue.create_job(JOB)
+    assert queue.claim(job_id, "w1") == (1, "Part A")
+    queue.set_job_state(job_id, 'cancelled')
+    assert queue.renew(job_id, "w1") == 'cancelled'
+    assert queue.claim(job_id, "w2") is None
+    assert not queue.held_back(job_id, "w2")
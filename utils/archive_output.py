@@ -0,0 +1,339 @@
+"""
+Archive output mode
+Writes each component's files straight into one ZIP or tar.gz archive as they
+finish, instead of separate files in the save location. The archive file stays
+open for the whole run, so adding a member never rereads the archive. A manifest
+with component names, checksums and timings is kept as the last member.
+
+After every member the manifest and the end records (ZIP central directory, tar
+end marker) are written behind it, so a run that stops between members leaves
+a readable archive; the next member is written over them. Crash window: a crash
+while a member (or the manifest) is being written leaves an archive that cannot
+be read as it is. An "<archive>.open" marker sits next to the archive until it
+is closed, and the next run in the same save location repairs such archives
+(recover_archives): a ZIP is rebuilt from the local headers of its complete
+members, a tar.gz is cut back to its last complete member. The member being
+written and the manifest are lost.
+"""
+from datetime import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import struct
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+
+ARCHIVE_EXTENSIONS = {"zip": "zip", "tar.gz": "tar.gz"}
+MANIFEST_NAME = "manifest.json"
+OPEN_SUFFIX = ".open"   # Marker next to an archive that has not been closed yet
+CHUNK_SIZE = 1024 * 1024
+
+# ZIP local file header: signature, versions, flags, method, time, date, CRC, sizes, name and extra lengths
+ZIP_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+ZIP_LOCAL_SIGNATURE = b"PK\003\004"
+ZIP_FLAG_DATA_DESCRIPTOR = 0x08
+ZIP_FLAG_UTF8 = 0x800
+
+def generate_archive_name(job, output_mode):
+    """Archive file name for a run, e.g. Menu_Name_20240101_120000.zip"""
+    menu = job.get('menu_value') or job['sheet_name']
+    clean_value = "".join(c for c in menu if c.isalnum() or c in (' ', '_', '-')).strip()
+    clean_value = clean_value.replace(' ', '_') or "Report"
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{clean_value}_{timestamp}.{ARCHIVE_EXTENSIONS[output_mode]}"
+
+def archive_members(path):
+    """Member names of a ZIP or tar.gz archive (empty if it cannot be read)"""
+    try:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                return set(archive.namelist())
+        with tarfile.open(path, 'r:gz') as archive:
+            return set(archive.getnames())
+    except (OSError, tarfile.TarError, zipfile.BadZipFile, EOFError):
+        return set()
+
+def recover_archives(directory, log=print):
+    """
+    Repair the archives in a save location that a crashed run left open
+    Returns: paths of the archives repaired
+    """
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    
+    recovered = []
+    for name in names:
+        if not name.endswith(OPEN_SUFFIX):
+            continue
+        marker = os.path.join(directory, name)
+        path = marker[:-len(OPEN_SUFFIX)]
+        try:
+            if os.path.isfile(path):
+                count = recover_archive(path)
+                log(f"Recovered {count} member(s) of an archive left open by an earlier run: {path}")
+                recovered.append(path)
+            os.remove(marker)
+        except (OSError, zipfile.BadZipFile) as e:
+            log(f"Warning: Could not recover archive {path}: {e}")
+    return recovered
+
+def recover_archive(path):
+    """
+    Make an archive that was never closed readable again
+    Returns: number of members kept
+    """
+    if path.endswith("." + ARCHIVE_EXTENSIONS["zip"]):
+        return _recover_zip(path)
+    return _recover_tar(path)
+
+def _recover_zip(path):
+    """Rebuild a ZIP from the local headers of its complete members (in a new file)"""
+    rebuilt = path + ".recovering"
+    count = 0
+    with open(path, 'rb') as source, zipfile.ZipFile(rebuilt, 'w', compression=zipfile.ZIP_DEFLATED) as target:
+        while True:
+            header = source.read(ZIP_LOCAL_HEADER.size)
+            if len(header) < ZIP_LOCAL_HEADER.size:
+                break
+            (signature, _, _, flags, method, dos_time, dos_date,
+             crc, compress_size, file_size, name_length, extra_length) = ZIP_LOCAL_HEADER.unpack(header)
+            # ArchiveSink writes deflated members to a seekable file, so sizes and CRC are in the
+            # header once a member is complete; anything else is where the complete members end
+            if (signature != ZIP_LOCAL_SIGNATURE or method != zipfile.ZIP_DEFLATED
+                    or flags & ZIP_FLAG_DATA_DESCRIPTOR):
+                break
+            name = source.read(name_length).decode('utf-8' if flags & ZIP_FLAG_UTF8 else 'cp437')
+            source.seek(extra_length, io.SEEK_CUR)
+            
+            data_offset = source.tell()
+            if not _zip_member_complete(source, compress_size, file_size, crc):
+                break
+            source.seek(data_offset)
+            info = zipfile.ZipInfo(name, date_time=(
+                (dos_date >> 9) + 1980, (dos_date >> 5) & 0xF, dos_date & 0x1F,
+                dos_time >> 11, (dos_time >> 5) & 0x3F, (dos_time & 0x1F) * 2
+            ))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with target.open(info, 'w') as member:
+                for chunk in _inflate(source, compress_size):
+                    member.write(chunk)
+            count += 1
+    
+    os.replace(rebuilt, path)
+    return count
+
+def _zip_member_complete(source, compress_size, file_size, crc):
+    """True if the member data at the current position inflates to the size and CRC in its header"""
+    checksum = size = 0
+    try:
+        for chunk in _inflate(source, compress_size):
+            checksum = zlib.crc32(chunk, checksum)
+            size += len(chunk)
+    except (EOFError, zlib.error):
+        return False
+    return checksum == crc and size == file_size
+
+def _inflate(source, compress_size):
+    """Yield the inflated chunks of compress_size bytes of raw deflate data"""
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    left = compress_size
+    while left:
+        data = source.read(min(left, CHUNK_SIZE))
+        if not data:
+            raise EOFError("Member data is cut off")
+        left -= len(data)
+        yield decompressor.decompress(data)
+    yield decompressor.flush()
+    # A member cut off before its sizes were filled in claims 0 bytes and never reaches the end
+    if not decompressor.eof:
+        raise EOFError("Member data is cut off")
+
+def _recover_tar(path):
+    """Cut a tar.gz back to its last complete gzip member (one per tar member) and end it"""
+    complete = members = position = 0
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    with open(path, 'rb') as source:
+        data = b""
+        while True:
+            if not data:
+                data = source.read(CHUNK_SIZE)
+                if not data:
+                    break
+            try:
+                decompressor.decompress(data, CHUNK_SIZE)
+            except zlib.error:
+                break
+            left = decompressor.unused_data if decompressor.eof else decompressor.unconsumed_tail
+            position += len(data) - len(left)
+            data = left
+            if decompressor.eof:
+                complete = position
+                members += 1
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    
+    with open(path, 'r+b') as f:
+        f.truncate(complete)
+        f.seek(complete)
+        _write_tar_end(f)
+    return members
+
+def _write_tar_end(f):
+    """Append the tar end-of-archive marker as its own gzip member"""
+    with gzip.GzipFile(fileobj=f, mode='wb') as gz:
+        gz.write(b"\0" * tarfile.BLOCKSIZE * 2)
+
+class _HashingStream(io.RawIOBase):
+    """Write-through stream that counts and checksums what passes through it"""
+    def __init__(self, target):
+        self.target = target
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.target.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        return len(data)
+
+class _ZipWriter(zipfile.ZipFile):
+    """ZipFile whose central directory can be written after any member, then written over"""
+    def write_directory(self):
+        """Write the central directory behind the last member"""
+        with self._lock:
+            self.fp.seek(self.start_dir)
+            self._write_end_record()
+            self.fp.truncate()
+    
+    def rollback(self, count, start_dir):
+        """Forget every member after the first count; the next member is written at start_dir"""
+        dropped = self.filelist[count:]
+        del self.filelist[count:]
+        for info in dropped:
+            if self.NameToInfo.get(info.filename) is info:
+                del self.NameToInfo[info.filename]
+        # A retried component may have added the same name before
+        for info in reversed(self.filelist):
+            self.NameToInfo.setdefault(info.filename, info)
+        self.start_dir = start_dir
+
+class ArchiveSink:
+    def __init__(self, path, archive_format):
+        """
+        Args:
+            path: Archive file to create
+            archive_format: "zip" or "tar.gz"
+        """
+        if archive_format not in ARCHIVE_EXTENSIONS:
+            raise ValueError(f"Unknown archive format: {archive_format}")
+        self.path = path
+        self.archive_format = archive_format
+        self.lock = threading.Lock()  # One member is written at a time
+        self.entries = []             # Manifest entries, one per component
+        self.created = datetime.now().isoformat(timespec='seconds')
+        self.closed = None
+        self.marker = path + OPEN_SUFFIX
+        self.tail_start = 0           # Where the manifest and end records start (after the last member)
+        self.tail_count = 0           # ZIP members before the manifest
+        
+        open(self.marker, 'w').close()
+        # One handle for the whole run
+        self.file = open(path, 'wb')
+        self.zip = _ZipWriter(self.file, 'w', compression=zipfile.ZIP_DEFLATED) if archive_format == "zip" else None
+        self._write_tail()
+    
+    def add(self, name, write_func):
+        """
+        Add one member, streamed by write_func(stream)
+        If write_func fails the member is left out and the error is raised.
+        Returns: dict with name, bytes and sha256 of the member
+        """
+        with self.lock:
+            self._rewind_tail()
+            try:
+                if self.zip:
+                    with self.zip.open(name, 'w') as member:
+                        stream = _HashingStream(member)
+                        write_func(stream)
+                else:
+                    # tar needs the size up front, so the member is built in memory first
+                    buffer = io.BytesIO()
+                    stream = _HashingStream(buffer)
+                    write_func(stream)
+                    self._append_tar_member(name, buffer.getvalue())
+            except BaseException:
+                # Written over by the manifest (and the next member)
+                self._rewind_tail()
+                raise
+            finally:
+                self._write_tail()
+        
+        return {'name': name, 'bytes': stream.size, 'sha256': stream.sha256.hexdigest()}
+    
+    def add_bytes(self, name, data):
+        return self.add(name, lambda stream: stream.write(data))
+    
+    def _append_tar_member(self, name, data):
+        """Append one tar member as its own gzip stream (concatenated gzip members read as one)"""
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        padding = (tarfile.BLOCKSIZE - len(data) % tarfile.BLOCKSIZE) % tarfile.BLOCKSIZE
+        
+        with gzip.GzipFile(fileobj=self.file, mode='wb') as gz:
+            gz.write(info.tobuf(format=tarfile.PAX_FORMAT))
+            gz.write(data)
+            gz.write(b"\0" * padding)
+    
+    def _rewind_tail(self):
+        """Go back to the end of the last member, so the next write replaces the manifest"""
+        if self.zip:
+            self.zip.rollback(self.tail_count, self.tail_start)
+        else:
+            self.file.seek(self.tail_start)
+    
+    def _write_tail(self):
+        """Write the manifest and the end records behind the last member"""
+        manifest = json.dumps({
+            'created': self.created,
+            'closed': self.closed,
+            'components': self.entries,
+        }, indent=2, ensure_ascii=False).encode('utf-8')
+        
+        if self.zip:
+            self.tail_count, self.tail_start = len(self.zip.filelist), self.zip.start_dir
+            self.zip.writestr(MANIFEST_NAME, manifest)
+            self.zip.write_directory()
+        else:
+            self.tail_start = self.file.tell()
+            self._append_tar_member(MANIFEST_NAME, manifest)
+            _write_tar_end(self.file)
+            self.file.truncate()
+        self.file.flush()
+    
+    def record(self, entry):
+        """Add a component to the manifest"""
+        with self.lock:
+            self.entries.append(entry)
+            self._rewind_tail()
+            self._write_tail()
+    
+    def close(self):
+        """Write the final manifest and close the file"""
+        with self.lock:
+            self.closed = datetime.now().isoformat(timespec='seconds')
+            self._rewind_tail()
+            self._write_tail()
+            if self.zip:
+                self.zip.close()
+            self.file.close()
+            os.remove(self.marker)
@@ -0,0 +1,300 @@
+"""
+asyncio Sheets client for high-concurrency modes
+One event loop keeps many requests and downloads in flight instead of one per
+thread. It covers reads, batch reads, writes, validation lookup, PDF export and
+sheet duplication, and shares the service-account pool, byte accounting and
+read options with GoogleSheetsManager.
+
+Tk code talks to it through AsyncBridge: the loop runs in a background thread,
+coroutines are submitted from any thread and results are delivered back on the
+Tk thread with widget.after().
+
+Requires aiohttp (pip install aiohttp); without it the bridge reports itself
+unavailable and callers keep using the threaded client.
+"""
+from utils.google_sheets import (
+    sheets_manager, SheetsAPIError, SHEETS_API_URL, GZIP_HEADERS
+)
+from utils.cancellation import OperationCancelled
+from utils import read_options
+from urllib.parse import quote
+import asyncio
+import concurrent.futures
+import json
+import threading
+
+MAX_IN_FLIGHT = 32  # Concurrent requests per client
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+class AsyncSheetsClient:
+    def __init__(self, manager=sheets_manager, max_in_flight=MAX_IN_FLIGHT):
+        """
+        Args:
+            manager: GoogleSheetsManager providing the account pool and statistics
+            max_in_flight: Requests allowed in flight at once
+        """
+        self.manager = manager
+        self.max_in_flight = max_in_flight
+        self.session = None
+        self.slots = None
+        self.token_locks = {}  # account path -> asyncio.Lock (one token refresh at a time)
+    
+    async def start(self):
+        """Open the HTTP session (must run inside the event loop)"""
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is not installed")
+        if self.session is None:
+            self.slots = asyncio.Semaphore(self.max_in_flight)
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+            self.session = aiohttp.ClientSession(connector=connector, headers=GZIP_HEADERS)
+    
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+    
+    async def _auth_header(self, account):
+        """Bearer header for an account, refreshing its token off the loop when needed"""
+        lock = self.token_locks.setdefault(account.path, asyncio.Lock())
+        async with lock:
+            if not account.credentials.valid:
+                from google.auth.transport.requests import Request
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, account.credentials.refresh, Request())
+        return {'Authorization': f"Bearer {account.credentials.token}"}
+    
+    async def _acquire(self, kind):
+        """Pooled account with the most quota left (waits without blocking the loop)"""
+        while True:
+            account, wait = self.manager.pool.pick(kind)
+            if account:
+                return account
+            await asyncio.sleep(wait)
+    
+    async def _request(self, kind, method, url, label=None, **kwargs):
+        """
+        Send a request through the account pool (429 quarantines the account and retries on the next)
+        Args:
+            kind: 'reads' or 'writes' quota
+            label: Read label for byte accounting (None for writes)
+        Returns: (status, body bytes)
+        """
+        await self.start()
+        async with self.slots:
+            attempts = max(1, len(self.manager.pool))
+            for attempt in range(attempts):
+                account = await self._acquire(kind)
+                headers = await self._auth_header(account)
+                async with self.session.request(method, url, headers=headers, **kwargs) as response:
+                    body = await response.read()
+                    status = response.status
+                    wire_bytes = int(response.headers.get('Content-Length') or len(body))
+                
+                if status == 429 and attempt < attempts - 1:
+                    self.manager.pool.report_rate_limited(account)
+                    continue
+                if status == 429:
+                    self.manager.pool.report_rate_limited(account)
+                else:
+                    self.manager.pool.report_success(account)
+                break
+        
+        if label:
+            self.manager._account_read(label, wire_bytes, len(body))
+        return status, body
+    
+    def _raise_for_status(self, status, body):
+        if status != 200:
+            raise SheetsAPIError(status, body.decode('utf-8', errors='replace')[:500])
+    
+    def _a1(self, sheet_title, cell_range=None):
+        a1_range = self.manager._quote_sheet_name(sheet_title)
+        return f"{a1_range}!{cell_range}" if cell_range else a1_range
+    
+    async def get_values(self, spreadsheet_id, sheet_title, cell_range, options=read_options.EXPORT):
+        """Read one range (same shape as GoogleSheetsManager.get_values)"""
+        a1_range = self._a1(sheet_title, cell_range)
+        url = f"{SHEETS_API_URL}/{spreadsheet_id}/values/{quote(a1_range, safe='')}"
+        status, body = await self._request('reads', 'GET', url, options.label, params=options.params())
+        self._raise_for_status(status, body)
+        return json.loads(body).get('values', [])
+    
+    async def batch_get(self, spreadsheet_id, a1_ranges, options=read_options.EXPORT):
+        """
+        Read several ranges in one request
+        Args:
+            a1_ranges: Ranges including the sheet name ('Sheet'!A1:B2)
+        Returns: One list of rows per range, in order
+        """
+        params = [('ranges', a1_range) for a1_range in a1_ranges]
+        params += [
+            ('valueRenderOption', options.value_render),
+            ('majorDimension', options.major_dimension),
+            ('fields', 'valueRanges.values'),
+        ]
+        url = f"{SHEETS_API_URL}/{spreadsheet_id}/values:batchGet"
+        status, body = await self._request('reads', 'GET', url, options.label, params=params)
+        self._raise_for_status(status, body)
+        value_ranges = json.loads(body).get('valueRanges', [])
+        return [value_range.get('values', []) for value_range in value_ranges]
+    
+    async def get_cell_value(self, spreadsheet_id, sheet_title, cell):
+        values = await self.get_values(spreadsheet_id, sheet_title, cell, read_options.CELL)
+        return values[0][0] if values and values[0] else None
+    
+    async def update_values(self, spreadsheet_id, sheet_title, cell_range, values):
+        """Write values as if typed by a user"""
+        a1_range = self._a1(sheet_title, cell_range)
+        url = f"{SHEETS_API_URL}/{spreadsheet_id}/values/{quote(a1_range, safe='')}"
+        self.manager.count_api_call('writes')
+        status, body = await self._request(
+            'writes', 'PUT', url,
+            params={'valueInputOption': 'USER_ENTERED', 'fields': 'updatedCells'},
+            json={'values': values}
+        )
+        self._raise_for_status(status, body)
+    
+    async def get_validations(self, spreadsheet_id, sheet_title):
+        """List validations of a sheet (see GoogleSheetsManager.parse_validations)"""
+        url = f"{SHEETS_API_URL}/{spreadsheet_id}"
+        params = {
+            'ranges': self._a1(sheet_title),
+            'fields': 'sheets(properties.sheetId,data.rowData.values.dataValidation)'
+        }
+        status, body = await self._request('reads', 'GET', url, "validations", params=params)
+        self._raise_for_status(status, body)
+        return self.manager.parse_validations(json.loads(body))
+    
+    async def read_dropdown(self, spreadsheet_id, sheet_title, cell):
+        """Options of a dropdown cell: validation lookup, then its source range (unique, in order)"""
+        validations = await self.get_validations(spreadsheet_id, sheet_title)
+        range_ref = next((v['range'] for v in validations if v['cell'] == cell), None)
+        if not range_ref:
+            return []
+        
+        source_sheet, range_part = self.manager.parse_range_reference(range_ref)
+        try:
+            rows = await self.get_values(
+                spreadsheet_id, source_sheet or sheet_title, range_part, read_options.VALIDATION_SOURCE
+            )
+        except SheetsAPIError as e:
+            if "exceeds grid limits" not in str(e).lower():
+                raise
+            # Open-ended column: same limit as the threaded fallback
+            start = range_part.split(':')[0]
+            column = ''.join(c for c in start if c.isalpha())
+            rows = await self.get_values(
+                spreadsheet_id, source_sheet or sheet_title, f"{start}:{column}1000", read_options.VALIDATION_SOURCE
+            )
+        
+        return self.manager.unique_values(rows)
+    
+    async def export_pdf(self, spreadsheet_id, sheet_id, cell_range, sink):
+        """Stream a range as PDF into a binary file object"""
+        await self.start()
+        export_url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export"
+        params = {'format': 'pdf', 'gid': str(sheet_id), 'range': cell_range}
+        self.manager.count_api_call('exports')
+        
+        async with self.slots:
+            account = await self._acquire('reads')
+            headers = await self._auth_header(account)
+            async with self.session.get(export_url, params=params, headers=headers) as response:
+                if response.status == 429:
+                    self.manager.pool.report_rate_limited(account)
+                if response.status != 200:
+                    raise SheetsAPIError(response.status, "Export failed")
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    sink.write(chunk)
+                    self.manager.count_api_call_bytes(len(chunk))
+    
+    async def duplicate_sheet(self, spreadsheet_id, sheet_id, new_title):
+        """
+        Duplicate a tab inside the spreadsheet
+        Returns: Properties of the new sheet (sheetId, title, ...)
+        """
+        request = {'duplicateSheet': {'sourceSheetId': sheet_id, 'newSheetName': new_title}}
+        reply = await self._batch_update(spreadsheet_id, [request])
+        return reply['replies'][0]['duplicateSheet']['properties']
+    
+    async def delete_sheet(self, spreadsheet_id, sheet_id):
+        await self._batch_update(spreadsheet_id, [{'deleteSheet': {'sheetId': sheet_id}}])
+    
+    async def _batch_update(self, spreadsheet_id, requests):
+        url = f"{SHEETS_API_URL}/{spreadsheet_id}:batchUpdate"
+        self.manager.count_api_call('writes')
+        status, body = await self._request('writes', 'POST', url, json={'requests': requests})
+        self._raise_for_status(status, body)
+        return json.loads(body)
+
+class AsyncBridge:
+    """Runs one event loop in a background thread for Tk screens and worker threads"""
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.client = None
+        self.lock = threading.Lock()
+    
+    @property
+    def available(self):
+        return aiohttp is not None
+    
+    def start(self):
+        """Start the loop thread (once)"""
+        with self.lock:
+            if self.loop:
+                return
+            if not self.available:
+                raise RuntimeError("aiohttp is not installed")
+            self.loop = asyncio.new_event_loop()
+            self.client = AsyncSheetsClient()
+            self.thread = threading.Thread(target=self.loop.run_forever, name="async-sheets", daemon=True)
+            self.thread.start()
+    
+    def submit(self, coroutine_function, *args):
+        """
+        Schedule coroutine_function(client, *args) on the loop from any thread
+        Returns: concurrent.futures.Future
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine_function(self.client, *args), self.loop)
+    
+    def call(self, coroutine_function, *args, cancel_token=None):
+        """Run on the loop and wait for the result (cancellable from the calling thread)"""
+        future = self.submit(coroutine_function, *args)
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except concurrent.futures.TimeoutError:
+                if cancel_token and cancel_token.cancelled:
+                    future.cancel()
+                    raise OperationCancelled("Cancelled by user")
+    
+    def deliver(self, widget, future, on_success, on_error=None):
+        """Call on_success(result) or on_error(exception) on the Tk thread when the future is done"""
+        def done(completed):
+            try:
+                result = completed.result()
+            except Exception as e:
+                if on_error:
+                    widget.after(0, lambda: on_error(e))
+                return
+            widget.after(0, lambda: on_success(result))
+        future.add_done_callback(done)
+    
+    def stop(self):
+        """Close the client and stop the loop"""
+        with self.lock:
+            if not self.loop:
+                return
+            asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result(timeout=5)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+            self.loop = None
+
+# Global instance
+async_bridge = AsyncBridge()
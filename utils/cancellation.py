@@ -0,0 +1,110 @@
+"""
+Cooperative cancellation for long-running automation work
+A CancellationToken interrupts sleeps and polling immediately and lets
+blocking network calls be abandoned as soon as the user presses Stop.
+"""
+import threading
+import time
+
+class OperationCancelled(Exception):
+    """Raised inside the automation thread when the run has been cancelled"""
+    pass
+
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._pending = []  # Worker threads of calls abandoned on cancel
+    
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+    
+    def cancel(self):
+        """Cancel the run and abort any registered in-flight transfers"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+            self._callbacks = []
+        
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[DEBUG] Cancel callback failed: {e}")
+    
+    def check(self):
+        """Raise OperationCancelled if the token has been cancelled"""
+        if self._event.is_set():
+            raise OperationCancelled("Cancelled by user")
+    
+    def sleep(self, seconds):
+        """Sleep that wakes up immediately on cancel"""
+        if self._event.wait(seconds):
+            raise OperationCancelled("Cancelled by user")
+    
+    def on_cancel(self, callback):
+        """
+        Register a callback run on cancel (e.g. closing an HTTP response)
+        Returns a function that unregisters the callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                registered = True
+            else:
+                registered = False
+        
+        if not registered:
+            callback()
+        
+        def remove():
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+        return remove
+    
+    def run(self, func, *args, **kwargs):
+        """
+        Run a blocking call in a helper thread and stop waiting for it on cancel
+        The call itself keeps running in the background until it returns;
+        use wait_for_pending() before touching the same cells again.
+        """
+        self.check()
+        
+        result = {}
+        done = threading.Event()
+        
+        def target():
+            try:
+                result['value'] = func(*args, **kwargs)
+            except BaseException as e:
+                result['error'] = e
+            finally:
+                done.set()
+        
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        
+        while not done.wait(0.1):
+            if self._event.is_set():
+                with self._lock:
+                    self._pending.append(thread)
+                raise OperationCancelled("Cancelled by user")
+        
+        if 'error' in result:
+            raise result['error']
+        return result.get('value')
+    
+    def wait_for_pending(self, timeout=30):
+        """Wait (bounded) for calls abandoned on cancel to finish"""
+        with self._lock:
+            pending = list(self._pending)
+            self._pending = []
+        
+        deadline = time.time() + timeout
+        for thread in pending:
+            thread.join(max(0, deadline - time.time()))
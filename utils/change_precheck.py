@@ -0,0 +1,96 @@
+"""
+Spreadsheet-modification precheck
+Before a run, compare the spreadsheet's Drive version and a hash of the
+dropdown source values and run settings with the state recorded right after
+the last fully successful run. If nothing changed, the previous outputs are
+still current and the whole run can be skipped.
+"""
+from utils.google_sheets import sheets_manager
+from utils.run_history import run_history, PARAM_KEYS
+from utils.archive_output import archive_members
+import hashlib
+import json
+import os
+
+def fingerprint_scope(job):
+    """What a fingerprint covers: spreadsheet, sheet and menu (or sweep levels)"""
+    if job.get('sweep_levels'):
+        target = "sweep:" + ",".join(job['sweep_levels'])
+    else:
+        target = f"menu:{job.get('menu_value')}"
+    return f"{job['spreadsheet_id']}|{job['sheet_name']}|{target}"
+
+def read_fingerprint(job, cancel_token=None):
+    """
+    Read the current state of the spreadsheet for a job
+    Returns: dict with version, modified_time and source_hash
+    """
+    metadata = sheets_manager.get_drive_metadata(job['spreadsheet_id'], cancel_token)
+    
+    # The dropdown that decides what gets exported (B6, or the top sweep level), read
+    # from the job's spreadsheet (not necessarily the one open in the app)
+    control_cell = job['sweep_levels'][0] if job.get('sweep_levels') else job['dropdown_cell']
+    spreadsheet = sheets_manager.open_spreadsheet_by_id(job['spreadsheet_id'])
+    worksheet = sheets_manager.get_worksheet(job['sheet_name'], spreadsheet)
+    options = sheets_manager.read_dropdown_values_from_cell(worksheet, control_cell, job['sheet_name']) if worksheet else []
+    
+    source = {
+        'options': options,
+        'menu_value': job.get('menu_value'),
+        'sweep_levels': job.get('sweep_levels'),
+        'params': {key: job.get(key) for key in PARAM_KEYS},
+    }
+    return {
+        'version': str(metadata.get('version')),
+        'modified_time': metadata.get('modifiedTime'),
+        'source_hash': hashlib.sha256(json.dumps(source, sort_keys=True, default=str).encode('utf-8')).hexdigest(),
+    }
+
+def output_exists(path, archives=None):
+    """
+    True if an output file exists
+    A path inside an archive (<archive path>/<member>) counts if the archive has that member.
+    Args:
+        archives: Dict caching archive path -> member names over several calls
+    """
+    if os.path.isfile(path):
+        return True
+    archive = path
+    while archive and not os.path.exists(archive):
+        parent = os.path.dirname(archive)
+        if parent == archive:
+            return False
+        archive = parent
+    if not archive or not os.path.isfile(archive):
+        return False
+    
+    archives = {} if archives is None else archives
+    if archive not in archives:
+        archives[archive] = archive_members(archive)
+    return os.path.relpath(path, archive).replace(os.sep, '/') in archives[archive]
+
+def precheck(job, cancel_token=None):
+    """
+    Decide whether a job can be skipped
+    Returns: (unchanged, message)
+    """
+    previous = run_history.get_fingerprint(fingerprint_scope(job))
+    if not previous:
+        return False, "No earlier successful run to compare with"
+    
+    current = read_fingerprint(job, cancel_token)
+    if current['version'] != previous['drive_version']:
+        return False, f"Spreadsheet changed since {previous['recorded_at']} (modified {current['modified_time']})"
+    if current['source_hash'] != previous['source_hash']:
+        return False, "Dropdown values or run settings changed since the last successful run"
+    
+    archives = {}
+    missing = [path for path in run_history.output_paths(previous['run_ids']) if not output_exists(path, archives)]
+    if missing:
+        return False, f"{len(missing)} previous output file(s) are missing"
+    
+    return True, f"Nothing changed since the successful run at {previous['recorded_at']}; previous outputs are current"
+
+def remember(job, run_ids, cancel_token=None):
+    """Record the spreadsheet state after a fully successful run (after the dropdowns were restored)"""
+    run_history.save_fingerprint(fingerprint_scope(job), read_fingerprint(job, cancel_token), run_ids)
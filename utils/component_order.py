@@ -0,0 +1,111 @@
+"""
+Cost-aware component ordering
+Predicts how long each component takes from its learned recalculation time
+and the row count and file size of its past exports. Parallel runs start
+with the most expensive components (longest first), so a few slow ones do
+not stretch the tail; incremental runs start with the components whose data
+changed, so fresh data arrives first. Component indices (used in sequential
+file names) always stay the dropdown positions.
+"""
+from utils.latency_model import latency_model
+from utils.run_history import run_history
+from utils.run_planner import estimate_component, PDF_EXPORT_SECONDS, API_ROUND_TRIP
+import statistics
+
+ORDER_AUTO = "auto"
+ORDER_DROPDOWN = "dropdown"
+ORDER_LONGEST = "longest"
+ORDER_CHANGED = "changed"
+
+ORDER_LABELS = {
+    ORDER_AUTO: "Automatic",
+    ORDER_DROPDOWN: "Dropdown order",
+    ORDER_LONGEST: "Longest first",
+    ORDER_CHANGED: "Changed first",
+}
+
+MAX_SIZE_FACTOR = 10.0  # Cap for how much larger than usual a component's export is assumed to be
+
+def resolve_policy(job):
+    """
+    Ordering policy for a job
+    Automatic: changed first for incremental runs, longest first for parallel runs,
+    dropdown order otherwise.
+    """
+    policy = job.get('component_order') or ORDER_AUTO
+    if policy != ORDER_AUTO:
+        return policy
+    if job.get('changed_components') is not None:
+        return ORDER_CHANGED
+    if job.get('replicas', 1) > 1:
+        return ORDER_LONGEST
+    return ORDER_DROPDOWN
+
+def predict_costs(job, spreadsheet_id):
+    """
+    Predicted seconds per component
+    Recalculation time comes from the latency model; range reads and exports are
+    scaled by the component's past row count and output size relative to the sheet's typical one.
+    """
+    sheet_key = latency_model.sheet_key(spreadsheet_id, job['sheet_name'])
+    profile = run_history.component_profile(spreadsheet_id, job['sheet_name'])
+    
+    known_rows = [entry['rows'] for entry in profile.values() if entry['rows']]
+    known_bytes = [entry['output_bytes'] for entry in profile.values() if entry['output_bytes']]
+    typical_rows = statistics.median(known_rows) if known_rows else None
+    typical_bytes = statistics.median(known_bytes) if known_bytes else None
+    
+    export_seconds = 0.0
+    if "PDF" in job['file_formats']:
+        export_seconds += PDF_EXPORT_SECONDS
+    if any(fmt != "PDF" for fmt in job['file_formats']):
+        export_seconds += API_ROUND_TRIP
+    
+    costs = {}
+    for component in job['components']:
+        seconds = estimate_component(job, sheet_key, component)['seconds']
+        past = profile.get(component, {})
+        factors = []
+        if past.get('rows') and typical_rows:
+            factors.append(past['rows'] / typical_rows)
+        if past.get('output_bytes') and typical_bytes:
+            factors.append(past['output_bytes'] / typical_bytes)
+        if factors:
+            size = min(MAX_SIZE_FACTOR, sum(factors) / len(factors))
+            seconds += (size - 1) * export_seconds
+        costs[component] = seconds
+    return costs, profile
+
+def ordered_work(job, log=print):
+    """
+    Components in processing order
+    Returns: list of (index, component) with the dropdown index
+             (job['component_indices'] when the job covers part of the dropdown)
+    """
+    indices = job.get('component_indices') or {}
+    items = [(indices.get(component, i), component) for i, component in enumerate(job['components'], 1)]
+    policy = resolve_policy(job)
+    if policy == ORDER_DROPDOWN or len(items) < 2:
+        return items
+    
+    try:
+        costs, profile = predict_costs(job, job.get('spreadsheet_id'))
+    except Exception as e:
+        log(f"Warning: Could not predict component costs ({e}); using dropdown order")
+        return items
+    
+    longest = sorted(items, key=lambda item: -costs[item[1]])
+    if policy == ORDER_LONGEST:
+        log(f"Component order: longest first (predicted {costs[longest[0][1]]:.1f}s to "
+            f"{costs[longest[-1][1]]:.1f}s per component)")
+        return longest
+    
+    # Without a change list, anything that did not succeed in the latest run counts as changed
+    changed = job.get('changed_components')
+    if changed is None:
+        changed = [component for component in job['components'] if not profile.get(component, {}).get('ok_last_run')]
+    changed = set(changed)
+    base = longest if job.get('replicas', 1) > 1 else items
+    ordered = [item for item in base if item[1] in changed] + [item for item in base if item[1] not in changed]
+    log(f"Component order: changed first ({len(changed & set(job['components']))} changed)")
+    return ordered
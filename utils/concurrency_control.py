@@ -0,0 +1,181 @@
+"""
+Adaptive concurrency for the parallel export modes (AIMD)
+Decides how many spreadsheet copies may recalculate at the same time. The
+limit starts low, grows while components finish at their usual speed without
+throttling, and is halved when a 429 comes back or recalculations slow down.
+The number of active workers settles near what the quota and the
+recalculation engine can take, without tuning the copy count by hand.
+"""
+from utils.retry_policy import FAILURE_QUOTA, FAILURE_TIMEOUT, FAILURE_NO_CHANGE
+import threading
+import time
+
+INITIAL_LIMIT = 2       # Active workers at the start of a run
+DECREASE_FACTOR = 0.5   # Multiplicative backoff on throttling or slowdown
+SLOW_FACTOR = 2.0       # Recalculation this much slower than usual counts as congestion
+HEALTHY_FACTOR = 1.3    # Up to this much slower still counts as healthy (in between: hold)
+MAX_DECISIONS = 200     # Limit changes kept for the run metrics
+
+SIGNAL_LABELS = {
+    'healthy': "healthy",
+    'hold': "slower than usual",
+    'slow': "slow recalculation",
+    'throttled': "throttled",
+    'failed': "failed",
+}
+
+class ConcurrencyController:
+    def __init__(self, max_limit, log=print, initial=INITIAL_LIMIT):
+        """
+        Args:
+            max_limit: Upper bound (number of spreadsheet copies / workers)
+            initial: Active workers before any component has finished
+        """
+        self.max_limit = max(1, max_limit)
+        self.limit = float(max(1, min(initial, self.max_limit)))
+        self.log = log
+        self.condition = threading.Condition()
+        self.active = 0
+        self.slow_start = True   # Grow by one per healthy component until the first backoff
+        self.backoff_at = 0.0    # Components started before the last backoff cannot cause another one
+        self.started = time.time()
+        self.changed = self.started
+        self.limit_seconds = 0.0  # Limit integrated over time (for the average)
+        self.initial = self.allowed()
+        self.peak = self.initial
+        self.increases = 0
+        self.decreases = 0
+        self.signals = {signal: 0 for signal in SIGNAL_LABELS}
+        self.decisions = []      # {'t', 'limit', 'reason'} per limit change
+    
+    def allowed(self):
+        """Workers currently allowed to run a component"""
+        return int(self.limit)
+    
+    def acquire(self, cancel_token):
+        """Wait (cancellably) until a worker slot is free and take it"""
+        with self.condition:
+            while self.active >= self.allowed():
+                cancel_token.check()
+                self.condition.wait(0.5)
+            self.active += 1
+    
+    def release(self, outcome=None):
+        """Free a worker slot and learn from the component's outcome (None: nothing was run)"""
+        with self.condition:
+            self.active -= 1
+            if outcome is not None:
+                self._observe(outcome)
+            self.condition.notify_all()
+    
+    def observe(self, outcome):
+        """Learn from an outcome reported by a worker that does not use the slots (worker processes)"""
+        with self.condition:
+            self._observe(outcome)
+            self.condition.notify_all()
+    
+    @staticmethod
+    def classify(outcome):
+        """Congestion signal of one component outcome"""
+        if outcome.get('throttled') or outcome.get('kind') == FAILURE_QUOTA:
+            return 'throttled'
+        if outcome.get('kind') in (FAILURE_TIMEOUT, FAILURE_NO_CHANGE):
+            return 'slow'
+        if not outcome.get('success'):
+            # Other errors say nothing about load
+            return 'failed'
+        
+        expected = outcome.get('expected')
+        recalc = outcome.get('recalc')
+        if expected and recalc is not None:
+            ratio = recalc / expected
+            if ratio >= SLOW_FACTOR:
+                return 'slow'
+            if ratio > HEALTHY_FACTOR:
+                return 'hold'
+        return 'healthy'
+    
+    def _observe(self, outcome):
+        signal = self.classify(outcome)
+        self.signals[signal] += 1
+        
+        if signal == 'healthy':
+            if self.slow_start:
+                self._set(self.limit + 1, "slow start")
+            else:
+                # Additive increase: about one more worker per round of healthy components
+                self._set(self.limit + 1 / self.allowed(), SIGNAL_LABELS[signal])
+        
+        elif signal in ('throttled', 'slow'):
+            # Components already running at the last backoff saw the same congestion
+            if outcome.get('started', time.time()) < self.backoff_at:
+                return
+            self.slow_start = False
+            self.backoff_at = time.time()
+            self._set(self.limit * DECREASE_FACTOR, SIGNAL_LABELS[signal])
+    
+    def _set(self, limit, reason):
+        now = time.time()
+        before = self.allowed()
+        self.limit_seconds += before * (now - self.changed)
+        self.changed = now
+        self.limit = max(1.0, min(float(self.max_limit), limit))
+        
+        after = self.allowed()
+        if after == before:
+            return
+        if after > before:
+            self.increases += 1
+            self.peak = max(self.peak, after)
+        else:
+            self.decreases += 1
+        if len(self.decisions) < MAX_DECISIONS:
+            self.decisions.append({'t': round(now - self.started, 1), 'limit': after, 'reason': reason})
+        self.log(f"Concurrency {before} → {after} ({reason})")
+    
+    def summary(self):
+        """Controller metrics for the run report"""
+        with self.condition:
+            now = time.time()
+            elapsed = now - self.started
+            limit_seconds = self.limit_seconds + self.allowed() * (now - self.changed)
+            return {
+                'max': self.max_limit,
+                'initial': self.initial,
+                'final': self.allowed(),
+                'peak': self.peak,
+                'average': round(limit_seconds / elapsed, 2) if elapsed > 0 else float(self.allowed()),
+                'increases': self.increases,
+                'decreases': self.decreases,
+                'signals': dict(self.signals),
+                'decisions': list(self.decisions),
+            }
+
+class GatedWork:
+    """(index, component) iterator that waits for a free worker slot before handing out a component"""
+    def __init__(self, work, controller, cancel_token):
+        self.work = iter(work)
+        self.controller = controller
+        self.cancel_token = cancel_token
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        self.controller.acquire(self.cancel_token)
+        try:
+            return next(self.work)
+        except StopIteration:
+            self.controller.release()
+            raise
+
+def describe(summary):
+    """One log line for the controller metrics"""
+    backoffs = ", ".join(
+        f"{SIGNAL_LABELS[signal]} {summary['signals'].get(signal, 0)}" for signal in ('throttled', 'slow')
+    )
+    return (
+        f"Concurrency: average {summary['average']:.1f} of {summary['max']} workers "
+        f"(peak {summary['peak']}, final {summary['final']}), "
+        f"{summary['increases']} increases, {summary['decreases']} backoffs ({backoffs})"
+    )
@@ -20,6 +20,12 @@ WINDOW_SIZE = "800x600"
 # Paths
 DOWNLOADS_DIR = os.path.join(BASE_DIR, "downloads")
 CREDENTIALS_FILE = os.path.join(BASE_DIR, "credentials.json")
+CREDENTIALS_DIR = os.path.join(BASE_DIR, "credentials")  # Extra service accounts (*.json) for the pool
+LATENCY_STATS_FILE = os.path.join(BASE_DIR, "latency_stats.json")
+RUN_HISTORY_DB = os.path.join(BASE_DIR, "run_history.db")
+REPLICA_LEDGER_FILE = os.path.join(BASE_DIR, "replica_ledger.json")  # Spreadsheet copies still to delete
+WORK_QUEUE_DB = os.path.join(BASE_DIR, "work_queue.db")  # Component tasks for worker processes
+JOB_SERVICE_DB = os.path.join(BASE_DIR, "job_service.db")  # Queued jobs and schedules of the local job service
 
 # Ensure downloads directory exists
 os.makedirs(DOWNLOADS_DIR, exist_ok=True)
@@ -30,6 +36,17 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive'
 ]
 
+# Default Google Sheets API quotas (requests per minute)
+READ_QUOTA_PER_USER = 60
+WRITE_QUOTA_PER_USER = 60
+READ_QUOTA_PER_PROJECT = 300
+WRITE_QUOTA_PER_PROJECT = 300
+
+# Local job service (HTTP API, localhost only)
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_MAX_RUNNING = 2  # Jobs running at the same time (on different sheets)
+
 # UI Colors (CustomTkinter themes)
 COLORS = {
     "primary": "#1f6aa5",
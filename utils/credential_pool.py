@@ -0,0 +1,140 @@
+"""
+Service-account pool
+Spreads Sheets API requests across several service accounts so every account
+adds its own per-user quota. Each request goes to the account with the most
+quota left in the current minute; an account that gets a 429 is quarantined
+for a while (longer if it keeps getting them).
+Every account needs access to the spreadsheet (share it with each account's email).
+"""
+from utils.config import (
+    CREDENTIALS_FILE, CREDENTIALS_DIR, READ_QUOTA_PER_USER, WRITE_QUOTA_PER_USER
+)
+from collections import deque
+import glob
+import os
+import threading
+import time
+
+QUOTA_WINDOW = 60            # Seconds the per-user quota is counted over
+QUARANTINE_SECONDS = 60      # First quarantine after a 429
+MAX_QUARANTINE_SECONDS = 300
+
+QUOTAS = {'reads': READ_QUOTA_PER_USER, 'writes': WRITE_QUOTA_PER_USER}
+
+def find_credential_files():
+    """credentials.json plus every *.json in the credentials folder"""
+    paths = []
+    if os.path.exists(CREDENTIALS_FILE):
+        paths.append(CREDENTIALS_FILE)
+    paths.extend(sorted(glob.glob(os.path.join(CREDENTIALS_DIR, "*.json"))))
+    return paths
+
+class ServiceAccount:
+    def __init__(self, path, credentials):
+        self.path = path
+        self.credentials = credentials
+        self.email = getattr(credentials, 'service_account_email', os.path.basename(path))
+        self.session = None
+        self.calls = {kind: deque() for kind in QUOTAS}  # request times in the quota window
+        self.quarantined_until = 0
+        self.strikes = 0  # 429s in a row
+    
+    def get_session(self):
+        """Authorized HTTP session for this account (keeps connections alive)"""
+        if self.session is None:
+            from google.auth.transport.requests import AuthorizedSession
+            self.session = AuthorizedSession(self.credentials)
+        return self.session
+    
+    def remaining(self, kind, now):
+        """Requests of this kind left in the current quota window"""
+        calls = self.calls[kind]
+        while calls and calls[0] <= now - QUOTA_WINDOW:
+            calls.popleft()
+        return QUOTAS[kind] - len(calls)
+
+class CredentialPool:
+    def __init__(self):
+        self.accounts = []
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.accounts)
+    
+    def load(self, paths, scopes):
+        """
+        Load service-account files (unreadable files are skipped)
+        Returns: Number of accounts loaded
+        """
+        from google.oauth2.service_account import Credentials
+        
+        accounts = []
+        for path in paths:
+            try:
+                accounts.append(ServiceAccount(path, Credentials.from_service_account_file(path, scopes=scopes)))
+            except Exception as e:
+                print(f"[DEBUG] Skipping service account {path}: {e}")
+        
+        with self.lock:
+            self.accounts = accounts
+        return len(accounts)
+    
+    def pick(self, kind):
+        """
+        Pick the account with the most quota left for a request, without waiting
+        Returns: (account, None), or (None, seconds until the first quarantine ends)
+        """
+        with self.lock:
+            if not self.accounts:
+                raise RuntimeError("No service accounts loaded")
+            now = time.time()
+            available = [account for account in self.accounts if account.quarantined_until <= now]
+            if available:
+                account = max(available, key=lambda account: account.remaining(kind, now))
+                account.calls[kind].append(now)
+                return account, None
+            return None, min(account.quarantined_until for account in self.accounts) - now
+    
+    def acquire(self, kind, cancel_token=None):
+        """
+        Pick the account with the most quota left for a request
+        Waits (cancellably) when every account is quarantined.
+        """
+        while True:
+            account, wait = self.pick(kind)
+            if account:
+                return account
+            
+            print(f"[DEBUG] All service accounts quarantined, waiting {wait:.0f}s")
+            if cancel_token:
+                cancel_token.sleep(wait)
+            else:
+                time.sleep(wait)
+    
+    def report_rate_limited(self, account):
+        """Quarantine an account after a 429 (doubling while the 429s continue)"""
+        with self.lock:
+            account.strikes += 1
+            seconds = min(MAX_QUARANTINE_SECONDS, QUARANTINE_SECONDS * 2 ** (account.strikes - 1))
+            account.quarantined_until = time.time() + seconds
+        print(f"[DEBUG] Rate limited on {account.email}, quarantined for {seconds}s")
+        return seconds
+    
+    def report_success(self, account):
+        if account.strikes:
+            with self.lock:
+                account.strikes = 0
+    
+    def status(self):
+        """Per-account snapshot: email, quota left and quarantine seconds remaining"""
+        with self.lock:
+            now = time.time()
+            return [
+                {
+                    'email': account.email,
+                    'reads_left': account.remaining('reads', now),
+                    'writes_left': account.remaining('writes', now),
+                    'quarantined': max(0, account.quarantined_until - now),
+                }
+                for account in self.accounts
+            ]
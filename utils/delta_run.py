@@ -0,0 +1,113 @@
+"""
+Incremental (delta) runs
+Compares the current B6 option list with the list recorded by the last
+completed run of the same spreadsheet and menu. Only components that are new
+(or have no export on disk yet) are processed; the files of components that
+disappeared from the dropdown are moved into a "_removed" folder, and
+everything else is left alone. Adding five parts to a 500-part menu costs
+five exports.
+"""
+from utils.run_history import run_history
+from utils.change_precheck import output_exists
+from datetime import datetime
+import os
+import shutil
+
+REMOVED_DIR = "_removed"
+
+# Settings that decide what the existing files look like; if one changed, they are stale
+OUTPUT_KEYS = [
+    'start_row', 'start_col', 'end_column', 'save_location', 'file_formats', 'naming_mode', 'output_mode',
+]
+
+def plan_delta(job):
+    """
+    Compare the job's component list with the last completed run of its menu
+    Returns: (plan, None) with the new, removed and unchanged components and the
+             baseline run, or (None, reason) when a full run is needed
+    """
+    baseline = run_history.last_options(job['spreadsheet_id'], job['sheet_name'], job.get('menu_value'))
+    if not baseline:
+        return None, "No completed run of this menu to compare with"
+    
+    changed = [key for key in OUTPUT_KEYS if baseline['params'].get(key) != job.get(key)]
+    if changed:
+        return None, f"Output settings changed since the last run ({', '.join(changed)})"
+    
+    previous = baseline['options']
+    current = job['components']
+    if job.get('naming_mode') == "sequential":
+        # File names are dropdown positions: kept components must not have moved
+        previous_index = {component: i for i, component in enumerate(previous, 1)}
+        moved = [c for i, c in enumerate(current, 1) if c in previous_index and previous_index[c] != i]
+        if moved:
+            return None, f"{len(moved)} component(s) moved in the dropdown and sequential file names would shift"
+    
+    outputs = run_history.latest_outputs(job['spreadsheet_id'], job['sheet_name'], job.get('menu_value'))
+    known = set(previous)
+    archives = {}
+    new, unchanged = [], []
+    for component in current:
+        paths = outputs.get(component)
+        if component in known and paths and all(output_exists(path, archives) for path in paths):
+            unchanged.append(component)
+        else:
+            new.append(component)
+    
+    current_set = set(current)
+    removed = [component for component in previous if component not in current_set]
+    return {
+        'new': new,
+        'removed': removed,
+        'unchanged': unchanged,
+        'baseline': baseline,
+        'removed_paths': {component: outputs.get(component, []) for component in removed},
+    }, None
+
+def archive_removed(removed_paths, log=print):
+    """
+    Move the files of removed components into a dated _removed folder next to them
+    Returns: number of files moved
+    """
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    moved = 0
+    for paths in removed_paths.values():
+        for path in paths:
+            if not os.path.isfile(path):
+                # Already gone, or a member of an archive file (left inside the archive)
+                continue
+            target_dir = os.path.join(os.path.dirname(path), REMOVED_DIR, stamp)
+            os.makedirs(target_dir, exist_ok=True)
+            shutil.move(path, os.path.join(target_dir, os.path.basename(path)))
+            moved += 1
+    if moved:
+        log(f"Archived {moved} file(s) of removed components into {REMOVED_DIR}{os.sep}{stamp}")
+    return moved
+
+def apply_delta(job, log=print):
+    """
+    Narrow a job to the components that need exporting
+    The full list stays in job['all_components'] and every component keeps its
+    dropdown index (for sequential file names).
+    Returns: number of components left to export (all of them when a full run is needed)
+    """
+    plan, reason = plan_delta(job)
+    if plan is None:
+        log(f"Delta run: {reason}; processing all {len(job['components'])} components")
+        return len(job['components'])
+    
+    log(
+        f"Delta run against the run of {plan['baseline']['finished_at']}: "
+        f"{len(plan['new'])} new, {len(plan['removed'])} removed, {len(plan['unchanged'])} unchanged"
+    )
+    if plan['removed']:
+        try:
+            archive_removed(plan['removed_paths'], log)
+        except OSError as e:
+            log(f"Warning: Could not archive files of removed components: {e}")
+    
+    job['component_indices'] = {component: i for i, component in enumerate(job['components'], 1)}
+    job['all_components'] = list(job['components'])
+    job['components'] = plan['new']
+    job['changed_components'] = list(plan['new'])
+    return len(plan['new'])
@@ -0,0 +1,102 @@
+"""
+Background disk-writer stage
+Serialization and file I/O run on their own thread pool so a slow save
+location does not hold up the next Sheets call. The queue is bounded: when
+too many writes are waiting, submit blocks until one finishes (backpressure).
+Queued writes are not cancelled on stop - they are flushed to disk.
+A RowPipe hands rows that are still being read to a writer thread.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+
+MAX_PENDING_WRITES = 4  # Components held in memory while waiting for the disk
+WRITER_THREADS = 2
+PIPE_ROWS = 5000        # Rows a RowPipe holds before the reading side waits
+
+class DiskWriter:
+    def __init__(self, max_pending=MAX_PENDING_WRITES, workers=WRITER_THREADS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="disk-writer")
+        self.slots = threading.BoundedSemaphore(max_pending)
+    
+    def submit(self, func, *args, cancel_token=None):
+        """
+        Queue a write, blocking while the queue is full
+        Returns: Future with the result of func(*args)
+        """
+        while not self.slots.acquire(timeout=0.1):
+            if cancel_token:
+                cancel_token.check()
+        
+        try:
+            future = self.executor.submit(func, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+    
+    def close(self):
+        """Flush and stop the writer threads"""
+        self.executor.shutdown(wait=True)
+
+class RowPipe:
+    """
+    Bounded hand-over of rows from the component loop to a disk-writer thread
+    The reading side waits while the pipe is full (backpressure). If either side
+    stops early the other one gets an error instead of waiting forever.
+    """
+    END = object()
+    
+    def __init__(self, max_rows=PIPE_ROWS):
+        self.queue = queue.Queue(max_rows)
+        self.aborted = threading.Event()   # Reading side stopped before the last row
+        self.closed = threading.Event()    # Writing side stopped taking rows
+    
+    def feed(self, rows, cancel_token=None):
+        """
+        Hand every row to the writer (component loop side)
+        Returns: number of rows handed over
+        """
+        count = 0
+        try:
+            for row in rows:
+                self._put(row, cancel_token)
+                count += 1
+            self._put(self.END, cancel_token)
+        except BaseException:
+            self.aborted.set()
+            raise
+        return count
+    
+    def _put(self, item, cancel_token):
+        while True:
+            if self.closed.is_set():
+                raise BrokenPipeError("The disk writer stopped taking rows")
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if cancel_token:
+                    cancel_token.check()
+    
+    def __iter__(self):
+        """Rows in order (writer side); raises if the reading side stopped early"""
+        try:
+            while True:
+                try:
+                    row = self.queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self.aborted.is_set():
+                        raise BrokenPipeError("Reading the range stopped early")
+                    continue
+                if row is self.END:
+                    return
+                yield row
+        finally:
+            self.close()
+    
+    def close(self):
+        """Stop taking rows (writer side; also when the writer fails before reading any)"""
+        self.closed.set()
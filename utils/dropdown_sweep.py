@@ -0,0 +1,228 @@
+"""
+Multi-level dropdown sweep
+Walks every value of the top dropdown (B3 by default), resolves the dependent
+dropdown levels below it and exports every component of every menu.
+"""
+from utils.google_sheets import sheets_manager
+from utils.cancellation import OperationCancelled
+from utils.latency_model import latency_model
+from utils.report_runner import ComponentReportRunner
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+
+OPTIONS_POLL_GROWTH = 2.0  # Poll interval multiplier while a dependent list has not changed yet
+OPTIONS_POLL_MAX = 4.0     # Longest wait between two reads of a dependent list (seconds)
+
+def parse_level_cells(text):
+    """Parse 'B3, B4, B6' into ['B3', 'B4', 'B6'] (top level first, component cell last)"""
+    return [cell.strip().upper() for cell in text.replace(';', ',').split(',') if cell.strip()]
+
+def clean_folder_name(value):
+    clean_value = "".join(c for c in str(value) if c.isalnum() or c in (' ', '_', '-')).strip()
+    return clean_value.replace(' ', '_') or "menu"
+
+class DropdownSweep:
+    def __init__(self, job, level_cells, cancel_token, log=print, progress=None):
+        """
+        Args:
+            job: Job dict used for every menu (components are resolved per menu)
+            level_cells: Dropdown cells from the top menu down to the component cell
+        """
+        self.job = job
+        self.level_cells = level_cells
+        self.cancel_token = cancel_token
+        self.log = log
+        self.progress = progress
+        self.worksheet = None
+        self.validation_ranges = {}  # cell -> validation source reference
+        self.source_worksheets = {}  # referenced sheet name -> worksheet (cached metadata)
+        self.current_values = {}     # level cell -> value currently set in the sheet
+        self.spreadsheet_id = job.get('spreadsheet_id') or sheets_manager.spreadsheet_id
+        self.executor = ThreadPoolExecutor(max_workers=1)
+    
+    def load_validations(self):
+        """Read the validation rules of all level cells once for the whole sweep"""
+        validations = sheets_manager.detect_data_validations(self.job['sheet_name'])
+        for validation in validations:
+            if validation['cell'] in self.level_cells and validation.get('range'):
+                self.validation_ranges[validation['cell']] = validation['range']
+        
+        missing = [cell for cell in self.level_cells if cell not in self.validation_ranges]
+        if missing:
+            raise ValueError(f"No list validation found for: {', '.join(missing)}")
+    
+    def resolve_source(self, cell):
+        """
+        Resolve the worksheet and range behind a cell's dropdown (cached)
+        Returns: (worksheet, range_part)
+        """
+        sheet_name, range_part = sheets_manager.parse_range_reference(self.validation_ranges[cell])
+        if not sheet_name:
+            return self.worksheet, range_part
+        
+        if sheet_name not in self.source_worksheets:
+            self.source_worksheets[sheet_name] = sheets_manager.get_worksheet(sheet_name)
+        return self.source_worksheets[sheet_name], range_part
+    
+    def prefetch(self):
+        """
+        Start reading everything that does not depend on the live menu state
+        (source worksheet metadata of every level and the top-level option list)
+        Returns: Future resolving to the top-level options
+        """
+        def load():
+            for cell in self.level_cells:
+                self.resolve_source(cell)
+            return self.read_options(self.level_cells[0])
+        return self.executor.submit(load)
+    
+    def read_options(self, cell):
+        """Read the current option list of a dropdown cell"""
+        source_worksheet, range_part = self.resolve_source(cell)
+        values = self.cancel_token.run(sheets_manager._read_range_safe, source_worksheet, range_part)
+        return sheets_manager.unique_values(values)
+    
+    def set_level(self, level, value, previous_child_options):
+        """
+        Set a menu level and wait until the next level's options reflect it
+        Returns: Option list of the next level
+        """
+        cell = self.level_cells[level]
+        child_cell = self.level_cells[level + 1]
+        
+        if self.current_values.get(cell) == value:
+            return previous_child_options
+        
+        if not sheets_manager.set_cell_value(self.worksheet, cell, value, self.cancel_token, settle=0):
+            raise RuntimeError(f"Could not set {cell} to '{value}'")
+        self.current_values[cell] = value
+        # Deeper levels now depend on a new parent and must be set again
+        for deeper_cell in self.level_cells[level + 1:]:
+            self.current_values.pop(deeper_cell, None)
+        
+        # Dependent lists are formula driven: poll until they change. A list that is
+        # legitimately the same as before only shows as such at the timeout, so polling
+        # starts near the level's usual recalculation time and then backs off.
+        latency_key = latency_model.sheet_key(self.spreadsheet_id, f"{self.job['sheet_name']}!{child_cell}")
+        plan = latency_model.plan(latency_key, value, self.job['timeout'])
+        written = time.time()
+        deadline = written + plan['timeout']
+        interval = plan['check_interval']
+        
+        if plan['initial_delay'] > 0:
+            self.cancel_token.sleep(plan['initial_delay'])
+        options = self.read_options(child_cell)
+        while options == previous_child_options and time.time() < deadline:
+            self.cancel_token.sleep(max(0.0, min(interval, deadline - time.time())))
+            interval = min(OPTIONS_POLL_MAX, interval * OPTIONS_POLL_GROWTH)
+            options = self.read_options(child_cell)
+        
+        if options != previous_child_options:
+            latency_model.record(latency_key, value, time.time() - written)
+        return options
+    
+    def walk(self, level=0, path=(), parent_options=None):
+        """
+        Yield (path, components) for every leaf menu
+        path is a tuple of (cell, value) pairs for the menu levels
+        """
+        options = parent_options if parent_options is not None else self.read_options(self.level_cells[level])
+        
+        if level == len(self.level_cells) - 1:
+            yield path, options
+            return
+        
+        # Start from the child list as it is now so the first change can be detected
+        child_options = self.read_options(self.level_cells[level + 1])
+        for value in options:
+            self.cancel_token.check()
+            self.log(f"Setting {self.level_cells[level]} to: {value}")
+            child_options = self.set_level(level, value, child_options)
+            yield from self.walk(level + 1, path + ((self.level_cells[level], value),), child_options)
+    
+    def run(self):
+        """
+        Run the sweep
+        Returns: Summary dict aggregated over all menus
+        """
+        self.worksheet = sheets_manager.get_worksheet(self.job['sheet_name'])
+        if not self.worksheet:
+            self.log("Error: Could not access worksheet")
+            return None
+        
+        self.load_validations()
+        top_options = self.prefetch()
+        originals = [(cell, sheets_manager.get_cell_value(self.worksheet, cell)) for cell in self.level_cells]
+        self.current_values = dict(originals)
+        
+        summary = {
+            'success_count': 0,
+            'failed_count': 0,
+            'failed_components': [],
+            'attempt_history': {},
+            'latency_outliers': [],
+            'save_location': self.job['save_location'],
+            'menus': [],
+            'run_ids': [],
+        }
+        
+        try:
+            options = top_options.result()
+            self.log(f"Found {len(options)} menu(s) in {self.level_cells[0]}")
+            
+            for path, components in self.walk(parent_options=options):
+                menu_label = " / ".join(value for _, value in path)
+                self.log("=" * 40)
+                self.log(f"Menu: {menu_label} ({len(components)} components)")
+                
+                if not components:
+                    continue
+                
+                menu_job = dict(self.job)
+                menu_job['components'] = components
+                menu_job['menu_value'] = menu_label
+                menu_job['restore_original'] = False
+                menu_job['save_location'] = os.path.join(
+                    self.job['save_location'],
+                    *[clean_folder_name(value) for _, value in path]
+                )
+                
+                runner = ComponentReportRunner(menu_job, self.cancel_token, log=self.log, progress=self.progress)
+                result = runner.run()
+                if not result:
+                    continue
+                
+                summary['success_count'] += result['success_count']
+                summary['failed_count'] += result['failed_count']
+                summary['latency_outliers'].extend(result['latency_outliers'])
+                for failed_item in result['failed_components']:
+                    failed_item['name'] = f"{menu_label} / {failed_item['name']}"
+                    summary['failed_components'].append(failed_item)
+                for name, attempts in result['attempt_history'].items():
+                    summary['attempt_history'][f"{menu_label} / {name}"] = attempts
+                summary['menus'].append({'menu': menu_label, 'components': len(components)})
+                if result.get('run_id'):
+                    summary['run_ids'].append(result['run_id'])
+                
+                if result.get('cancelled'):
+                    break
+        
+        except OperationCancelled:
+            self.log("Sweep stopped by user")
+        
+        finally:
+            self.executor.shutdown(wait=False)
+            latency_model.save()
+            # Restore every level top-down (parents reset their children's lists)
+            self.cancel_token.wait_for_pending()
+            for cell, value in originals:
+                if value:
+                    self.log(f"Restoring original {cell} value: {value}")
+                    sheets_manager.set_cell_value(self.worksheet, cell, value, settle=0)
+        
+        self.log("=" * 40)
+        self.log(f"SWEEP COMPLETE! Menus: {len(summary['menus'])}, "
+                 f"Success: {summary['success_count']}, Failed: {summary['failed_count']}")
+        self.log("=" * 40)
+        return summary
@@ -0,0 +1,142 @@
+"""
+Row writers for streamed exports
+One range read can feed several writers at once (CSV, XLSX, JSON Lines).
+Each writer writes to a partial file that only replaces the target on commit,
+so a failed or cancelled export never leaves a half-written file behind.
+Writers can also write into a stream owned by the caller (e.g. an archive member).
+"""
+import csv
+import io
+import json
+import os
+import shutil
+
+class RowWriter:
+    extension = None
+    
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.partial_path = output_path + '.part'
+        self.stream = None
+        self.owns_stream = True
+        self.rows_written = 0
+    
+    def open(self, stream=None):
+        """Open the partial file, or write into the given binary stream instead"""
+        self.owns_stream = stream is None
+        self.stream = open(self.partial_path, 'wb') if self.owns_stream else stream
+        self.start()
+    
+    def start(self):
+        """Prepare the format on top of self.stream (binary)"""
+    
+    def write_row(self, row):
+        raise NotImplementedError
+    
+    def finish(self):
+        """Flush anything the format still buffers into self.stream"""
+    
+    def commit(self):
+        """Finish the file and move it into place"""
+        self.finish()
+        if self.owns_stream:
+            self.stream.close()
+            os.replace(self.partial_path, self.output_path)
+    
+    def abort(self):
+        """Drop the partial file"""
+        if not self.owns_stream:
+            return
+        try:
+            if self.stream:
+                self.stream.close()
+        finally:
+            if os.path.exists(self.partial_path):
+                os.remove(self.partial_path)
+
+class CsvRowWriter(RowWriter):
+    extension = "csv"
+    
+    def start(self):
+        self.text = io.TextIOWrapper(self.stream, encoding='utf-8', newline='')
+        self.writer = csv.writer(self.text)
+    
+    def write_row(self, row):
+        self.writer.writerow(row)
+        self.rows_written += 1
+    
+    def finish(self):
+        # Keep the underlying stream open; commit closes it
+        self.text.flush()
+        self.text.detach()
+
+class XlsxRowWriter(RowWriter):
+    extension = "xlsx"
+    
+    def start(self):
+        # Write-only workbook streams rows instead of building them in memory
+        from openpyxl import Workbook
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+    
+    def write_row(self, row):
+        self.sheet.append(row)
+        self.rows_written += 1
+    
+    def finish(self):
+        self.workbook.save(self.stream)
+
+class JsonLinesRowWriter(RowWriter):
+    extension = "jsonl"
+    
+    def write_row(self, row):
+        self.stream.write(json.dumps(row, ensure_ascii=False).encode('utf-8') + b"\n")
+        self.rows_written += 1
+
+# File format name (as shown in the UI) -> row writer; PDF is exported by Google instead
+ROW_WRITERS = {
+    "Excel (XLSX)": XlsxRowWriter,
+    "CSV": CsvRowWriter,
+    "JSON Lines": JsonLinesRowWriter,
+}
+
+def write_rows(rows, writers, cancel_token=None, streams=None):
+    """
+    Stream rows into several writers in one pass
+    All files are committed together; on any error every partial file is removed.
+    Args:
+        streams: Optional binary streams to write into instead of files (one per writer)
+    Returns: Number of rows written
+    """
+    count = 0
+    try:
+        for writer, stream in zip(writers, streams or [None] * len(writers)):
+            writer.open(stream)
+        for row in rows:
+            if cancel_token:
+                cancel_token.check()
+            for writer in writers:
+                writer.write_row(row)
+            count += 1
+        for writer in writers:
+            writer.commit()
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
+    return count
+
+def write_bytes(output_path, data):
+    """Write an already downloaded file (e.g. a PDF) through a partial file"""
+    write_stream(output_path, io.BytesIO(data))
+
+def write_stream(output_path, source):
+    """Copy a finished binary stream (e.g. a spooled row export) into place through a partial file"""
+    partial_path = output_path + '.part'
+    try:
+        with open(partial_path, 'wb') as f:
+            shutil.copyfileobj(source, f, 1024 * 1024)
+        os.replace(partial_path, output_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
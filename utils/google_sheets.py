@@ -3,11 +3,36 @@ Google Sheets API wrapper with enhanced data validation detection
 Handles hidden sheets, cross-sheet references, and dependent dropdowns
 """
 import gspread
-from google.oauth2.service_account import Credentials
 from utils.config import SCOPES, CREDENTIALS_FILE
+from utils.credential_pool import CredentialPool, find_credential_files
+from utils.cancellation import OperationCancelled
+from utils import read_options
+from urllib.parse import quote
 import os
 import time
 import re
+import threading
+
+SHEETS_API_URL = "https://sheets.googleapis.com/v4/spreadsheets"
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+
+# Google only compresses responses for clients that say they accept gzip in the User-Agent too
+GZIP_HEADERS = {
+    'Accept-Encoding': 'gzip',
+    'User-Agent': 'ComponentReportAutomation (gzip)',
+}
+
+# Streaming reads: aim for responses of about this size, within these row bounds
+STREAM_TARGET_BYTES = 512 * 1024
+STREAM_MIN_ROWS = 50
+STREAM_MAX_ROWS = 10000
+STREAM_INITIAL_ROWS = 500
+
+class SheetsAPIError(Exception):
+    """Non-200 response from a direct Sheets API call (message includes the status code)"""
+    def __init__(self, status_code, message):
+        super().__init__(f"APIError [{status_code}]: {message}")
+        self.status_code = status_code
 
 class GoogleSheetsManager:
     def __init__(self):
@@ -17,21 +42,80 @@ class GoogleSheetsManager:
         self.connected = False
         self.spreadsheet_id = None
         self.credentials = None
+        self.stats_lock = threading.Lock()
+        self.api_stats = {'reads': 0, 'writes': 0, 'exports': 0, 'bytes_in': 0, 'throttled': 0}
+        self.call_bytes = {}  # read label -> {'calls', 'wire_bytes', 'bytes'}
+        self.pool = CredentialPool()
+        self._local = threading.local()
+    
+    def count_api_call(self, kind, nbytes=0):
+        """Count an API call ('reads', 'writes' or 'exports') for run statistics"""
+        with self.stats_lock:
+            self.api_stats[kind] += 1
+            self.api_stats['bytes_in'] += nbytes
+    
+    def count_api_call_bytes(self, nbytes):
+        with self.stats_lock:
+            self.api_stats['bytes_in'] += nbytes
+        self._local.meter = getattr(self._local, 'meter', 0) + nbytes
+    
+    def _account_read(self, label, wire_bytes, decoded_bytes):
+        """Byte accounting for one read call (wire = compressed size)"""
+        with self.stats_lock:
+            self.api_stats['reads'] += 1
+            self.api_stats['bytes_in'] += wire_bytes
+            entry = self.call_bytes.setdefault(label, {'calls': 0, 'wire_bytes': 0, 'bytes': 0})
+            entry['calls'] += 1
+            entry['wire_bytes'] += wire_bytes
+            entry['bytes'] += decoded_bytes
+        self._local.meter = getattr(self._local, 'meter', 0) + wire_bytes
+    
+    def count_throttled(self):
+        """Count a 429 response (for run statistics and the concurrency controller)"""
+        with self.stats_lock:
+            self.api_stats['throttled'] += 1
+        self._local.throttled = getattr(self._local, 'throttled', 0) + 1
+    
+    def reset_byte_meter(self):
+        """Start counting bytes (and 429s) received by the current thread (e.g. per component)"""
+        self._local.meter = 0
+        self._local.throttled = 0
+    
+    def read_byte_meter(self):
+        return getattr(self._local, 'meter', 0)
+    
+    def read_throttle_meter(self):
+        return getattr(self._local, 'throttled', 0)
+    
+    def get_call_bytes(self):
+        """Per-call-type byte accounting: label -> calls, wire_bytes, bytes"""
+        with self.stats_lock:
+            return {label: dict(entry) for label, entry in self.call_bytes.items()}
+    
+    def get_api_stats(self):
+        """Snapshot of the API call counters (subtract two snapshots for a run)"""
+        with self.stats_lock:
+            return dict(self.api_stats)
         
     def connect(self):
-        """Connect to Google Sheets using service account"""
+        """Connect to Google Sheets using the service account pool"""
         try:
             if not os.path.exists(CREDENTIALS_FILE):
                 raise FileNotFoundError(
                     "credentials.json not found. Please add your service account credentials."
                 )
             
-            self.credentials = Credentials.from_service_account_file(
-                CREDENTIALS_FILE, 
-                scopes=SCOPES
-            )
+            # credentials.json first, then any extra accounts from the credentials folder
+            if not self.pool.load(find_credential_files(), SCOPES):
+                raise ValueError("No usable service account credentials")
+            
+            # gspread (worksheet metadata) uses the first account; value reads,
+            # writes and exports are spread over the whole pool
+            self.credentials = self.pool.accounts[0].credentials
             self.client = gspread.authorize(self.credentials)
             self.connected = True
+            if len(self.pool) > 1:
+                return True, f"Connected successfully ({len(self.pool)} service accounts)"
             return True, "Connected successfully"
         except FileNotFoundError as e:
             return False, str(e)
@@ -76,15 +160,36 @@ class GoogleSheetsManager:
             print(f"Error getting worksheets: {e}")
             return []
     
-    def get_worksheet(self, name):
-        """Get specific worksheet by name (works with hidden sheets too)"""
+    def get_worksheet(self, name, spreadsheet=None):
+        """
+        Get specific worksheet by name (works with hidden sheets too)
+        Args:
+            spreadsheet: gspread Spreadsheet to look in (defaults to the opened one)
+        """
         try:
+            self.count_api_call('reads')
+            if spreadsheet is not None:
+                return spreadsheet.worksheet(name)
             self.current_worksheet = self.current_sheet.worksheet(name)
             return self.current_worksheet
         except Exception as e:
             print(f"Error getting worksheet '{name}': {e}")
             return None
     
+    def _open_worksheet(self, name):
+        """Worksheet lookup that raises on failure (counted as a metadata read)"""
+        self.count_api_call('reads')
+        return self.current_sheet.worksheet(name)
+    
+    def _as_worksheet(self, worksheet):
+        """Accept a worksheet object or a worksheet name of the opened spreadsheet"""
+        if isinstance(worksheet, str):
+            return self._open_worksheet(worksheet)
+        return worksheet
+    
+    def _spreadsheet_id_of(self, worksheet):
+        return getattr(worksheet, 'spreadsheet_id', None) or worksheet.spreadsheet.id
+    
     def parse_range_reference(self, range_str):
         """
         Parse a range reference and extract sheet name and range
@@ -135,8 +240,8 @@ class GoogleSheetsManager:
             
             # Determine which worksheet to use
             if sheet_name:
-                # Explicit sheet reference - get that sheet (even if hidden)
-                target_worksheet = self.get_worksheet(sheet_name)
+                # Explicit sheet reference - get that sheet (even if hidden) from the same spreadsheet
+                target_worksheet = self.get_worksheet(sheet_name, getattr(default_worksheet, 'spreadsheet', None))
                 if not target_worksheet:
                     print(f"[ERROR] Could not access sheet '{sheet_name}'")
                     return []
@@ -152,24 +257,8 @@ class GoogleSheetsManager:
             print(f"[DEBUG] Reading range: {range_part}")
             values = self._read_range_safe(target_worksheet, range_part)
             
-            # Flatten and clean
-            result = []
-            seen = set()  # Track duplicates
-            for row in values:
-                if isinstance(row, list):
-                    for val in row:
-                        if val and str(val).strip():
-                            clean_val = str(val).strip()
-                            if clean_val not in seen:
-                                seen.add(clean_val)
-                                result.append(clean_val)
-                elif row and str(row).strip():
-                    clean_val = str(row).strip()
-                    if clean_val not in seen:
-                        seen.add(clean_val)
-                        result.append(clean_val)
-            
-            print(f"[DEBUG] Extracted {len(result)} unique values (removed {len(seen) - len(result)} duplicates)")
+            result = self.unique_values(values)
+            print(f"[DEBUG] Extracted {len(result)} unique values")
             return result
             
         except Exception as e:
@@ -178,62 +267,85 @@ class GoogleSheetsManager:
             traceback.print_exc()
             return []
     
+    def unique_values(self, values):
+        """Flatten rows into the non-empty, stripped values in order (duplicates removed)"""
+        result = []
+        seen = set()
+        for row in values:
+            for val in (row if isinstance(row, list) else [row]):
+                clean_val = str(val).strip() if val else ""
+                if clean_val and clean_val not in seen:
+                    seen.add(clean_val)
+                    result.append(clean_val)
+        return result
+    
+    def parse_validations(self, data):
+        """
+        Extract list validations from a spreadsheets.get response (grid data with dataValidation)
+        Returns: List of dicts with sheet_id, cell, type, range and referenced_sheet
+        """
+        validations = []
+        
+        for sheet in data.get('sheets', []):
+            sheet_id = sheet['properties']['sheetId']
+            sheet_data = sheet.get('data', [])
+            
+            for grid_data in sheet_data:
+                row_data = grid_data.get('rowData', [])
+                
+                for row_idx, row in enumerate(row_data):
+                    values = row.get('values', [])
+                    
+                    for col_idx, cell in enumerate(values):
+                        if 'dataValidation' in cell:
+                            validation = cell['dataValidation']
+                            condition = validation.get('condition', {})
+                            
+                            cell_address = f"{self._col_num_to_letter(col_idx + 1)}{row_idx + 1}"
+                            validation_type = condition.get('type', 'UNKNOWN')
+                            range_ref = None
+                            
+                            if validation_type == 'ONE_OF_RANGE':
+                                condition_values = condition.get('values', [])
+                                for val in condition_values:
+                                    user_value = val.get('userEnteredValue', '')
+                                    if user_value:
+                                        range_ref = user_value
+                                        print(f"[DEBUG] Found range reference: {range_ref}")
+                            
+                            validations.append({
+                                'sheet_id': sheet_id,
+                                'cell': cell_address,
+                                'type': validation_type,
+                                'range': range_ref,
+                                'referenced_sheet': self.parse_range_reference(range_ref)[0] if range_ref else None
+                            })
+        
+        return validations
+    
     def detect_data_validations(self, worksheet_name):
-        """Detect all data validation rules in a worksheet"""
+        """Detect all data validation rules in a worksheet (given by name or as a worksheet object)"""
         try:
-            from google.auth.transport.requests import AuthorizedSession
-            
-            worksheet = self.current_sheet.worksheet(worksheet_name)
+            worksheet = self._as_worksheet(worksheet_name)
             sheet_id = worksheet.id
             
-            authed_session = AuthorizedSession(self.credentials)
-            
-            url = f"https://sheets.googleapis.com/v4/spreadsheets/{self.spreadsheet_id}"
-            params = {'fields': 'sheets(properties,data.rowData.values.dataValidation)'}
+            url = f"{SHEETS_API_URL}/{self._spreadsheet_id_of(worksheet)}"
+            params = {
+                'ranges': self._quote_sheet_name(worksheet.title),
+                'fields': 'sheets(properties.sheetId,data.rowData.values.dataValidation)'
+            }
             
-            response = authed_session.get(url, params=params)
+            response = self._api_get(url, params, "validations")
             
             if response.status_code != 200:
                 print(f"API Error: {response.status_code}")
                 return []
             
-            data = response.json()
             validations = []
-            
-            for sheet in data.get('sheets', []):
-                if sheet['properties']['sheetId'] == sheet_id:
-                    sheet_data = sheet.get('data', [])
-                    
-                    for grid_data in sheet_data:
-                        row_data = grid_data.get('rowData', [])
-                        
-                        for row_idx, row in enumerate(row_data):
-                            values = row.get('values', [])
-                            
-                            for col_idx, cell in enumerate(values):
-                                if 'dataValidation' in cell:
-                                    validation = cell['dataValidation']
-                                    condition = validation.get('condition', {})
-                                    
-                                    cell_address = f"{self._col_num_to_letter(col_idx + 1)}{row_idx + 1}"
-                                    validation_type = condition.get('type', 'UNKNOWN')
-                                    range_ref = None
-                                    
-                                    if validation_type == 'ONE_OF_RANGE':
-                                        condition_values = condition.get('values', [])
-                                        for val in condition_values:
-                                            user_value = val.get('userEnteredValue', '')
-                                            if user_value:
-                                                range_ref = user_value
-                                                print(f"[DEBUG] Found range reference: {range_ref}")
-                                    
-                                    validations.append({
-                                        'cell': cell_address,
-                                        'type': validation_type,
-                                        'range': range_ref,
-                                        'worksheet': worksheet,
-                                        'referenced_sheet': self.parse_range_reference(range_ref)[0] if range_ref else None
-                                    })
+            for validation in self.parse_validations(response.json()):
+                if validation.pop('sheet_id') == sheet_id:
+                    validation['worksheet'] = worksheet
+                    validations.append(validation)
             
             return validations
             
@@ -243,6 +355,25 @@ class GoogleSheetsManager:
             traceback.print_exc()
             return []
     
+    def find_dropdown_source(self, worksheet, cell_address):
+        """
+        Source range of a cell's list validation (one validations read)
+        Open-ended ranges like AC2:AC are kept: the values API accepts them and
+        they never exceed the grid.
+        Returns: A1 range including the sheet name, or None
+        """
+        worksheet = self._as_worksheet(worksheet)
+        for validation in self.detect_data_validations(worksheet):
+            if validation['cell'] == cell_address and validation.get('range'):
+                range_ref = validation['range'].strip().lstrip('=').replace('$', '')
+                if '!' in range_ref:
+                    sheet_title, range_part = range_ref.rsplit('!', 1)
+                    sheet_title = sheet_title.strip("'\"").replace("''", "'")
+                else:
+                    sheet_title, range_part = worksheet.title, range_ref
+                return f"{self._quote_sheet_name(sheet_title)}!{range_part}"
+        return None
+    
     def read_dropdown_values_from_cell(self, worksheet, cell_address, sheet_name):
         """
         Read dropdown values from a cell by detecting its data validation
@@ -253,7 +384,7 @@ class GoogleSheetsManager:
             print(f"[DEBUG] Reading dropdown from cell {cell_address} in sheet '{sheet_name}'")
             
             # Detect validations for this sheet
-            validations = self.detect_data_validations(sheet_name)
+            validations = self.detect_data_validations(worksheet or sheet_name)
             print(f"[DEBUG] Found {len(validations)} total validations in sheet")
             
             # Show all validations for debugging
@@ -309,6 +440,204 @@ class GoogleSheetsManager:
         """
         return self.get_range_from_any_sheet(range_str, worksheet)
     
+    def _quote_sheet_name(self, title):
+        """Quote a sheet title for A1 notation ('My Sheet'!A1)"""
+        return "'" + title.replace("'", "''") + "'"
+    
+    def _pooled_request(self, kind, cancel_token, method, url, **kwargs):
+        """
+        Send a direct API request with the pooled account that has the most quota left
+        A 429 quarantines that account and the request is repeated with the next one.
+        Args:
+            kind: Quota the request counts against ('reads' or 'writes')
+        """
+        attempts = max(1, len(self.pool))
+        for attempt in range(attempts):
+            account = self.pool.acquire(kind, cancel_token)
+            response = self._call(cancel_token, account.get_session().request, method, url, **kwargs)
+            if response.status_code != 429:
+                self.pool.report_success(account)
+                return response
+            
+            self.count_throttled()
+            self.pool.report_rate_limited(account)
+            if attempt < attempts - 1:
+                response.close()
+        return response
+    
+    def _api_get(self, url, params, label, cancel_token=None):
+        """GET a Sheets API URL with gzip enabled and byte accounting"""
+        response = self._pooled_request('reads', cancel_token, 'GET', url, params=params, headers=GZIP_HEADERS)
+        content = response.content
+        # urllib3 tells how many (compressed) bytes came over the wire
+        try:
+            wire_bytes = response.raw.tell() or len(content)
+        except Exception:
+            wire_bytes = len(content)
+        self._account_read(label, wire_bytes, len(content))
+        self._local.last_response_bytes = len(content)
+        return response
+    
+    def get_drive_metadata(self, spreadsheet_id=None, cancel_token=None):
+        """
+        Drive metadata of the spreadsheet (one small request)
+        Returns: dict with version (increases on every change) and modifiedTime
+        """
+        url = f"{DRIVE_FILES_URL}/{spreadsheet_id or self.spreadsheet_id}"
+        params = {'fields': 'version,modifiedTime', 'supportsAllDrives': 'true'}
+        response = self._api_get(url, params, "drive_metadata", cancel_token)
+        
+        if response.status_code != 200:
+            raise SheetsAPIError(response.status_code, response.text)
+        return response.json()
+    
+    def copy_spreadsheet(self, title, spreadsheet_id=None, cancel_token=None):
+        """
+        Make a Drive copy of the spreadsheet (owned by the first service account)
+        Returns: File id of the copy
+        """
+        url = f"{DRIVE_FILES_URL}/{spreadsheet_id or self.spreadsheet_id}/copy"
+        self.count_api_call('writes')
+        response = self._call(
+            cancel_token, self.pool.accounts[0].get_session().post, url,
+            params={'fields': 'id', 'supportsAllDrives': 'true'},
+            json={'name': title}
+        )
+        if response.status_code != 200:
+            raise SheetsAPIError(response.status_code, response.text)
+        return response.json()['id']
+    
+    def share_file(self, file_id, email, cancel_token=None):
+        """Give another service account edit access to a file created by the first one"""
+        url = f"{DRIVE_FILES_URL}/{file_id}/permissions"
+        self.count_api_call('writes')
+        response = self._call(
+            cancel_token, self.pool.accounts[0].get_session().post, url,
+            params={'sendNotificationEmail': 'false', 'supportsAllDrives': 'true'},
+            json={'role': 'writer', 'type': 'user', 'emailAddress': email}
+        )
+        if response.status_code != 200:
+            raise SheetsAPIError(response.status_code, response.text)
+    
+    def delete_file(self, file_id):
+        """
+        Permanently delete a Drive file created by the first service account
+        Returns: True if it is gone (a file that no longer exists counts as deleted)
+        """
+        url = f"{DRIVE_FILES_URL}/{file_id}"
+        self.count_api_call('writes')
+        response = self.pool.accounts[0].get_session().delete(url, params={'supportsAllDrives': 'true'})
+        return response.status_code in (200, 204, 404)
+    
+    def open_spreadsheet_by_id(self, spreadsheet_id):
+        """gspread Spreadsheet for an id (e.g. a copy), without changing the opened one"""
+        self.count_api_call('reads')
+        return self.client.open_by_key(spreadsheet_id)
+    
+    def get_values(self, worksheet, cell_range, options=read_options.EXPORT, cancel_token=None):
+        """
+        Read a range through the read-options layer
+        Args:
+            cell_range: A1 range on the worksheet (or None for the whole sheet)
+            options: ReadOptions preset (render option, major dimension, fields mask)
+        Returns: List of rows (or columns for COLUMNS major dimension)
+        """
+        spreadsheet_id = self._spreadsheet_id_of(worksheet)
+        a1_range = self._quote_sheet_name(worksheet.title)
+        if cell_range:
+            a1_range += f"!{cell_range}"
+        
+        url = f"{SHEETS_API_URL}/{spreadsheet_id}/values/{quote(a1_range, safe='')}"
+        response = self._api_get(url, options.params(), options.label, cancel_token)
+        
+        if response.status_code != 200:
+            try:
+                message = response.json().get('error', {}).get('message', response.text)
+            except ValueError:
+                message = response.text
+            raise SheetsAPIError(response.status_code, message)
+        
+        return response.json().get('values', [])
+    
+    def batch_get_values(self, spreadsheet_id, a1_ranges, options=read_options.EXPORT, cancel_token=None):
+        """
+        Read several ranges in one request
+        Args:
+            a1_ranges: Ranges including the sheet name ('Sheet'!A1:B2)
+        Returns: One list of rows per range, in order
+        """
+        params = [('ranges', a1_range) for a1_range in a1_ranges]
+        params += [
+            ('valueRenderOption', options.value_render),
+            ('majorDimension', options.major_dimension),
+            ('fields', 'valueRanges.values'),
+        ]
+        url = f"{SHEETS_API_URL}/{spreadsheet_id}/values:batchGet"
+        response = self._api_get(url, params, options.label, cancel_token)
+        
+        if response.status_code != 200:
+            try:
+                message = response.json().get('error', {}).get('message', response.text)
+            except ValueError:
+                message = response.text
+            raise SheetsAPIError(response.status_code, message)
+        
+        return [value_range.get('values', []) for value_range in response.json().get('valueRanges', [])]
+    
+    def _split_a1_range(self, cell_range):
+        """
+        Split 'A9:I120' into ('A', 9, 'I', 120); missing rows are None ('B:B', 'A2:A')
+        """
+        match = re.match(r'^([A-Za-z]+)(\d*)(?::([A-Za-z]+)(\d*))?$', cell_range.strip())
+        if not match:
+            raise ValueError(f"Unsupported range for streaming: {cell_range}")
+        start_col, start_row, end_col, end_row = match.groups()
+        end_col = end_col or start_col
+        if not match.group(3):
+            end_row = start_row
+        return (
+            start_col.upper(),
+            int(start_row) if start_row else 1,
+            end_col.upper(),
+            int(end_row) if end_row else None,
+        )
+    
+    def iter_range_rows(self, worksheet, cell_range, options=read_options.EXPORT, cancel_token=None):
+        """
+        Stream the rows of a range in chunks sized to the response size
+        Memory use stays constant: only one chunk is held at a time.
+        Internal empty rows are kept; trailing empty rows are dropped (like a single read).
+        """
+        start_col, start_row, end_col, end_row = self._split_a1_range(cell_range)
+        if end_row is None:
+            end_row = worksheet.row_count
+        
+        chunk_rows = STREAM_INITIAL_ROWS
+        pending_empty = 0
+        row = start_row
+        
+        while row <= end_row:
+            last = min(end_row, row + chunk_rows - 1)
+            rows = self.get_values(worksheet, f"{start_col}{row}:{end_col}{last}", options, cancel_token)
+            
+            if rows:
+                for _ in range(pending_empty):
+                    yield []
+                pending_empty = 0
+                for values in rows:
+                    yield values
+            pending_empty += (last - row + 1) - len(rows)
+            
+            # Size the next chunk from this response's bytes per row
+            response_bytes = getattr(self._local, 'last_response_bytes', 0)
+            if rows and response_bytes:
+                bytes_per_row = max(1.0, response_bytes / len(rows))
+                chunk_rows = int(min(STREAM_MAX_ROWS, max(STREAM_MIN_ROWS, STREAM_TARGET_BYTES / bytes_per_row)))
+            elif not rows:
+                chunk_rows = min(STREAM_MAX_ROWS, chunk_rows * 2)
+            
+            row = last + 1
+    
     def _read_range_safe(self, worksheet, range_str):
         """
         Safely read a range with multiple fallback strategies
@@ -316,7 +645,7 @@ class GoogleSheetsManager:
         """
         try:
             # Try direct read first
-            return worksheet.get(range_str)
+            return self.get_values(worksheet, range_str, read_options.VALIDATION_SOURCE)
         except Exception as e:
             error_msg = str(e).lower()
             
@@ -334,7 +663,7 @@ class GoogleSheetsManager:
                         limited_range = col_letter + '1:' + col_letter + '1000'
                         print(f"Trying limited range: {limited_range}")
                         try:
-                            return worksheet.get(limited_range)
+                            return self.get_values(worksheet, limited_range, read_options.VALIDATION_SOURCE)
                         except:
                             pass
                     
@@ -344,24 +673,22 @@ class GoogleSheetsManager:
                         limited_range = start + ':' + col_letter + '1000'
                         print(f"Trying limited range: {limited_range}")
                         try:
-                            return worksheet.get(limited_range)
+                            return self.get_values(worksheet, limited_range, read_options.VALIDATION_SOURCE)
                         except:
                             pass
                 
-                # Strategy 2: Get all values and filter by column
-                print("Trying to get all values and filter...")
+                # Strategy 2: Stream the column in chunks and keep non-empty values
+                print("Trying to stream the column and filter...")
                 try:
-                    all_values = worksheet.get_all_values()
                     # Extract column from range
                     if ':' in range_str:
                         start_cell = range_str.split(':')[0]
                         col_letter = ''.join(c for c in start_cell if c.isalpha())
-                        col_index = self._col_letter_to_num(col_letter) - 1
                         
                         filtered = []
-                        for row in all_values:
-                            if col_index < len(row) and row[col_index]:
-                                filtered.append([row[col_index]])
+                        for row in self.iter_range_rows(worksheet, f"{col_letter}1:{col_letter}", read_options.VALIDATION_SOURCE):
+                            if row and row[0]:
+                                filtered.append([row[0]])
                         return filtered
                 except Exception as e2:
                     print(f"Fallback strategy failed: {e2}")
@@ -388,17 +715,62 @@ class GoogleSheetsManager:
     def get_cell_value(self, worksheet, cell):
         """Get value from a specific cell"""
         try:
-            return worksheet.acell(cell).value
+            values = self.get_values(worksheet, cell, read_options.CELL)
+            return values[0][0] if values and values[0] else None
         except Exception as e:
             print(f"Error getting cell value: {e}")
             return None
     
-    def set_cell_value(self, worksheet, cell, value):
-        """Set value in a specific cell"""
+    def _call(self, cancel_token, func, *args, **kwargs):
+        """Run a blocking API call, abandoning it immediately if the token is cancelled"""
+        if cancel_token:
+            return cancel_token.run(func, *args, **kwargs)
+        return func(*args, **kwargs)
+    
+    def read_range(self, worksheet, cell_range, cancel_token=None, options=read_options.SENTINEL):
+        """Read a range of values (counted, cancellable)"""
+        return self.get_values(worksheet, cell_range, options, cancel_token)
+    
+    def read_column(self, worksheet, column_letter, start_row, end_row, cancel_token=None):
+        """
+        Read one column between two rows as a flat list (index 0 = start_row)
+        Only the requested rows cross the wire instead of the whole column
+        """
+        cell_range = f"{column_letter}{start_row}:{column_letter}{end_row}"
+        columns = self.get_values(worksheet, cell_range, read_options.COLUMN_SCAN, cancel_token)
+        return columns[0] if columns else []
+    
+    def update_values(self, worksheet, cell_range, values, cancel_token=None):
+        """Write values as if typed by a user (same as gspread's update_acell), via the pool"""
+        spreadsheet_id = self._spreadsheet_id_of(worksheet)
+        a1_range = f"{self._quote_sheet_name(worksheet.title)}!{cell_range}"
+        
+        url = f"{SHEETS_API_URL}/{spreadsheet_id}/values/{quote(a1_range, safe='')}"
+        response = self._pooled_request(
+            'writes', cancel_token, 'PUT', url,
+            params={'valueInputOption': 'USER_ENTERED', 'fields': 'updatedCells'},
+            json={'values': values}
+        )
+        if response.status_code != 200:
+            raise SheetsAPIError(response.status_code, response.text)
+    
+    def set_cell_value(self, worksheet, cell, value, cancel_token=None, settle=2):
+        """
+        Set value in a specific cell
+        Args:
+            cancel_token: Optional CancellationToken interrupting the write and settle wait
+            settle: Seconds to wait after the write for dependent formulas
+        """
         try:
-            worksheet.update_acell(cell, value)
-            time.sleep(2)
+            self.count_api_call('writes')
+            self.update_values(worksheet, cell, [[value]], cancel_token)
+            if cancel_token:
+                cancel_token.sleep(settle)
+            elif settle:
+                time.sleep(settle)
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             print(f"Error setting cell value: {e}")
             return False
@@ -406,8 +778,7 @@ class GoogleSheetsManager:
     def find_last_row_with_data(self, worksheet, column_letter, start_row):
         """Find the last row with data in a specific column"""
         try:
-            col_num = self._col_letter_to_num(column_letter)
-            column_values = worksheet.col_values(col_num)
+            column_values = self.read_column(worksheet, column_letter, 1, worksheet.row_count)
             
             for i in range(len(column_values) - 1, start_row - 2, -1):
                 if i >= 0 and column_values[i] and str(column_values[i]).strip():
@@ -418,61 +789,88 @@ class GoogleSheetsManager:
             print(f"Error finding last row: {e}")
             return start_row
     
-    def export_range_as_pdf(self, worksheet_name, cell_range, output_path):
-        """Export a specific range as PDF"""
+    def download_range_pdf(self, worksheet_name, cell_range, sink, cancel_token=None):
+        """
+        Download a range as PDF into a binary file object (download is aborted on cancel)
+        Args:
+            worksheet_name: Worksheet name in the opened spreadsheet, or a worksheet object
+        Returns: (success, message)
+        """
         try:
-            if not self.spreadsheet_id:
+            if isinstance(worksheet_name, str) and not self.spreadsheet_id:
                 return False, "No spreadsheet opened"
             
-            worksheet = self.current_sheet.worksheet(worksheet_name)
+            worksheet = self._as_worksheet(worksheet_name)
             sheet_id = worksheet.id
             
-            base_url = f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}"
+            base_url = f"https://docs.google.com/spreadsheets/d/{self._spreadsheet_id_of(worksheet)}"
             export_url = f"{base_url}/export?format=pdf&gid={sheet_id}&range={cell_range}"
             
-            from google.auth.transport.requests import AuthorizedSession
-            authed_session = AuthorizedSession(self.credentials)
+            self.count_api_call('exports')
+            response = self._pooled_request('reads', cancel_token, 'GET', export_url, stream=True)
+            remove_callback = cancel_token.on_cancel(response.close) if cancel_token else None
             
-            response = authed_session.get(export_url)
-            
-            if response.status_code == 200:
-                with open(output_path, 'wb') as f:
-                    f.write(response.content)
-                return True, f"Exported to {output_path}"
-            else:
-                return False, f"Export failed: {response.status_code}"
+            try:
+                if response.status_code != 200:
+                    return False, f"Export failed: {response.status_code}"
+                
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    if cancel_token:
+                        cancel_token.check()
+                    sink.write(chunk)
+                    self.count_api_call_bytes(len(chunk))
+                return True, "Downloaded"
+            finally:
+                if remove_callback:
+                    remove_callback()
+                response.close()
                 
+        except OperationCancelled:
+            raise
         except Exception as e:
+            if cancel_token and cancel_token.cancelled:
+                raise OperationCancelled("Cancelled by user")
             return False, f"Export error: {str(e)}"
     
-    def export_range_as_excel(self, worksheet_name, cell_range, output_path):
-        """Export a specific range as Excel"""
+    def export_range_as_pdf(self, worksheet_name, cell_range, output_path, cancel_token=None):
+        """Export a specific range as PDF (download is aborted on cancel)"""
+        # Stream to a partial file so a cancelled download leaves nothing behind
+        partial_path = output_path + '.part'
         try:
-            worksheet = self.current_sheet.worksheet(worksheet_name)
-            data = worksheet.get(cell_range)
-            
-            import pandas as pd
-            df = pd.DataFrame(data)
-            df.to_excel(output_path, index=False, header=False)
-            
+            with open(partial_path, 'wb') as f:
+                success, message = self.download_range_pdf(worksheet_name, cell_range, f, cancel_token)
+            if not success:
+                return False, message
+            os.replace(partial_path, output_path)
             return True, f"Exported to {output_path}"
-        except Exception as e:
+        except OSError as e:
             return False, f"Export error: {str(e)}"
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
     
-    def export_range_as_csv(self, worksheet_name, cell_range, output_path):
-        """Export a specific range as CSV"""
-        try:
-            worksheet = self.current_sheet.worksheet(worksheet_name)
-            data = worksheet.get(cell_range)
-            
-            import csv
-            with open(output_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerows(data)
-            
-            return True, f"Exported to {output_path}"
-        except Exception as e:
-            return False, f"Export error: {str(e)}"
+    def read_grid(self, worksheet_name, cell_range, cancel_token=None):
+        """
+        Read a range's values and effective formatting in one spreadsheets.get call
+        Returns: The sheet entry of the response (see grid_render.parse_grid)
+        """
+        worksheet = self._as_worksheet(worksheet_name)
+        url = f"{SHEETS_API_URL}/{self._spreadsheet_id_of(worksheet)}"
+        params = {
+            'ranges': f"{self._quote_sheet_name(worksheet.title)}!{cell_range}",
+            'fields': read_options.GRID.fields,
+        }
+        response = self._api_get(url, params, read_options.GRID.label, cancel_token)
+        
+        if response.status_code != 200:
+            try:
+                message = response.json().get('error', {}).get('message', response.text)
+            except ValueError:
+                message = response.text
+            raise SheetsAPIError(response.status_code, message)
+        
+        sheets = response.json().get('sheets', [])
+        return sheets[0] if sheets else {}
 
 # Global instance
 sheets_manager = GoogleSheetsManager()
\ No newline at end of file
@@ -0,0 +1,266 @@
+"""
+Local formatted rendering
+Turns the grid data of a range (values plus effective cell formatting, read
+with one spreadsheets.get call) into a formatted XLSX workbook or a printable
+HTML page on this machine, so formatted output does not have to go through
+Google's rate-limited PDF export endpoint. Fonts, fills, borders, alignment,
+number formats, merges, column widths and row heights are kept.
+"""
+import html
+import os
+
+DEFAULT_COLUMN_PX = 100
+DEFAULT_ROW_PX = 21
+PX_PER_XLSX_WIDTH = 7.0   # Pixels per Excel column width unit (default font)
+POINTS_PER_PX = 0.75
+
+# Sheets border style -> CSS / openpyxl side style
+BORDER_CSS = {
+    'DOTTED': "1px dotted",
+    'DASHED': "1px dashed",
+    'SOLID': "1px solid",
+    'SOLID_MEDIUM': "2px solid",
+    'SOLID_THICK': "3px solid",
+    'DOUBLE': "3px double",
+}
+BORDER_XLSX = {
+    'DOTTED': "dotted",
+    'DASHED': "dashed",
+    'SOLID': "thin",
+    'SOLID_MEDIUM': "medium",
+    'SOLID_THICK': "thick",
+    'DOUBLE': "double",
+}
+HORIZONTAL = {'LEFT': "left", 'CENTER': "center", 'RIGHT': "right"}
+VERTICAL = {'TOP': "top", 'MIDDLE': "center", 'BOTTOM': "bottom"}
+
+PRINT_CSS = """
+@page { size: landscape; margin: 10mm; }
+body { margin: 0; }
+table { border-collapse: collapse; table-layout: fixed; }
+td { overflow: hidden; padding: 0 3px; font-family: Arial, sans-serif; font-size: 10pt;
+     vertical-align: bottom; -webkit-print-color-adjust: exact; print-color-adjust: exact; }
+tr { page-break-inside: avoid; }
+"""
+
+def parse_grid(sheet):
+    """
+    Normalize one sheet entry of a spreadsheets.get response with grid data
+    Returns: dict with rows (lists of cell dicts with text, value and format),
+             column_widths and row_heights in pixels, and merges as
+             (row, column, row_count, column_count) relative to the range
+    """
+    data = (sheet.get('data') or [{}])[0]
+    start_row = data.get('startRow', 0)
+    start_col = data.get('startColumn', 0)
+    
+    rows = [
+        [
+            {
+                'text': cell.get('formattedValue', ""),
+                'value': cell.get('effectiveValue'),
+                'format': cell.get('effectiveFormat', {}),
+            }
+            for cell in row.get('values', [])
+        ]
+        for row in data.get('rowData', [])
+    ]
+    column_widths = [column.get('pixelSize', DEFAULT_COLUMN_PX) for column in data.get('columnMetadata', [])]
+    row_heights = [row.get('pixelSize', DEFAULT_ROW_PX) for row in data.get('rowMetadata', [])]
+    row_count = max(len(rows), len(row_heights))
+    column_count = max(len(column_widths), max((len(row) for row in rows), default=0))
+    
+    # Merges are sheet-wide; keep the part inside the range
+    merges = []
+    for merge in sheet.get('merges', []):
+        top = max(merge.get('startRowIndex', 0), start_row) - start_row
+        bottom = min(merge.get('endRowIndex', 0), start_row + row_count) - start_row
+        left = max(merge.get('startColumnIndex', 0), start_col) - start_col
+        right = min(merge.get('endColumnIndex', 0), start_col + column_count) - start_col
+        if bottom > top and right > left and (bottom - top) * (right - left) > 1:
+            merges.append((top, left, bottom - top, right - left))
+    
+    return {
+        'rows': rows,
+        'column_widths': column_widths + [DEFAULT_COLUMN_PX] * (column_count - len(column_widths)),
+        'row_heights': row_heights + [DEFAULT_ROW_PX] * (row_count - len(row_heights)),
+        'merges': merges,
+    }
+
+def _hex(color):
+    """Sheets color (0-1 floats, missing channels are 0) as RRGGBB"""
+    return "".join(f"{round(color.get(channel, 0) * 255):02X}" for channel in ('red', 'green', 'blue'))
+
+def _font_family(name):
+    return "".join(c for c in name if c not in "'\"<>;{}")
+
+def _cell(grid, r, c):
+    rows = grid['rows']
+    if r < len(rows) and c < len(rows[r]):
+        return rows[r][c]
+    return None
+
+def _cell_css(cell):
+    cell_format = cell['format']
+    styles = []
+    text = cell_format.get('textFormat', {})
+    if text.get('fontFamily'):
+        styles.append(f"font-family: '{_font_family(text['fontFamily'])}', sans-serif")
+    if text.get('fontSize'):
+        styles.append(f"font-size: {text['fontSize']}pt")
+    if text.get('bold'):
+        styles.append("font-weight: bold")
+    if text.get('italic'):
+        styles.append("font-style: italic")
+    decorations = [name for key, name in (('underline', "underline"), ('strikethrough', "line-through")) if text.get(key)]
+    if decorations:
+        styles.append(f"text-decoration: {' '.join(decorations)}")
+    if text.get('foregroundColor'):
+        styles.append(f"color: #{_hex(text['foregroundColor'])}")
+    
+    background = cell_format.get('backgroundColor')
+    if background and _hex(background) != "FFFFFF":
+        styles.append(f"background-color: #{_hex(background)}")
+    
+    for side, border in cell_format.get('borders', {}).items():
+        if border.get('style', 'NONE') in BORDER_CSS:
+            styles.append(f"border-{side}: {BORDER_CSS[border['style']]} #{_hex(border.get('color', {}))}")
+    
+    if cell_format.get('horizontalAlignment') in HORIZONTAL:
+        styles.append(f"text-align: {HORIZONTAL[cell_format['horizontalAlignment']]}")
+    elif 'numberValue' in (cell['value'] or {}):
+        # Sheets right-aligns numbers unless told otherwise
+        styles.append("text-align: right")
+    if cell_format.get('verticalAlignment') in VERTICAL:
+        styles.append(f"vertical-align: {cell_format['verticalAlignment'].lower()}")
+    styles.append("white-space: pre-wrap" if cell_format.get('wrapStrategy') == 'WRAP' else "white-space: pre")
+    return "; ".join(styles)
+
+def render_html(grid, stream, title=""):
+    """Write the grid as a printable HTML page (UTF-8) into a binary stream"""
+    spans = {}
+    covered = set()
+    for r, c, row_count, column_count in grid['merges']:
+        spans[(r, c)] = (row_count, column_count)
+        covered.update((r + dr, c + dc) for dr in range(row_count) for dc in range(column_count))
+    
+    parts = [
+        "<!DOCTYPE html>",
+        '<html><head><meta charset="utf-8">',
+        f"<title>{html.escape(title)}</title>",
+        f"<style>{PRINT_CSS}</style>",
+        "</head><body><table>",
+        "<colgroup>",
+    ]
+    parts.extend(f'<col style="width: {width}px">' for width in grid['column_widths'])
+    parts.append("</colgroup>")
+    
+    for r, height in enumerate(grid['row_heights']):
+        parts.append(f'<tr style="height: {height}px">')
+        for c in range(len(grid['column_widths'])):
+            span = spans.get((r, c))
+            if span is None and (r, c) in covered:
+                continue
+            
+            cell = _cell(grid, r, c)
+            attributes = ""
+            if span:
+                attributes += f' rowspan="{span[0]}"' if span[0] > 1 else ""
+                attributes += f' colspan="{span[1]}"' if span[1] > 1 else ""
+            if cell:
+                attributes += f' style="{html.escape(_cell_css(cell))}"'
+            text = html.escape(cell['text']) if cell else ""
+            parts.append(f"<td{attributes}>{text}</td>")
+        parts.append("</tr>")
+    
+    parts.append("</table></body></html>")
+    stream.write("\n".join(parts).encode('utf-8'))
+
+def _sheet_title(title):
+    clean = "".join(c for c in title if c not in '[]:*?/\\').strip()
+    return clean[:31] or "Report"
+
+def _xlsx_value(cell):
+    """Typed cell value: numbers and booleans stay numbers and booleans"""
+    value = cell['value'] or {}
+    if 'numberValue' in value:
+        return value['numberValue']
+    if 'boolValue' in value:
+        return value['boolValue']
+    return cell['text'] or None
+
+def render_xlsx(grid, stream, title=""):
+    """Write the grid as a formatted XLSX workbook into a binary stream"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+    
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = _sheet_title(title)
+    
+    for c, width in enumerate(grid['column_widths'], 1):
+        sheet.column_dimensions[get_column_letter(c)].width = round(width / PX_PER_XLSX_WIDTH, 2)
+    for r, height in enumerate(grid['row_heights'], 1):
+        sheet.row_dimensions[r].height = round(height * POINTS_PER_PX, 2)
+    
+    for r, row in enumerate(grid['rows'], 1):
+        for c, cell_data in enumerate(row, 1):
+            value = _xlsx_value(cell_data)
+            cell_format = cell_data['format']
+            if value is None and not cell_format:
+                continue
+            
+            cell = sheet.cell(row=r, column=c, value=value)
+            text = cell_format.get('textFormat', {})
+            cell.font = Font(
+                name=text.get('fontFamily'),
+                size=text.get('fontSize'),
+                bold=text.get('bold', False),
+                italic=text.get('italic', False),
+                underline="single" if text.get('underline') else None,
+                strike=text.get('strikethrough', False),
+                color=_hex(text['foregroundColor']) if text.get('foregroundColor') else None
+            )
+            
+            background = cell_format.get('backgroundColor')
+            if background and _hex(background) != "FFFFFF":
+                cell.fill = PatternFill(fill_type="solid", fgColor=_hex(background))
+            
+            sides = {}
+            for side, border in cell_format.get('borders', {}).items():
+                if border.get('style', 'NONE') in BORDER_XLSX:
+                    sides[side] = Side(style=BORDER_XLSX[border['style']], color=_hex(border.get('color', {})))
+            if sides:
+                cell.border = Border(**sides)
+            
+            cell.alignment = Alignment(
+                horizontal=HORIZONTAL.get(cell_format.get('horizontalAlignment')),
+                vertical=VERTICAL.get(cell_format.get('verticalAlignment')),
+                wrap_text=cell_format.get('wrapStrategy') == 'WRAP'
+            )
+            pattern = cell_format.get('numberFormat', {}).get('pattern')
+            if pattern and isinstance(value, (int, float)) and not isinstance(value, bool):
+                cell.number_format = pattern
+    
+    for r, c, row_count, column_count in grid['merges']:
+        sheet.merge_cells(start_row=r + 1, start_column=c + 1, end_row=r + row_count, end_column=c + column_count)
+    
+    workbook.save(stream)
+
+# File format name (as shown in the UI) -> renderer(grid, stream, title)
+GRID_RENDERERS = {
+    "Formatted Excel (XLSX)": render_xlsx,
+    "HTML (printable)": render_html,
+}
+
+def write_rendered(output_path, renderer, grid, title=""):
+    """Render into a partial file that only replaces the target when complete"""
+    partial_path = output_path + '.part'
+    try:
+        with open(partial_path, 'wb') as f:
+            renderer(grid, f, title)
+        os.replace(partial_path, output_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
@@ -0,0 +1,565 @@
+"""
+Local job service
+Long-running scheduler that queues component report jobs, runs them in
+priority order within a global concurrency and quota budget, never runs two
+jobs on the same sheet at once, and fires cron-like schedules. Jobs and
+schedules are kept in SQLite, so the queue survives a restart.
+
+Small JSON API on localhost (the desktop screen is one client of it):
+    GET    /status                  Running jobs, budget use and service-account pool
+    GET    /jobs                    Recent jobs
+    POST   /jobs                    Submit a job (fields as in build_job, plus 'priority')
+    GET    /jobs/<id>               Job status, result summary and log tail
+    POST   /jobs/<id>/priority      {"priority": n} (higher runs first)
+    POST   /jobs/<id>/cancel        Cancel a queued or running job
+    GET    /schedules               Schedules
+    POST   /schedules               {"cron": "0 6 * * 1-5", "job": {...}, "priority": n}
+    DELETE /schedules/<id>          Remove a schedule
+
+Run it with: python -m utils.job_service [--port 8765]
+"""
+from utils.google_sheets import sheets_manager
+from utils.report_runner import ComponentReportRunner
+from utils.run_planner import plan_job, QUOTA_TARGET
+from utils.delta_run import apply_delta
+from utils.cancellation import CancellationToken
+from utils.config import (
+    JOB_SERVICE_DB, SERVICE_HOST, SERVICE_PORT, SERVICE_MAX_RUNNING, DOWNLOADS_DIR,
+    READ_QUOTA_PER_USER, WRITE_QUOTA_PER_USER
+)
+from collections import deque
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import json
+import sqlite3
+import threading
+import time
+import urllib.request
+import urllib.error
+
+MENU_CELL = "B3"
+LOG_TAIL = 200  # Log lines kept per job for GET /jobs/<id>
+
+# Settings a submitted job may leave out (same defaults as the component screen)
+DEFAULT_JOB = {
+    'sheet_name': "Extra Component Report",
+    'dropdown_cell': "B6",
+    'start_row': 9,
+    'start_col': "A",
+    'end_column': "I",
+    'check_column': "B",
+    'max_row': 73,
+    'sentinel_range': "B9:B17",
+    'timeout': 10,
+    'save_location': DOWNLOADS_DIR,
+    'file_formats': ["PDF"],
+    'naming_mode': "dropdown",
+    'output_mode': "files",
+    'delta': False,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS service_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    submitted_at TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    job TEXT NOT NULL,
+    schedule_id INTEGER,
+    started_at TEXT,
+    finished_at TEXT,
+    result TEXT
+);
+CREATE TABLE IF NOT EXISTS schedules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cron TEXT NOT NULL,
+    job TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    last_fired TEXT
+);
+"""
+
+def parse_cron_field(field, low, high):
+    """Values allowed by one cron field ('*', '5', '1-5', '*/15', '0,30')"""
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f"Invalid cron field: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronSchedule:
+    """Five-field cron expression: minute hour day-of-month month day-of-week (0 = Sunday)"""
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("Cron expressions need five fields: minute hour day month weekday")
+        self.expression = expression
+        self.minutes = parse_cron_field(fields[0], 0, 59)
+        self.hours = parse_cron_field(fields[1], 0, 23)
+        self.days = parse_cron_field(fields[2], 1, 31)
+        self.months = parse_cron_field(fields[3], 1, 12)
+        self.weekdays = {day % 7 for day in parse_cron_field(fields[4], 0, 7)}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+    
+    def matches(self, moment):
+        if moment.minute not in self.minutes or moment.hour not in self.hours or moment.month not in self.months:
+            return False
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.isoweekday() % 7) in self.weekdays
+        # Like cron: when both day fields are restricted, either one may match
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+class ServiceJob:
+    """A queued or running job held in memory (the database has the durable copy)"""
+    def __init__(self, job_id, job, priority, submitted_at, schedule_id=None):
+        self.id = job_id
+        self.job = job
+        self.priority = priority
+        self.submitted_at = submitted_at
+        self.schedule_id = schedule_id
+        self.state = 'queued'
+        self.cancel_token = CancellationToken()
+        self.log_lines = deque(maxlen=LOG_TAIL)
+        self.progress = None
+        self.rates = None  # Planned (reads/min, writes/min) while running
+    
+    @property
+    def sheet_key(self):
+        return f"{self.job['spreadsheet_id']}|{self.job['sheet_name']}"
+    
+    def log(self, line):
+        self.log_lines.append(line)
+    
+    def set_progress(self, current, total, value, text):
+        self.progress = {'current': current, 'total': total, 'fraction': round(value, 3), 'text': text}
+
+class JobService:
+    def __init__(self, path=JOB_SERVICE_DB, max_running=SERVICE_MAX_RUNNING):
+        self.path = path
+        self.max_running = max_running
+        self.lock = threading.Lock()
+        self.queued = {}   # id -> ServiceJob
+        self.running = {}  # id -> ServiceJob
+        self.stop_event = threading.Event()
+        self.server = None
+        with self.connect() as connection:
+            connection.executescript(SCHEMA)
+            # Jobs that were running when the service stopped did not finish
+            connection.execute(
+                "UPDATE service_jobs SET state = 'interrupted', finished_at = ? WHERE state = 'running'",
+                (datetime.now().isoformat(timespec='seconds'),)
+            )
+            rows = connection.execute("SELECT * FROM service_jobs WHERE state = 'queued'").fetchall()
+        for row in rows:
+            entry = ServiceJob(row['id'], json.loads(row['job']), row['priority'], row['submitted_at'], row['schedule_id'])
+            self.queued[entry.id] = entry
+    
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+    
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self.connect() as connection:
+            connection.execute(f"UPDATE service_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+    
+    def submit(self, spec, priority=0, schedule_id=None):
+        """
+        Queue a job
+        Args:
+            spec: Job settings; 'spreadsheet_id' is required, the rest defaults to DEFAULT_JOB.
+                  Without 'components' the B6 list is read when the job starts.
+        Returns: job id
+        """
+        job = dict(DEFAULT_JOB)
+        job.update({key: value for key, value in spec.items() if key != 'priority'})
+        if not job.get('spreadsheet_id'):
+            raise ValueError("spreadsheet_id is required")
+        if job.get('sweep_levels'):
+            raise ValueError("Sweep jobs are not supported by the service")
+        job['skip_unchanged'] = False
+        job['sweep_levels'] = None
+        
+        submitted_at = datetime.now().isoformat(timespec='seconds')
+        with self.connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO service_jobs (submitted_at, priority, job, schedule_id) VALUES (?, ?, ?, ?)",
+                (submitted_at, int(priority), json.dumps(job), schedule_id)
+            )
+            job_id = cursor.lastrowid
+        with self.lock:
+            self.queued[job_id] = ServiceJob(job_id, job, int(priority), submitted_at, schedule_id)
+        return job_id
+    
+    def set_priority(self, job_id, priority):
+        with self.lock:
+            entry = self.queued.get(job_id)
+            if not entry:
+                return False
+            entry.priority = int(priority)
+        self._update(job_id, priority=int(priority))
+        return True
+    
+    def cancel(self, job_id):
+        with self.lock:
+            entry = self.queued.pop(job_id, None) or self.running.get(job_id)
+        if not entry:
+            return False
+        if entry.state == 'queued':
+            entry.state = 'cancelled'
+            self._update(job_id, state='cancelled', finished_at=datetime.now().isoformat(timespec='seconds'))
+        else:
+            entry.cancel_token.cancel()
+        return True
+    
+    def describe(self, job_id):
+        """Job row plus live progress and log tail when it is in memory"""
+        with self.connect() as connection:
+            row = connection.execute("SELECT * FROM service_jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        info = dict(row, job=json.loads(row['job']), result=json.loads(row['result']) if row['result'] else None)
+        with self.lock:
+            entry = self.running.get(job_id) or self.queued.get(job_id)
+        if entry:
+            info['state'] = entry.state
+            info['priority'] = entry.priority
+            info['progress'] = entry.progress
+            info['log'] = list(entry.log_lines)
+        return info
+    
+    def list_jobs(self, limit=50):
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT id, submitted_at, priority, state, schedule_id, started_at, finished_at FROM service_jobs "
+                "ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def add_schedule(self, cron, spec, priority=0):
+        CronSchedule(cron)  # Validate before storing
+        if not spec.get('spreadsheet_id'):
+            raise ValueError("spreadsheet_id is required")
+        with self.connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO schedules (cron, job, priority) VALUES (?, ?, ?)",
+                (cron, json.dumps(spec), int(priority))
+            )
+            return cursor.lastrowid
+    
+    def remove_schedule(self, schedule_id):
+        with self.connect() as connection:
+            return connection.execute("DELETE FROM schedules WHERE id = ?", (schedule_id,)).rowcount == 1
+    
+    def list_schedules(self):
+        with self.connect() as connection:
+            rows = connection.execute("SELECT * FROM schedules ORDER BY id").fetchall()
+        return [dict(row, job=json.loads(row['job'])) for row in rows]
+    
+    def fire_schedules(self, now):
+        """Submit the jobs of schedules due this minute (each fires at most once per minute)"""
+        minute = now.replace(second=0, microsecond=0)
+        stamp = minute.isoformat(timespec='minutes')
+        for schedule in self.list_schedules():
+            if schedule['last_fired'] and schedule['last_fired'] >= stamp:
+                continue
+            try:
+                if not CronSchedule(schedule['cron']).matches(minute):
+                    continue
+                with self.connect() as connection:
+                    connection.execute("UPDATE schedules SET last_fired = ? WHERE id = ?", (stamp, schedule['id']))
+                job_id = self.submit(schedule['job'], schedule['priority'], schedule['id'])
+                print(f"[DEBUG] Schedule {schedule['id']} ({schedule['cron']}) queued job {job_id}")
+            except Exception as e:
+                print(f"[DEBUG] Schedule {schedule['id']} failed: {e}")
+    
+    def budget(self):
+        """Per-minute read / write quota the service plans to stay under"""
+        accounts = max(1, len(sheets_manager.pool))
+        return READ_QUOTA_PER_USER * accounts * QUOTA_TARGET, WRITE_QUOTA_PER_USER * accounts * QUOTA_TARGET
+    
+    def planned_rates(self, entry):
+        """Estimated (reads/min, writes/min) of a job from the dry-run planner"""
+        job = dict(entry.job, components=entry.job.get('components') or ["(unknown)"])
+        plan = plan_job(job, job['spreadsheet_id'], accounts=len(sheets_manager.pool))
+        return plan['read_rate'], plan['write_rate']
+    
+    def next_job(self):
+        """
+        Highest-priority queued job that fits the concurrency and quota budget
+        and whose sheet is not busy (oldest first within a priority)
+        """
+        with self.lock:
+            if len(self.running) >= self.max_running:
+                return None
+            busy = {entry.sheet_key for entry in self.running.values()}
+            used_reads = sum(entry.rates[0] for entry in self.running.values() if entry.rates)
+            used_writes = sum(entry.rates[1] for entry in self.running.values() if entry.rates)
+            candidates = sorted(self.queued.values(), key=lambda entry: (-entry.priority, entry.id))
+        read_budget, write_budget = self.budget()
+        
+        for entry in candidates:
+            if entry.sheet_key in busy:
+                continue
+            try:
+                entry.rates = self.planned_rates(entry)
+            except Exception as e:
+                print(f"[DEBUG] Could not plan job {entry.id}: {e}")
+                entry.rates = (0, 0)
+            # A single job always runs, even if it alone exceeds the budget
+            fits = used_reads + entry.rates[0] <= read_budget and used_writes + entry.rates[1] <= write_budget
+            if fits or not self.running:
+                return entry
+        return None
+    
+    def dispatch_loop(self):
+        while not self.stop_event.wait(1):
+            try:
+                self.fire_schedules(datetime.now())
+                entry = self.next_job()
+                while entry:
+                    self.start_job(entry)
+                    entry = self.next_job()
+            except Exception as e:
+                print(f"[DEBUG] Dispatch failed: {e}")
+    
+    def start_job(self, entry):
+        with self.lock:
+            if self.queued.pop(entry.id, None) is None:
+                return  # Cancelled meanwhile
+            entry.state = 'running'
+            self.running[entry.id] = entry
+        self._update(entry.id, state='running', started_at=datetime.now().isoformat(timespec='seconds'))
+        threading.Thread(target=self.run_job, args=(entry,), daemon=True).start()
+    
+    def run_job(self, entry):
+        job = entry.job
+        state, summary = 'failed', None
+        try:
+            spreadsheet = sheets_manager.open_spreadsheet_by_id(job['spreadsheet_id'])
+            if not job.get('components') or not job.get('menu_value'):
+                worksheet = sheets_manager.get_worksheet(job['sheet_name'], spreadsheet)
+                if not worksheet:
+                    raise RuntimeError(f"Could not access sheet '{job['sheet_name']}'")
+                if not job.get('menu_value'):
+                    job['menu_value'] = sheets_manager.get_cell_value(worksheet, MENU_CELL)
+                if not job.get('components'):
+                    job['components'] = sheets_manager.read_dropdown_values_from_cell(
+                        worksheet, job['dropdown_cell'], job['sheet_name']
+                    )
+                    entry.log(f"Loaded {len(job['components'])} components")
+            if not job['components']:
+                raise RuntimeError("No components to process")
+            if job.get('delta') and not apply_delta(job, entry.log):
+                state, summary = 'done', {'success_count': 0, 'failed_count': 0, 'skipped': "No new components"}
+                return
+            
+            runner = ComponentReportRunner(
+                job,
+                entry.cancel_token,
+                log=entry.log,
+                progress=entry.set_progress,
+                spreadsheet=spreadsheet
+            )
+            result = runner.run()
+            if result:
+                summary = {key: result.get(key) for key in (
+                    'success_count', 'failed_count', 'failed_components', 'save_location',
+                    'archive_path', 'cancelled', 'api_stats', 'run_id'
+                )}
+                state = 'cancelled' if result['cancelled'] else 'done'
+        except Exception as e:
+            entry.log(f"Critical error: {str(e)}")
+            summary = {'error': str(e)}
+        finally:
+            entry.state = state
+            self._update(
+                entry.id,
+                state=state,
+                finished_at=datetime.now().isoformat(timespec='seconds'),
+                result=json.dumps(summary, default=str),
+                job=json.dumps(job)
+            )
+            with self.lock:
+                self.running.pop(entry.id, None)
+    
+    def status(self):
+        read_budget, write_budget = self.budget()
+        with self.lock:
+            running = [
+                {'id': entry.id, 'sheet': entry.sheet_key, 'priority': entry.priority,
+                 'progress': entry.progress, 'rates': entry.rates}
+                for entry in self.running.values()
+            ]
+            queued = len(self.queued)
+        return {
+            'running': running,
+            'queued': queued,
+            'max_running': self.max_running,
+            'read_budget': read_budget,
+            'write_budget': write_budget,
+            'accounts': sheets_manager.pool.status(),
+        }
+    
+    def start(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        """Connect, start the dispatcher and serve the API in background threads"""
+        if not sheets_manager.connected:
+            success, message = sheets_manager.connect()
+            if not success:
+                raise RuntimeError(message)
+        self.server = ThreadingHTTPServer((host, port), make_handler(self))
+        threading.Thread(target=self.dispatch_loop, name="job-dispatch", daemon=True).start()
+        threading.Thread(target=self.server.serve_forever, name="job-api", daemon=True).start()
+        print(f"[DEBUG] Job service listening on http://{host}:{port}")
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.server:
+            self.server.shutdown()
+        with self.lock:
+            running = list(self.running.values())
+        for entry in running:
+            entry.cancel_token.cancel()
+
+def make_handler(service):
+    """Request handler bound to a JobService"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            # Clients poll often; only failed requests are worth a line
+            if not str(args[1] if len(args) > 1 else "").startswith('2'):
+                print(f"[DEBUG] job service: {format % args}")
+        
+        def reply(self, status, payload):
+            body = json.dumps(payload, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b"{}") if length else {}
+        
+        def route(self, method):
+            parts = [part for part in self.path.split('?')[0].split('/') if part]
+            try:
+                if method == 'GET' and parts == ['status']:
+                    return self.reply(200, service.status())
+                if parts[:1] == ['jobs']:
+                    if method == 'GET' and len(parts) == 1:
+                        return self.reply(200, service.list_jobs())
+                    if method == 'POST' and len(parts) == 1:
+                        spec = self.read_json()
+                        return self.reply(201, {'id': service.submit(spec, spec.get('priority', 0))})
+                    job_id = int(parts[1])
+                    if method == 'GET' and len(parts) == 2:
+                        info = service.describe(job_id)
+                        return self.reply(200, info) if info else self.reply(404, {'error': "No such job"})
+                    if method == 'POST' and parts[2:] == ['priority']:
+                        found = service.set_priority(job_id, self.read_json()['priority'])
+                        return self.reply(200 if found else 409, {'ok': found})
+                    if method == 'POST' and parts[2:] == ['cancel']:
+                        found = service.cancel(job_id)
+                        return self.reply(200 if found else 409, {'ok': found})
+                if parts[:1] == ['schedules']:
+                    if method == 'GET' and len(parts) == 1:
+                        return self.reply(200, service.list_schedules())
+                    if method == 'POST' and len(parts) == 1:
+                        spec = self.read_json()
+                        return self.reply(201, {'id': service.add_schedule(spec['cron'], spec['job'], spec.get('priority', 0))})
+                    if method == 'DELETE' and len(parts) == 2:
+                        found = service.remove_schedule(int(parts[1]))
+                        return self.reply(200 if found else 404, {'ok': found})
+                self.reply(404, {'error': "Not found"})
+            except (ValueError, KeyError) as e:
+                self.reply(400, {'error': str(e)})
+            except Exception as e:
+                self.reply(500, {'error': str(e)})
+        
+        def do_GET(self):
+            self.route('GET')
+        
+        def do_POST(self):
+            self.route('POST')
+        
+        def do_DELETE(self):
+            self.route('DELETE')
+    
+    return Handler
+
+class ServiceClient:
+    """Minimal client for the job service API"""
+    def __init__(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        self.base_url = f"http://{host}:{port}"
+    
+    def request(self, method, path, payload=None, timeout=5):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(
+            self.base_url + path, data=data, method=method, headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.loads(e.read() or b"{}").get('error', f"HTTP {e.code}"))
+    
+    def available(self):
+        try:
+            self.request('GET', '/status', timeout=1)
+            return True
+        except Exception:
+            return False
+    
+    def submit(self, job, priority=0):
+        return self.request('POST', '/jobs', dict(job, priority=priority))['id']
+    
+    def job(self, job_id):
+        return self.request('GET', f"/jobs/{job_id}")
+    
+    def cancel(self, job_id):
+        return self.request('POST', f"/jobs/{job_id}/cancel")['ok']
+
+_local_service = None
+
+def ensure_service():
+    """Client for the job service, starting one inside this process if none is listening"""
+    global _local_service
+    client = ServiceClient()
+    if not client.available() and _local_service is None:
+        _local_service = JobService()
+        _local_service.start()
+    return client
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the local component report job service")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--max-running", type=int, default=SERVICE_MAX_RUNNING)
+    args = parser.parse_args()
+    
+    service = JobService(max_running=args.max_running)
+    service.start(port=args.port)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        service.stop()
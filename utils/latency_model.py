@@ -0,0 +1,122 @@
+"""
+Per-component recalculation latency model
+Remembers how long each component took to change the sentinel range in each
+sheet, and uses it to start polling near the expected completion time,
+lengthen the timeout for components that are known to be slow and flag
+unusually slow recalculations. The configured timeout is never shortened.
+"""
+from utils.config import LATENCY_STATS_FILE
+import json
+import os
+import statistics
+import threading
+
+MAX_SAMPLES = 20          # Observations kept per component
+MIN_SAMPLES = 3           # Observations needed before trusting a component's own history
+OUTLIER_MAD_FACTOR = 4.0  # Robust z-score limit for outliers
+
+class LatencyModel:
+    def __init__(self, path=LATENCY_STATS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # Parallel runners share the temporary file
+        self.stats = {}  # "spreadsheet_id|sheet" -> {component: [seconds, ...]}
+        self.load()
+    
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.stats = json.load(f)
+        except Exception as e:
+            print(f"[DEBUG] Could not load latency stats: {e}")
+            self.stats = {}
+    
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.stats)
+        try:
+            with self.save_lock:
+                partial_path = self.path + '.tmp'
+                with open(partial_path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(partial_path, self.path)
+        except Exception as e:
+            print(f"[DEBUG] Could not save latency stats: {e}")
+    
+    @staticmethod
+    def sheet_key(spreadsheet_id, sheet_name):
+        return f"{spreadsheet_id}|{sheet_name}"
+    
+    def samples(self, sheet_key, component):
+        """
+        Observations for a component, falling back to the whole sheet when it has too few
+        Returns: (samples, own) where own is False for sheet-wide fallback data
+        """
+        with self.lock:
+            sheet_stats = self.stats.get(sheet_key, {})
+            own = list(sheet_stats.get(component, []))
+            if len(own) >= MIN_SAMPLES:
+                return own, True
+            pooled = [s for name, values in sheet_stats.items() if name != component for s in values[-5:]]
+            return own + pooled, False
+    
+    def expected(self, sheet_key, component):
+        """Median time to change in seconds, or None if nothing is known"""
+        samples, _ = self.samples(sheet_key, component)
+        return statistics.median(samples) if samples else None
+    
+    def plan(self, sheet_key, component, default_timeout):
+        """
+        Polling plan for a component
+        Args:
+            default_timeout: The configured timeout, which is also the shortest timeout used
+        Returns: dict with initial_delay, check_interval, timeout and expected (may be None)
+        """
+        samples, own = self.samples(sheet_key, component)
+        if len(samples) < MIN_SAMPLES:
+            return {
+                'expected': None,
+                'initial_delay': 0,
+                'check_interval': 0.5,
+                'timeout': default_timeout,
+            }
+        
+        ordered = sorted(samples)
+        expected = statistics.median(ordered)
+        low = ordered[max(0, int(len(ordered) * 0.1) - 1)]
+        p95 = ordered[min(len(ordered) - 1, int(round(len(ordered) * 0.95)) - 1)]
+        
+        return {
+            'expected': expected,
+            # Start polling a little before the fastest usual completion
+            'initial_delay': max(0.0, min(low, expected * 0.8) - 0.25),
+            'check_interval': min(1.0, max(0.25, expected * 0.1)),
+            # Generous margin over the slow tail; only ever longer than configured, since
+            # a few quick observations say little about the next recalculation
+            'timeout': max(default_timeout, p95 * 2 + 1),
+        }
+    
+    def is_outlier(self, sheet_key, component, seconds):
+        """True if an observation is far outside the component's usual range"""
+        samples, own = self.samples(sheet_key, component)
+        if not own:
+            return False
+        median = statistics.median(samples)
+        mad = statistics.median(abs(s - median) for s in samples) or 0.1
+        return seconds > median * 2 and (seconds - median) / mad > OUTLIER_MAD_FACTOR
+    
+    def record(self, sheet_key, component, seconds):
+        """
+        Store an observed time to change
+        Returns: True if the observation was an outlier
+        """
+        outlier = self.is_outlier(sheet_key, component, seconds)
+        with self.lock:
+            values = self.stats.setdefault(sheet_key, {}).setdefault(component, [])
+            values.append(round(seconds, 3))
+            del values[:-MAX_SAMPLES]
+        return outlier
+
+# Global instance
+latency_model = LatencyModel()
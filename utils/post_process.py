@@ -0,0 +1,178 @@
+"""
+Post-processing stage for exported files
+Each component's files are handed to a process pool as soon as they are on
+disk, so checks and conversions run on other cores while the next component
+is exported. A step is a top-level function step(path, context) that raises
+PostProcessingError when a file is bad and may return {'path': new_path}
+when it replaces the file (e.g. compression). Built-in steps are registered
+by name; other steps can be given as "package.module:function".
+Worker processes are daemonic and may not start a pool of their own, so
+inside a worker the steps run on a thread pool instead.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import csv
+import gzip
+import importlib
+import multiprocessing
+import os
+import re
+import shutil
+import time
+import zipfile
+
+POST_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+class PostProcessingError(Exception):
+    pass
+
+def count_pdf_pages(path):
+    """Page objects in a PDF (without a PDF library)"""
+    with open(path, 'rb') as f:
+        return len(re.findall(rb"/Type\s*/Page(?![a-zA-Z])", f.read()))
+
+def count_rows(path):
+    """Data rows in a CSV or JSON Lines file"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.endswith('.csv'):
+            return sum(1 for _ in csv.reader(f))
+        return sum(1 for line in f if line.strip())
+
+def validate(path, context):
+    """
+    Non-empty file, PDF page count, row count against the rows written, readable XLSX / HTML
+    context['rows'] is the number of rows the row writers wrote (None: not known)
+    """
+    if path.endswith(('.csv', '.jsonl')):
+        rows = count_rows(path)
+        expected = context.get('rows')
+        if expected is not None and rows != expected:
+            raise PostProcessingError(f"{os.path.basename(path)} has {rows} rows, {expected} were written")
+        if rows == 0 and expected is None:
+            raise PostProcessingError(f"{os.path.basename(path)} is empty")
+        return {'detail': {'rows': rows}}
+    
+    if os.path.getsize(path) == 0:
+        raise PostProcessingError(f"{os.path.basename(path)} is empty")
+    
+    if path.endswith('.pdf'):
+        pages = count_pdf_pages(path)
+        if not pages:
+            raise PostProcessingError(f"{os.path.basename(path)} has no pages")
+        return {'detail': {'pages': pages}}
+    
+    if path.endswith('.xlsx') and not zipfile.is_zipfile(path):
+        raise PostProcessingError(f"{os.path.basename(path)} is not a valid workbook")
+    
+    if path.endswith('.html'):
+        with open(path, 'r', encoding='utf-8') as f:
+            if "<tr" not in f.read():
+                raise PostProcessingError(f"{os.path.basename(path)} has no table rows")
+    return None
+
+def compress(path, context):
+    """Replace the file with a gzip copy (file.ext.gz)"""
+    target = path + '.gz'
+    partial_path = target + '.part'
+    try:
+        with open(path, 'rb') as source, gzip.open(partial_path, 'wb', compresslevel=6) as destination:
+            shutil.copyfileobj(source, destination, 1024 * 1024)
+        os.replace(partial_path, target)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    os.remove(path)
+    return {'path': target}
+
+# Step name -> (function, label shown in the UI)
+POST_STEPS = {
+    'validate': (validate, "Validate files (not empty, PDF pages, row counts)"),
+    'compress': (compress, "Compress files (gzip)"),
+}
+
+def resolve_step(name):
+    """Step function for a built-in name or a "package.module:function" reference"""
+    if name in POST_STEPS:
+        return POST_STEPS[name][0]
+    if ":" not in name:
+        raise ValueError(f"Unknown post-processing step: {name}")
+    module_name, function_name = name.split(":", 1)
+    return getattr(importlib.import_module(module_name), function_name)
+
+def run_steps(step_names, paths, context):
+    """
+    Run every step on every file of one component (runs in a pool process)
+    Returns: dict with final paths, seconds per step, details and errors
+    """
+    result = {'paths': [], 'steps': {}, 'details': {}, 'errors': [], 'files': len(paths)}
+    for path in paths:
+        for name in step_names:
+            started = time.time()
+            try:
+                output = resolve_step(name)(path, context) or {}
+            except Exception as e:
+                result['errors'].append(f"{name}: {e}")
+                break
+            finally:
+                result['steps'][name] = result['steps'].get(name, 0.0) + time.time() - started
+            if output.get('detail'):
+                result['details'].setdefault(os.path.basename(path), {}).update(output['detail'])
+            path = output.get('path', path)
+        result['paths'].append(path)
+    return result
+
+class PostProcessor:
+    def __init__(self, step_names, workers=POST_WORKERS):
+        """
+        Args:
+            step_names: Steps in the order they run on each file
+        """
+        for name in step_names:
+            resolve_step(name)  # Fail before the run starts, not on the first file
+        self.step_names = list(step_names)
+        self.in_process = multiprocessing.current_process().daemon
+        if self.in_process:
+            # Daemonic processes cannot have children; the workers already use several cores
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="post")
+        else:
+            # spawn: workers must not inherit the Sheets client or the UI
+            self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    
+    def submit(self, paths, context):
+        """
+        Post-process one component's files
+        Returns: Future with the run_steps result
+        """
+        return self.executor.submit(run_steps, self.step_names, list(paths), context)
+    
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+def apply_result(outcome, post):
+    """Store a run_steps result in a component outcome; True if every file passed"""
+    outcome['output_paths'] = post['paths']
+    outcome['output_path'] = post['paths'][0] if post['paths'] else None
+    outcome['output_bytes'] = sum(os.path.getsize(path) for path in post['paths'] if os.path.exists(path))
+    outcome['post'] = {key: post[key] for key in ('steps', 'details', 'errors', 'files')}
+    outcome['phases']['post'] = round(sum(post['steps'].values()), 3)
+    return not post['errors']
+
+def summarize(outcomes):
+    """Post-processing totals over a run's outcomes, or None if nothing was post-processed"""
+    summary = {'files': 0, 'failed': 0, 'steps': {}}
+    for outcome in outcomes.values():
+        post = outcome.get('post')
+        if not post:
+            continue
+        summary['files'] += post['files']
+        summary['failed'] += int(bool(post['errors']))
+        for name, seconds in post['steps'].items():
+            summary['steps'][name] = round(summary['steps'].get(name, 0.0) + seconds, 3)
+    return summary if summary['files'] else None
+
+def describe(summary):
+    """One log line for the post-processing totals"""
+    steps = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in summary['steps'].items())
+    line = f"Post-processing: {summary['files']} files ({steps})"
+    if summary['failed']:
+        line += f", {summary['failed']} component(s) failed a check"
+    return line
@@ -0,0 +1,353 @@
+"""
+Multi-process worker mode
+The coordinator queues the job's components in the SQLite work queue, makes
+one spreadsheet copy per worker and starts one worker process per copy, so
+CPU-side work (XLSX serialization, hashing) runs on several cores instead of
+one. Workers claim tasks with a lease, report every finished component to the
+queue, and the coordinator merges the outcomes into one run report. The
+coordinator also runs the AIMD concurrency controller on the finished tasks
+and sets the job's limit, so only that many workers claim tasks at a time.
+
+Workers on other machines can join a queued job when the queue database and
+the save location are on a shared disk:
+    python -m utils.process_workers --db <work_queue.db> --job <id> --spreadsheet <copy id>
+Each worker needs a spreadsheet of its own, since workers sharing one would
+overwrite each other's dropdown value.
+"""
+from utils.google_sheets import sheets_manager
+from utils.report_runner import ComponentReportRunner
+from utils.replica_run import ReplicaRun
+from utils.work_queue import WorkQueue, RENEW_SECONDS
+from utils.run_history import run_history
+from utils.latency_model import latency_model
+from utils.archive_output import ARCHIVE_EXTENSIONS
+from utils.concurrency_control import ConcurrencyController, describe
+from utils.component_order import ordered_work
+from utils import post_process
+from utils.cancellation import CancellationToken, OperationCancelled
+from utils.retry_policy import FAILURE_ERROR
+from utils.config import WORK_QUEUE_DB
+import argparse
+import atexit
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+STALE_WAIT_SECONDS = 5  # Poll interval while waiting for a dead worker's leases to expire
+STATE_POLL_SECONDS = 2  # How quickly workers notice a cancelled job
+HOLD_BACK_SECONDS = 2   # Poll interval while the concurrency limit keeps a worker waiting
+
+class QueueWork:
+    """(index, component) iterator that leases tasks from the work queue"""
+    def __init__(self, work_queue, job_id, worker, cancel_token):
+        self.work_queue = work_queue
+        self.job_id = job_id
+        self.worker = worker
+        self.cancel_token = cancel_token
+        self.claimed = {}  # component -> task index, until its outcome is stored
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        while True:
+            item = self.work_queue.claim(self.job_id, self.worker)
+            if item:
+                self.claimed[item[1]] = item[0]
+                return item
+            if self.work_queue.held_back(self.job_id, self.worker):
+                self.cancel_token.sleep(HOLD_BACK_SECONDS)
+                continue
+            # Tasks of a worker that stopped renewing come back once their lease expires
+            if not self.work_queue.stale_leases(self.job_id, self.worker):
+                raise StopIteration
+            self.cancel_token.sleep(STALE_WAIT_SECONDS)
+
+class QueueRunner(ComponentReportRunner):
+    """Runner that stores every finished component in the work queue"""
+    def __init__(self, job, cancel_token, work, **kwargs):
+        super().__init__(job, cancel_token, work=work, record=False, **kwargs)
+    
+    def finalize(self, value, outcome):
+        super().finalize(value, outcome)
+        idx = self.work.claimed.pop(value, None)
+        if idx is None:
+            return
+        try:
+            if not self.work.work_queue.complete(
+                self.work.job_id, idx, self.work.worker, outcome, self.attempt_history.get(value, [])
+            ):
+                self.log(f"  Warning: Lease on '{value}' was lost; another worker owns it now")
+        except Exception as e:
+            self.log(f"  Warning: Could not store the result of '{value}': {e}")
+
+def heartbeat(work_queue, job_id, worker, cancel_token, stop):
+    """Renew the worker's leases and stop the worker when the job is cancelled"""
+    renewed = time.time()
+    while not stop.wait(STATE_POLL_SECONDS):
+        try:
+            if time.time() - renewed >= RENEW_SECONDS:
+                state = work_queue.renew(job_id, worker)
+                renewed = time.time()
+            else:
+                state = work_queue.job_state(job_id)
+            if state != 'running':
+                cancel_token.cancel()
+        except Exception as e:
+            print(f"[DEBUG] Lease renewal failed: {e}")
+
+def worker_main(db_path, job_id, worker, spreadsheet_id=None):
+    """
+    Worker process entry point: claim and process tasks until the queue is empty
+    Args:
+        spreadsheet_id: Spreadsheet (copy) this worker sets the dropdown in; defaults to the job's
+    Returns: Exit code
+    """
+    log = lambda line: print(f"[{worker}] {line}", flush=True)
+    work_queue = WorkQueue(db_path)
+    job, state = work_queue.get_job(job_id)
+    if state != 'running':
+        log(f"Job {job_id} is {state}")
+        return 0
+    
+    success, message = sheets_manager.connect()
+    if success:
+        success, message = sheets_manager.open_spreadsheet(f"https://docs.google.com/spreadsheets/d/{job['spreadsheet_id']}")
+    if not success:
+        log(f"Error: {message}")
+        return 1
+    spreadsheet = sheets_manager.open_spreadsheet_by_id(spreadsheet_id) if spreadsheet_id else None
+    
+    cancel_token = CancellationToken()
+    stop = threading.Event()
+    threading.Thread(target=heartbeat, args=(work_queue, job_id, worker, cancel_token, stop), daemon=True).start()
+    
+    api_before = sheets_manager.get_api_stats()
+    call_bytes_before = sheets_manager.get_call_bytes()
+    runner = QueueRunner(
+        job,
+        cancel_token,
+        QueueWork(work_queue, job_id, worker, cancel_token),
+        log=log,
+        spreadsheet=spreadsheet
+    )
+    try:
+        result = runner.run()
+    finally:
+        stop.set()
+        # Unfinished tasks go straight back instead of waiting for their leases to expire
+        work_queue.release(job_id, worker)
+        api_after = sheets_manager.get_api_stats()
+        work_queue.finish_worker(
+            job_id,
+            worker,
+            {key: api_after[key] - api_before.get(key, 0) for key in api_after},
+            ComponentReportRunner.call_bytes_delta(call_bytes_before, sheets_manager.get_call_bytes())
+        )
+    return 0 if result else 1
+
+def _process_entry(db_path, job_id, worker, spreadsheet_id):
+    raise SystemExit(worker_main(db_path, job_id, worker, spreadsheet_id))
+
+class ProcessCoordinator:
+    def __init__(self, job, workers, cancel_token, log=print, progress=None, db_path=WORK_QUEUE_DB):
+        """
+        Args:
+            job: Job dict (see ComponentReportScreen.build_job)
+            workers: Number of local worker processes (one spreadsheet copy each)
+            db_path: Work queue database (put it on a shared disk to add workers on other machines)
+        """
+        self.job = job
+        self.workers = workers
+        self.cancel_token = cancel_token
+        self.log = log
+        self.progress = progress or (lambda current, total, value, text: None)
+        self.work_queue = WorkQueue(db_path)
+        self.controller = None
+    
+    def run(self):
+        """
+        Queue the job, run the worker processes and merge their results
+        Returns: Summary dict, or None if no spreadsheet copy could be made
+        """
+        job = dict(self.job, restore_original=False)
+        if job.get('output_mode') in ARCHIVE_EXTENSIONS:
+            # An archive can only be appended to by one process
+            self.log("Archive output is not available with worker processes; writing separate files")
+            job['output_mode'] = 'files'
+        if not os.path.exists(job['save_location']):
+            os.makedirs(job['save_location'], exist_ok=True)
+        
+        started = time.time()
+        api_before = sheets_manager.get_api_stats()
+        replicas = ReplicaRun(job, self.workers, self.cancel_token, log=self.log)
+        job_id = None
+        
+        atexit.register(replicas.delete_replicas)
+        try:
+            replicas.create_replicas()
+            if not replicas.copies:
+                self.log("Error: No spreadsheet copies available")
+                return None
+            
+            job_id = self.work_queue.create_job(job, ordered_work(job, self.log))
+            self.log(f"Queued {len(job['components'])} components as job {job_id} ({self.work_queue.path})")
+            if job.get('adaptive_concurrency', True) and len(replicas.copies) > 1:
+                self.controller = ConcurrencyController(len(replicas.copies), log=self.log)
+                self.work_queue.set_concurrency(job_id, self.controller.allowed())
+            
+            context = multiprocessing.get_context('spawn')
+            processes = []
+            for n, (file_id, _) in enumerate(replicas.copies, 1):
+                worker = f"{socket.gethostname()}-{n}"
+                process = context.Process(
+                    target=_process_entry,
+                    args=(self.work_queue.path, job_id, worker, file_id),
+                    daemon=True
+                )
+                process.start()
+                processes.append(process)
+            self.log(f"Started {len(processes)} worker processes")
+            
+            self.monitor(job_id, processes)
+        
+        except OperationCancelled:
+            self.log("Automation stopped by user")
+        
+        finally:
+            replicas.delete_replicas()
+            atexit.unregister(replicas.delete_replicas)
+        
+        if job_id is None:
+            return None
+        if not self.cancel_token.cancelled:
+            self.work_queue.set_job_state(job_id, 'finished')
+        # Workers saved their own latency observations
+        latency_model.load()
+        return self.merge(job, job_id, started, api_before)
+    
+    def monitor(self, job_id, processes):
+        """Log finished components and progress until every worker process has exited"""
+        total = len(self.job['components'])
+        since = 0
+        stop_sent = False
+        while True:
+            if self.cancel_token.cancelled and not stop_sent:
+                self.log("Stopping workers...")
+                self.work_queue.set_job_state(job_id, 'cancelled')
+                stop_sent = True
+            
+            for task in self.work_queue.finished_since(job_id, since):
+                since = task['finished_at']
+                if task['state'] == 'done':
+                    self.log(f"[{task['idx']}/{total}] ✓ {task['component']} ({task['worker']})")
+                else:
+                    self.log(f"[{task['idx']}/{total}] ✗ {task['component']}: {task['outcome'].get('reason')}")
+                if self.controller:
+                    limit = self.controller.allowed()
+                    self.controller.observe(task['outcome'])
+                    if self.controller.allowed() != limit:
+                        self.work_queue.set_concurrency(job_id, self.controller.allowed())
+            
+            counts = self.work_queue.counts(job_id)
+            finished = counts.get('done', 0) + counts.get('failed', 0)
+            self.progress(finished, total, finished / total if total else 1.0,
+                          f"{finished}/{total} done, {counts.get('leased', 0)} in progress")
+            
+            if not any(process.is_alive() for process in processes):
+                break
+            time.sleep(1)
+        
+        for process in processes:
+            if process.exitcode:
+                self.log(f"Warning: A worker process exited with code {process.exitcode}")
+        left = counts.get('pending', 0) + counts.get('leased', 0)
+        if left and not self.cancel_token.cancelled:
+            self.log(f"Warning: {left} component(s) were not processed (no worker left)")
+    
+    def merge(self, job, job_id, started, api_before):
+        """Build one run report from the queue and record it in the run history"""
+        tasks, workers = self.work_queue.results(job_id)
+        
+        result = {
+            'success_count': 0,
+            'failed_count': 0,
+            'failed_components': [],
+            'attempt_history': {},
+            'latency_outliers': [],
+            'save_location': job['save_location'],
+            'archive_path': None,
+            'cancelled': self.cancel_token.cancelled,
+        }
+        outcomes = {}
+        for task in tasks:
+            outcome = task['outcome']
+            component = task['component']
+            if not outcome:
+                if result['cancelled']:
+                    continue  # Never started before the stop
+                # Still pending / leased after every worker exited
+                result['failed_count'] += 1
+                result['failed_components'].append({
+                    'name': component,
+                    'reason': "Not processed (no worker left)",
+                    'kind': FAILURE_ERROR,
+                    'attempts': len(task['attempts'] or []),
+                })
+                continue
+            outcomes[component] = outcome
+            result['attempt_history'][component] = task['attempts'] or []
+            if outcome['success']:
+                result['success_count'] += 1
+            else:
+                result['failed_count'] += 1
+                result['failed_components'].append({
+                    'name': component,
+                    'reason': outcome['reason'],
+                    'kind': outcome['kind'],
+                    'attempts': len(task['attempts'] or []),
+                })
+        
+        # This process made and deleted the copies; the workers did everything else
+        api_after = sheets_manager.get_api_stats()
+        api_stats = {key: api_after[key] - api_before.get(key, 0) for key in api_after}
+        call_bytes = {}
+        for worker in workers:
+            for key, value in (worker['api_stats'] or {}).items():
+                api_stats[key] = api_stats.get(key, 0) + value
+            for label, entry in (worker['call_bytes'] or {}).items():
+                merged = call_bytes.setdefault(label, {})
+                for key, value in entry.items():
+                    merged[key] = merged.get(key, 0) + value
+        result['api_stats'] = api_stats
+        result['call_bytes'] = call_bytes
+        
+        self.log("=" * 40)
+        self.log(f"COMPLETE! Success: {result['success_count']}, Failed: {result['failed_count']} "
+                 f"({len(workers)} workers)")
+        if self.controller:
+            result['concurrency'] = self.controller.summary()
+            self.log(describe(result['concurrency']))
+        result['post_processing'] = post_process.summarize(outcomes)
+        if result['post_processing']:
+            self.log(post_process.describe(result['post_processing']))
+        self.log("=" * 40)
+        
+        try:
+            result['run_id'] = run_history.record_run(
+                job, result, outcomes, result['attempt_history'], started, time.time(), api_stats
+            )
+        except Exception as e:
+            self.log(f"Warning: Could not save run history: {e}")
+        return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process component tasks from a queued job")
+    parser.add_argument("--db", default=WORK_QUEUE_DB, help="Work queue database")
+    parser.add_argument("--job", type=int, required=True, help="Queued job id")
+    parser.add_argument("--spreadsheet", help="Spreadsheet (copy) id used only by this worker")
+    parser.add_argument("--worker", default=f"{socket.gethostname()}-{os.getpid()}", help="Worker name")
+    args = parser.parse_args()
+    raise SystemExit(worker_main(args.db, args.job, args.worker, args.spreadsheet))
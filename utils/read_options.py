@@ -0,0 +1,53 @@
+"""
+Read options for Sheets API value reads
+Each call site picks a preset so only the data it needs crosses the wire:
+render option, major dimension and a fields mask.
+"""
+
+class ReadOptions:
+    def __init__(self, label, value_render="FORMATTED_VALUE", major_dimension="ROWS", fields="values"):
+        """
+        Args:
+            label: Name used for per-call byte accounting
+            value_render: FORMATTED_VALUE, UNFORMATTED_VALUE or FORMULA
+            major_dimension: ROWS or COLUMNS
+            fields: Response fields mask (drops range/majorDimension echo)
+        """
+        self.label = label
+        self.value_render = value_render
+        self.major_dimension = major_dimension
+        self.fields = fields
+    
+    def params(self):
+        return {
+            'valueRenderOption': self.value_render,
+            'majorDimension': self.major_dimension,
+            'fields': self.fields,
+        }
+
+# Change detection only compares values, so skip number formatting
+SENTINEL = ReadOptions("sentinel", value_render="UNFORMATTED_VALUE")
+
+# Single column scan: one flat list instead of one list per row
+COLUMN_SCAN = ReadOptions("column_scan", major_dimension="COLUMNS")
+
+# Exported data keeps the formatted strings users see in the sheet
+EXPORT = ReadOptions("export")
+
+# Single cells and dropdown sources are shown as text
+CELL = ReadOptions("cell")
+VALIDATION_SOURCE = ReadOptions("validation_source")
+
+# Background polling of the menu cell and the dropdown source (compared by hash)
+WATCH = ReadOptions("watch")
+
+# Grid data for local rendering: formatted and typed values, effective formatting,
+# merges and pixel sizes of the requested range only
+GRID = ReadOptions(
+    "grid",
+    fields=(
+        "sheets(merges,data(startRow,startColumn,rowMetadata(pixelSize),columnMetadata(pixelSize),"
+        "rowData(values(formattedValue,effectiveValue,effectiveFormat(numberFormat,backgroundColor,"
+        "borders,horizontalAlignment,verticalAlignment,wrapStrategy,textFormat)))))"
+    )
+)
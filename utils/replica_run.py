@@ -0,0 +1,323 @@
+"""
+Spreadsheet replica parallelism
+Every B6 change in one spreadsheet queues on the same recalculation engine, so
+this mode makes temporary Drive copies of the spreadsheet and runs one worker
+per copy. The workers pull from one shared component list, so recalculations
+happen in independent spreadsheets at the same time. An AIMD controller
+decides how many of the copies are busy at once.
+Each copy is written to a ledger as soon as it exists and deleted when the run
+ends; copies left behind by a crash are deleted the next time the app connects.
+"""
+from utils.google_sheets import sheets_manager
+from utils.report_runner import ComponentReportRunner
+from utils.run_history import run_history
+from utils.archive_output import ArchiveSink, ARCHIVE_EXTENSIONS, generate_archive_name, recover_archives
+from utils.concurrency_control import ConcurrencyController, describe
+from utils.component_order import ordered_work
+from utils import post_process
+from utils.cancellation import OperationCancelled
+from utils.retry_policy import FAILURE_ERROR
+from utils.config import REPLICA_LEDGER_FILE
+from datetime import datetime
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+MAX_REPLICAS = 8  # Copies per run (each one is a full spreadsheet in Drive)
+
+class ReplicaLedger:
+    """Spreadsheet copies that still have to be deleted (survives crashes)"""
+    def __init__(self, path=REPLICA_LEDGER_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+    
+    def entries(self):
+        with self.lock:
+            return self._read()
+    
+    def _read(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"[DEBUG] Could not read replica ledger: {e}")
+        return {}
+    
+    def _write(self, entries):
+        partial_path = self.path + '.tmp'
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(partial_path, self.path)
+    
+    def add(self, file_id, title):
+        with self.lock:
+            entries = self._read()
+            entries[file_id] = {'title': title, 'created': datetime.now().isoformat(timespec='seconds')}
+            self._write(entries)
+    
+    def remove(self, file_id):
+        with self.lock:
+            entries = self._read()
+            if entries.pop(file_id, None) is not None:
+                self._write(entries)
+
+def delete_replica(file_id):
+    """Delete one copy and drop it from the ledger (kept there if the delete fails)"""
+    try:
+        if sheets_manager.delete_file(file_id):
+            replica_ledger.remove(file_id)
+            return True
+        print(f"[DEBUG] Could not delete replica {file_id}")
+    except Exception as e:
+        print(f"[DEBUG] Could not delete replica {file_id}: {e}")
+    return False
+
+def cleanup_leftovers(log=print):
+    """
+    Delete copies left behind by a crashed run
+    Returns: Number of copies deleted
+    """
+    deleted = 0
+    for file_id, entry in replica_ledger.entries().items():
+        if delete_replica(file_id):
+            log(f"Deleted leftover spreadsheet copy '{entry['title']}'")
+            deleted += 1
+    return deleted
+
+class SharedWork:
+    """Thread-safe (index, component) iterator shared by the replica workers"""
+    def __init__(self, items):
+        self.queue = queue.Queue()
+        for item in items:
+            self.queue.put(item)
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            raise StopIteration
+
+class ReplicaRun:
+    def __init__(self, job, replicas, cancel_token, log=print, progress=None):
+        """
+        Args:
+            job: Job dict (see ComponentReportScreen.build_job)
+            replicas: Number of spreadsheet copies (and workers)
+        """
+        self.job = job
+        self.replicas = max(1, min(MAX_REPLICAS, replicas))
+        self.cancel_token = cancel_token
+        self.log = log
+        self.progress = progress or (lambda current, total, value, text: None)
+        self.copies = []  # (file_id, gspread Spreadsheet)
+        self.controller = None
+        self.done = 0
+        self.lock = threading.Lock()
+        self.worker_errors = []  # Why workers stopped early (for components nobody processed)
+    
+    def create_replicas(self):
+        """Copy the spreadsheet, record each copy and give every pooled account access"""
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        title = sheets_manager.current_sheet.title
+        other_accounts = [account.email for account in sheets_manager.pool.accounts[1:]]
+        
+        for n in range(1, self.replicas + 1):
+            self.cancel_token.check()
+            name = f"{title} [replica {n}] {stamp}"
+            self.log(f"Creating spreadsheet copy {n}/{self.replicas}...")
+            try:
+                file_id = sheets_manager.copy_spreadsheet(name, self.job['spreadsheet_id'], self.cancel_token)
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                self.log(f"Warning: Could not copy the spreadsheet: {e}")
+                break
+            
+            replica_ledger.add(file_id, name)
+            try:
+                for email in other_accounts:
+                    sheets_manager.share_file(file_id, email, self.cancel_token)
+                self.copies.append((file_id, sheets_manager.open_spreadsheet_by_id(file_id)))
+            except OperationCancelled:
+                delete_replica(file_id)
+                raise
+            except Exception as e:
+                self.log(f"Warning: Could not open copy {n}: {e}")
+                delete_replica(file_id)
+                break
+    
+    def delete_replicas(self):
+        for file_id, _ in self.copies:
+            delete_replica(file_id)
+        if self.copies:
+            self.log(f"Deleted {len(self.copies)} spreadsheet copies")
+        self.copies = []
+    
+    def run(self):
+        """
+        Run the job on the copies
+        Returns: Summary dict merged over all workers, or None if no copy could be made
+        """
+        job = self.job
+        if not os.path.exists(job['save_location']):
+            os.makedirs(job['save_location'], exist_ok=True)
+        
+        started = time.time()
+        api_before = sheets_manager.get_api_stats()
+        call_bytes_before = sheets_manager.get_call_bytes()
+        runners = []
+        archive = None
+        post_processor = None
+        
+        # Deletes the copies if the app is closed mid-run
+        atexit.register(self.delete_replicas)
+        try:
+            self.create_replicas()
+            if not self.copies:
+                self.log("Error: No spreadsheet copies available")
+                return None
+            self.log(f"Running on {len(self.copies)} spreadsheet copies")
+            if job.get('adaptive_concurrency', True) and len(self.copies) > 1:
+                self.controller = ConcurrencyController(len(self.copies), log=self.log)
+            
+            output_mode = job.get('output_mode', 'files')
+            if output_mode in ARCHIVE_EXTENSIONS:
+                # Archives a crashed run left open are repaired before a new one is started
+                recover_archives(job['save_location'], self.log)
+                archive_path = os.path.join(job['save_location'], generate_archive_name(job, output_mode))
+                archive = ArchiveSink(archive_path, output_mode)
+                self.log(f"Writing into archive: {archive_path}")
+            elif job.get('post_steps'):
+                # One pool for all workers
+                post_processor = post_process.PostProcessor(job['post_steps'])
+                self.log(f"Post-processing: {', '.join(job['post_steps'])}")
+            
+            work = SharedWork(ordered_work(job, self.log))
+            replica_job = dict(job, restore_original=False)
+            threads = []
+            for n, (file_id, spreadsheet) in enumerate(self.copies, 1):
+                runner = ComponentReportRunner(
+                    replica_job,
+                    self.cancel_token,
+                    log=lambda line, n=n: self.log(f"[copy {n}] {line}"),
+                    progress=self.component_done,
+                    spreadsheet=spreadsheet,
+                    work=work,
+                    archive=archive,
+                    record=False,
+                    concurrency=self.controller,
+                    post_processor=post_processor
+                )
+                runners.append(runner)
+                thread = threading.Thread(target=self.run_worker, args=(runner,), daemon=True)
+                threads.append(thread)
+                thread.start()
+            
+            for thread in threads:
+                thread.join()
+        
+        except OperationCancelled:
+            self.log("Automation stopped by user")
+        
+        finally:
+            if post_processor:
+                post_processor.close()
+            if archive:
+                archive.close()
+            self.delete_replicas()
+            atexit.unregister(self.delete_replicas)
+        
+        result = self.merge(runners, job['components'])
+        result['save_location'] = job['save_location']
+        result['archive_path'] = archive.path if archive else None
+        
+        self.log("=" * 40)
+        self.log(f"COMPLETE! Success: {result['success_count']}, Failed: {result['failed_count']} "
+                 f"({len(runners)} copies)")
+        if self.controller:
+            result['concurrency'] = self.controller.summary()
+            self.log(describe(result['concurrency']))
+        self.log("=" * 40)
+        
+        api_after = sheets_manager.get_api_stats()
+        api_stats = {key: api_after[key] - api_before.get(key, 0) for key in api_after}
+        result['api_stats'] = api_stats
+        result['call_bytes'] = ComponentReportRunner.call_bytes_delta(call_bytes_before, sheets_manager.get_call_bytes())
+        
+        outcomes = {}
+        for runner in runners:
+            outcomes.update(runner.outcomes)
+        result['post_processing'] = post_process.summarize(outcomes)
+        if result['post_processing']:
+            self.log(post_process.describe(result['post_processing']))
+        try:
+            result['run_id'] = run_history.record_run(
+                job, result, outcomes, result['attempt_history'], started, time.time(), api_stats
+            )
+        except Exception as e:
+            self.log(f"Warning: Could not save run history: {e}")
+        
+        return result
+    
+    def run_worker(self, runner):
+        try:
+            if runner.run() is None:
+                self.worker_errors.append("could not open the worksheet on a copy")
+        except Exception as e:
+            self.log(f"Error: Worker stopped: {e}")
+            self.worker_errors.append(f"worker stopped: {e}")
+    
+    def component_done(self, current, total, value, text):
+        """Progress over all workers (each worker reports the component it starts)"""
+        with self.lock:
+            if not text.startswith("Retrying"):
+                self.done += 1
+            done = self.done
+        self.progress(done, total, done / total if total else 1.0, text)
+    
+    def merge(self, runners, components):
+        """Combine the per-worker summaries; components no worker finished count as failed"""
+        result = {
+            'success_count': 0,
+            'failed_count': 0,
+            'failed_components': [],
+            'attempt_history': {},
+            'latency_outliers': [],
+            'cancelled': self.cancel_token.cancelled,
+        }
+        for runner in runners:
+            result['success_count'] += runner.success_count
+            result['failed_count'] += runner.failed_count
+            result['failed_components'].extend(runner.failed_components)
+            result['attempt_history'].update(runner.attempt_history)
+            result['latency_outliers'].extend(runner.latency_outliers)
+        
+        # Components no worker reached or finished (e.g. every copy failed to open the sheet)
+        finished = set()
+        for runner in runners:
+            finished.update(runner.outcomes)
+        untouched = [component for component in components if component not in finished]
+        if untouched and not result['cancelled']:
+            reason = "Not processed" + (f" ({self.worker_errors[0]})" if self.worker_errors else "")
+            self.log(f"Warning: {len(untouched)} component(s) were not processed")
+            result['failed_count'] += len(untouched)
+            result['failed_components'].extend(
+                {
+                    'name': component,
+                    'reason': reason,
+                    'kind': FAILURE_ERROR,
+                    'attempts': len(result['attempt_history'].get(component, [])),
+                }
+                for component in untouched
+            )
+        return result
+
+# Global instance
+replica_ledger = ReplicaLedger()
@@ -0,0 +1,691 @@
+"""
+Component report runner
+Processes every B6 value without any UI dependency: set the dropdown,
+wait for the sentinel range to change, find the data end and export.
+Failed components are retried at the end of the run according to their failure type.
+Row formats (CSV, XLSX, JSON Lines) are streamed chunk by chunk into local spool
+files while the range is read, so memory use does not grow with the range size
+(in archive mode they go through a bounded pipe straight into the archive member).
+Everything that goes to the save location (spooled row files, rendered files and
+PDFs) is written by a background disk-writer stage while the next component runs.
+Finished files are then post-processed (validated, compressed, ...) on a process pool.
+"""
+from utils.google_sheets import sheets_manager
+from utils import read_options
+from utils.cancellation import OperationCancelled
+from utils.latency_model import latency_model
+from utils.run_history import run_history
+from utils.export_writers import ROW_WRITERS, write_rows, write_bytes, write_stream
+from utils.grid_render import GRID_RENDERERS, parse_grid, write_rendered
+from utils.disk_writer import DiskWriter, RowPipe
+from utils.archive_output import ArchiveSink, ARCHIVE_EXTENSIONS, generate_archive_name, recover_archives
+from utils.concurrency_control import GatedWork
+from utils.component_order import ordered_work
+from utils import post_process
+from utils.retry_policy import (
+    RetryQueue, classify_failure, FAILURE_NO_CHANGE, FAILURE_LABELS
+)
+import io
+import os
+import tempfile
+from datetime import datetime
+import time
+
+EXPORT_EXTENSIONS = {
+    "PDF": "pdf",
+    "Excel (XLSX)": "xlsx",
+    "CSV": "csv",
+    "JSON Lines": "jsonl",
+    "Formatted Excel (XLSX)": "formatted.xlsx",
+    "HTML (printable)": "html",
+}
+
+SPOOL_BYTES = 8 * 1024 * 1024  # Row files larger than this spill from memory to a local temp file
+
+class ComponentReportRunner:
+    def __init__(self, job, cancel_token, log=print, progress=None,
+                 spreadsheet=None, work=None, archive=None, record=True, concurrency=None,
+                 post_processor=None):
+        """
+        Args:
+            job: Dict of run settings (see ComponentReportScreen.build_job)
+            cancel_token: CancellationToken checked between and during steps
+            log: Callable receiving log lines
+            progress: Callable(current, total, fraction, text) for progress updates
+            spreadsheet: gspread Spreadsheet to run on (a replica); defaults to the opened one
+            work: Iterable of (index, component) shared with other runners; defaults to every job
+                  component in the job's cost-aware order (see component_order)
+            archive: ArchiveSink shared with other runners (closed by its owner)
+            record: Store the run in the run history
+            concurrency: ConcurrencyController shared with other runners (a slot per component)
+            post_processor: PostProcessor shared with other runners (closed by its owner)
+        """
+        self.job = job
+        self.cancel_token = cancel_token
+        self.log = log
+        self.progress = progress or (lambda current, total, value, text: None)
+        self.spreadsheet = spreadsheet
+        self.work = work
+        self.record = record
+        self.concurrency = concurrency
+        self.worksheet = None
+        self.attempt_history = {}  # component -> list of attempt records
+        self.outcomes = {}         # component -> final outcome dict
+        self.failed_components = []
+        self.latency_outliers = []
+        self.pending_writes = []   # (component, index, attempt, outcome, future) waiting for the disk
+        self.disk_writer = DiskWriter()
+        self.archive = archive     # ArchiveSink when the job writes into a ZIP / tar.gz
+        self.owns_archive = archive is None
+        self.post_processor = post_processor
+        self.owns_post_processor = post_processor is None
+        self.success_count = 0
+        self.failed_count = 0
+        self.latency_key = latency_model.sheet_key(job.get('spreadsheet_id') or sheets_manager.spreadsheet_id, job['sheet_name'])
+    
+    def run(self):
+        """
+        Run the job
+        Returns: Summary dict, or None if the worksheet could not be opened
+        """
+        job = self.job
+        sheet_name = job['sheet_name']
+        dropdown_cell = job['dropdown_cell']
+        components = job['components']
+        
+        if not os.path.exists(job['save_location']):
+            os.makedirs(job['save_location'], exist_ok=True)
+        
+        worksheet = sheets_manager.get_worksheet(sheet_name, self.spreadsheet)
+        if not worksheet:
+            self.log("Error: Could not access worksheet")
+            return None
+        self.worksheet = worksheet
+        
+        started = time.time()
+        api_before = sheets_manager.get_api_stats()
+        call_bytes_before = sheets_manager.get_call_bytes()
+        original_value = sheets_manager.get_cell_value(worksheet, dropdown_cell)
+        retry_queue = RetryQueue()
+        total = len(components)
+        
+        output_mode = job.get('output_mode', 'files')
+        if self.owns_archive and output_mode in ARCHIVE_EXTENSIONS:
+            # Archives a crashed run left open are repaired before a new one is started
+            recover_archives(job['save_location'], self.log)
+            archive_path = os.path.join(job['save_location'], generate_archive_name(job, output_mode))
+            self.archive = ArchiveSink(archive_path, output_mode)
+            self.log(f"Writing into archive: {archive_path}")
+        
+        self.start_post_processing()
+        
+        work = self.work or ordered_work(job, self.log)
+        if self.concurrency:
+            work = GatedWork(work, self.concurrency, self.cancel_token)
+        
+        try:
+            for position, (idx, value) in enumerate(work, 1):
+                if self.cancel_token.cancelled:
+                    raise OperationCancelled("Cancelled by user")
+                
+                self.progress(position, total, position / total, f"Processing: {value}")
+                self.log(f"[{idx}/{total}] Processing: '{value}'")
+                
+                outcome = self.process_component(worksheet, value, idx)
+                if self.concurrency:
+                    self.concurrency.release(outcome)
+                self.record_attempt(value, idx, 1, outcome, retry_queue)
+                self.collect_writes(retry_queue)
+            
+            self.run_retry_stage(worksheet, retry_queue)
+        
+        except OperationCancelled:
+            self.log("Automation stopped by user")
+            # Data already fetched is still written to disk
+            self.collect_writes(retry_queue, wait=True)
+            # Pending retries keep the outcome of their last attempt
+            for value, idx, kind, attempt in retry_queue.drain():
+                self.finalize(value, self.attempt_history[value][-1])
+        
+        finally:
+            self.disk_writer.close()
+            if self.post_processor and self.owns_post_processor:
+                self.post_processor.close()
+            if self.archive and self.owns_archive:
+                self.archive.close()
+            latency_model.save()
+            
+            # Restore original value (after any write abandoned on stop has landed)
+            if original_value and job.get('restore_original', True):
+                self.cancel_token.wait_for_pending()
+                self.log(f"Restoring original {dropdown_cell} value: {original_value}")
+                sheets_manager.set_cell_value(worksheet, dropdown_cell, original_value, settle=0)
+        
+        self.log("=" * 40)
+        self.log(f"COMPLETE! Success: {self.success_count}, Failed: {self.failed_count}")
+        post_summary = post_process.summarize(self.outcomes)
+        if post_summary:
+            self.log(post_process.describe(post_summary))
+        self.log("=" * 40)
+        
+        result = {
+            'success_count': self.success_count,
+            'failed_count': self.failed_count,
+            'failed_components': self.failed_components,
+            'attempt_history': self.attempt_history,
+            'latency_outliers': self.latency_outliers,
+            'save_location': job['save_location'],
+            'archive_path': self.archive.path if self.archive else None,
+            'cancelled': self.cancel_token.cancelled,
+            'post_processing': post_summary,
+        }
+        
+        api_after = sheets_manager.get_api_stats()
+        api_stats = {key: api_after[key] - api_before.get(key, 0) for key in api_after}
+        result['api_stats'] = api_stats
+        result['call_bytes'] = self.call_bytes_delta(call_bytes_before, sheets_manager.get_call_bytes())
+        
+        if self.record:
+            try:
+                result['run_id'] = run_history.record_run(
+                    job, result, self.outcomes, self.attempt_history, started, time.time(), api_stats
+                )
+            except Exception as e:
+                self.log(f"Warning: Could not save run history: {e}")
+        
+        return result
+    
+    def start_post_processing(self):
+        """Create the runner's own post-processor when the job has post-processing steps"""
+        post_steps = self.job.get('post_steps') or []
+        if not self.owns_post_processor or not post_steps:
+            return
+        if self.archive:
+            self.log("Post-processing is not available with archive output; skipped")
+            return
+        self.post_processor = post_process.PostProcessor(post_steps)
+        mode = " (threads in this worker process)" if self.post_processor.in_process else ""
+        self.log(f"Post-processing: {', '.join(post_steps)}{mode}")
+    
+    @staticmethod
+    def call_bytes_delta(before, after):
+        """Per-call-type byte accounting for this run only"""
+        delta = {}
+        for label, entry in after.items():
+            previous = before.get(label, {})
+            calls = entry['calls'] - previous.get('calls', 0)
+            if calls:
+                delta[label] = {key: entry[key] - previous.get(key, 0) for key in entry}
+        return delta
+    
+    def run_retry_stage(self, worksheet, retry_queue):
+        """Retry queued components with backoff until they succeed or run out of attempts"""
+        announced = False
+        while True:
+            # Files still being written may fail and need a retry too
+            self.collect_writes(retry_queue, wait=not retry_queue)
+            if not retry_queue:
+                return
+            
+            if not announced:
+                self.log("=" * 40)
+                self.log(f"Retrying {len(retry_queue)} component(s)...")
+                announced = True
+            
+            value, idx, kind, attempt = retry_queue.pop_due(self.cancel_token)
+            policy = retry_queue.policy_for(kind)
+            
+            self.progress(idx, len(self.job['components']), 1.0, f"Retrying: {value} (attempt {attempt})")
+            self.log(f"[retry {attempt}/{policy.max_attempts}] Processing: '{value}' ({FAILURE_LABELS[kind]})")
+            
+            if self.concurrency:
+                self.concurrency.acquire(self.cancel_token)
+            outcome = self.process_component(worksheet, value, idx, policy.timeout_for(attempt, 1))
+            if self.concurrency:
+                self.concurrency.release(outcome)
+            self.record_attempt(value, idx, attempt, outcome, retry_queue)
+    
+    def record_attempt(self, value, idx, attempt, outcome, retry_queue):
+        """Store the attempt and either finalize the component or requeue it"""
+        write = outcome.pop('write', None)
+        outcome['attempt'] = attempt
+        self.attempt_history.setdefault(value, []).append(outcome)
+        
+        # Settled once its files are on disk (see collect_writes)
+        if write is not None:
+            self.pending_writes.append((value, idx, attempt, outcome, write))
+            return
+        
+        self.settle(value, idx, attempt, outcome, retry_queue)
+    
+    def settle(self, value, idx, attempt, outcome, retry_queue):
+        # A missing sentinel change still exports, but is worth one more look
+        needs_retry = not outcome['success'] or outcome['kind'] == FAILURE_NO_CHANGE
+        if needs_retry:
+            delay = retry_queue.schedule(value, idx, outcome['kind'], attempt)
+            if delay is not None:
+                self.log(f"  Queued for retry in {delay:.0f}s ({FAILURE_LABELS[outcome['kind']]})")
+                return
+        
+        self.finalize(value, outcome)
+    
+    def collect_writes(self, retry_queue, wait=False):
+        """
+        Settle components whose background writes (and post-processing) have finished
+        Args:
+            wait: Block until every pending write has finished
+        """
+        still_pending = []
+        for entry in self.pending_writes:
+            value, idx, attempt, outcome, future = entry
+            if not wait and not self.write_finished(future):
+                still_pending.append(entry)
+                continue
+            
+            try:
+                written = future.result()
+                outcome['output_paths'] = written['paths']
+                outcome['output_path'] = written['paths'][0] if written['paths'] else None
+                outcome['output_bytes'] = written['bytes']
+                outcome['phases']['disk'] = round(written['seconds'], 3)
+                self.log(f"  ✓ Saved: {', '.join(os.path.basename(path) for path in written['paths'])}")
+                if written.get('post'):
+                    try:
+                        post = written['post'].result()
+                    except Exception as e:
+                        post = {'paths': written['paths'], 'steps': {}, 'details': {}, 'files': len(written['paths']),
+                                'errors': [f"Post-processing failed: {e}"]}
+                    if not post_process.apply_result(outcome, post):
+                        error_msg = f"Post-processing: {'; '.join(post['errors'])}"
+                        self.log(f"  ✗ {value}: {error_msg}")
+                        outcome.update({'success': False, 'kind': classify_failure(error_msg), 'reason': error_msg})
+                if self.archive:
+                    self.archive.record({
+                        'component': value,
+                        'attempt': attempt,
+                        'files': written['files'],
+                        'started': datetime.fromtimestamp(outcome['started']).isoformat(timespec='seconds'),
+                        'duration': round(outcome['duration'], 3),
+                        'phases': outcome['phases'],
+                    })
+            except Exception as e:
+                error_msg = f"Write failed: {str(e)}"
+                self.log(f"  ✗ {value}: {error_msg}")
+                outcome.update({'success': False, 'kind': classify_failure(error_msg), 'reason': error_msg})
+            
+            self.settle(value, idx, attempt, outcome, retry_queue)
+        self.pending_writes = still_pending
+    
+    @staticmethod
+    def write_finished(future):
+        """A write counts as finished once its post-processing (if any) has finished too"""
+        if not future.done():
+            return False
+        if future.exception() is not None:
+            return True
+        post = future.result().get('post')
+        return post is None or post.done()
+    
+    def finalize(self, value, outcome):
+        self.outcomes[value] = outcome
+        if outcome['success']:
+            self.success_count += 1
+        else:
+            self.failed_count += 1
+            self.failed_components.append({
+                'name': value,
+                'reason': outcome['reason'],
+                'kind': outcome['kind'],
+                'attempts': len(self.attempt_history.get(value, [])),
+            })
+    
+    def process_component(self, worksheet, value, idx, timeout_multiplier=1):
+        """
+        Process a single component
+        Args:
+            timeout_multiplier: Stretch factor for the sentinel timeout (used by retries)
+        Returns: Outcome dict with success, kind (failure type or None), reason, duration
+        """
+        job = self.job
+        dropdown_cell = job['dropdown_cell']
+        sentinel_range = job['sentinel_range']
+        cancel_token = self.cancel_token
+        started = time.time()
+        sheets_manager.reset_byte_meter()
+        phases = {}
+        recalc = [None]
+        rows = [None]
+        phase_started = [started]
+        
+        def mark(phase):
+            """Record the time spent since the previous phase ended"""
+            now = time.time()
+            phases[phase] = round(now - phase_started[0], 3)
+            phase_started[0] = now
+        
+        # Poll around the component's usual recalculation time
+        plan = latency_model.plan(self.latency_key, value, job['timeout'])
+        timeout = plan['timeout'] * timeout_multiplier
+        if plan['timeout'] != job['timeout']:
+            self.log(
+                f"  Timeout {plan['timeout']:.1f}s instead of the configured {job['timeout']}s "
+                f"(recalculations of '{value}' have been slow)"
+            )
+        
+        def outcome(success, kind=None, reason=""):
+            return {
+                'success': success,
+                'kind': kind,
+                'reason': reason,
+                'started': started,
+                'duration': time.time() - started,
+                'phases': phases,
+                'output_path': None,
+                'output_paths': [],
+                'output_bytes': None,
+                'bytes_in': sheets_manager.read_byte_meter(),
+                'throttled': sheets_manager.read_throttle_meter(),
+                'expected': plan['expected'],
+                'recalc': recalc[0],
+                'rows': rows[0],
+            }
+        
+        try:
+            # Read sentinel values BEFORE setting B6
+            self.log(f"  Reading sentinel range: {sentinel_range}")
+            initial_sentinel = sheets_manager.read_range(worksheet, sentinel_range, cancel_token)
+            mark('sentinel_read')
+            
+            # Set B6 to new value
+            self.log(f"  Setting {dropdown_cell} to: {value}")
+            write_started = time.time()
+            settle = 0 if plan['expected'] is not None else 2
+            if not sheets_manager.set_cell_value(worksheet, dropdown_cell, value, cancel_token, settle=settle):
+                self.log("  Error: Could not set dropdown value")
+                return outcome(False, classify_failure('Could not set dropdown value'), 'Could not set dropdown value')
+            mark('write')
+            
+            # Wait for sheet to update (monitor sentinel)
+            if plan['expected'] is not None:
+                self.log(f"  Waiting for sheet update (monitoring {sentinel_range}, expected ~{plan['expected']:.1f}s)...")
+            else:
+                self.log(f"  Waiting for sheet update (monitoring {sentinel_range})...")
+            change_detected = self.wait_for_change(
+                worksheet,
+                sentinel_range,
+                initial_sentinel,
+                timeout,
+                initial_delay=max(0, plan['initial_delay'] - (time.time() - write_started)),
+                check_interval=plan['check_interval'],
+                started=write_started
+            )
+            mark('wait')
+            
+            if change_detected:
+                change_time = time.time() - write_started
+                recalc[0] = round(change_time, 3)
+                self.log(f"  Sheet updated successfully ({change_time:.1f}s)")
+                if latency_model.record(self.latency_key, value, change_time):
+                    self.log(f"  Warning: Unusually slow recalculation ({change_time:.1f}s, usually ~{plan['expected']:.1f}s)")
+                    self.latency_outliers.append({'name': value, 'seconds': change_time, 'expected': plan['expected']})
+            else:
+                self.log(f"  Warning: No change detected after {timeout:g}s, proceeding anyway")
+            
+            # Find last row by scanning backwards from max_row
+            self.log(f"  Scanning backwards from row {job['max_row']}...")
+            last_row = self.find_last_row_backwards(worksheet, job['check_column'], job['start_row'], job['max_row'])
+            self.log(f"  Data ends at row: {last_row}")
+            rows[0] = max(0, last_row - job['start_row'] + 1)
+            mark('scan')
+            
+            data_range = f"{job['start_col']}{job['start_row']}:{job['end_column']}{last_row}"
+            self.log(f"  Exporting range: {data_range}")
+            
+            base_path = os.path.join(job['save_location'], self.generate_basename(value, idx, job['naming_mode']))
+            success, msg, data = self.fetch(data_range, base_path)
+            mark('export')
+            
+            if success:
+                # Hand the rest to the disk writer and move on (waits only if its queue is full)
+                write = self.disk_writer.submit(self.write_files, base_path, data, cancel_token=cancel_token)
+                mark('queue')
+                if not change_detected:
+                    result = outcome(True, FAILURE_NO_CHANGE, f"No change detected after {timeout:g}s")
+                else:
+                    result = outcome(True)
+                result['write'] = write
+                return result
+            
+            self.log(f"  ✗ Failed: {msg}")
+            if not change_detected:
+                return outcome(False, FAILURE_NO_CHANGE, msg)
+            return outcome(False, classify_failure(msg), msg)
+        
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            error_msg = str(e)
+            self.log(f"  ✗ Error: {error_msg}")
+            return outcome(False, classify_failure(error_msg), error_msg)
+    
+    def fetch(self, data_range, base_path):
+        """
+        Read the data range for every format of the job
+        The range is streamed once into all row formats and read once (with formatting)
+        for all locally rendered formats; PDF is downloaded in the same pass.
+        Returns: (success, message, data) where data has 'row_files' (see stream_rows) or
+                 'row_members' (see pipe_rows), 'rows_written', 'grid' and 'pdf' (None if not needed)
+        """
+        file_formats = self.job['file_formats']
+        
+        unknown = [fmt for fmt in file_formats if fmt != "PDF" and fmt not in ROW_WRITERS and fmt not in GRID_RENDERERS]
+        if unknown or not file_formats:
+            return False, f"Unknown format: {', '.join(unknown)}", None
+        
+        data = {'row_files': [], 'row_members': None, 'rows_written': None, 'grid': None, 'pdf': None}
+        try:
+            if any(fmt in GRID_RENDERERS for fmt in file_formats):
+                data['grid'] = parse_grid(sheets_manager.read_grid(self.worksheet, data_range, self.cancel_token))
+            
+            if "PDF" in file_formats:
+                pdf = io.BytesIO()
+                success, msg = sheets_manager.download_range_pdf(self.worksheet, data_range, pdf, self.cancel_token)
+                if not success:
+                    return False, msg, None
+                data['pdf'] = pdf.getvalue()
+            
+            # Rows last: in archive mode they reach the archive while they are read
+            row_formats = [fmt for fmt in file_formats if fmt in ROW_WRITERS]
+            if row_formats and self.archive:
+                data['row_members'], data['rows_written'] = self.pipe_rows(data_range, base_path, row_formats)
+            elif row_formats:
+                data['row_files'], data['rows_written'] = self.stream_rows(data_range, base_path, row_formats)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return False, f"Export error: {str(e)}", None
+        
+        return True, "Fetched", data
+    
+    def stream_rows(self, data_range, base_path, row_formats):
+        """
+        Stream the range into every row format in one pass (one chunk in memory at a time)
+        The rows must be read before the next component changes the dropdown, so this
+        runs in the component loop, but only into local spool files: copying them into
+        the save location is left to the disk-writer stage.
+        Returns: (list of (path, spool), number of rows written)
+        """
+        paths = [f"{base_path}.{EXPORT_EXTENSIONS[fmt]}" for fmt in row_formats]
+        writers = [ROW_WRITERS[fmt](path) for fmt, path in zip(row_formats, paths)]
+        spools = [tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) for _ in writers]
+        
+        rows = sheets_manager.iter_range_rows(self.worksheet, data_range, read_options.EXPORT, self.cancel_token)
+        try:
+            count = write_rows(rows, writers, self.cancel_token, streams=spools)
+        except BaseException:
+            for spool in spools:
+                spool.close()
+            raise
+        return list(zip(paths, spools)), count
+    
+    def pipe_rows(self, data_range, base_path, row_formats):
+        """
+        Archive mode: stream the range into archive members in one pass, without temporary files
+        The rows are read here in the component loop and handed through a bounded pipe
+        to a disk-writer thread that writes them into the open archive member.
+        Returns: (Future with the list of archive members, number of rows read)
+        """
+        paths = [f"{base_path}.{EXPORT_EXTENSIONS[fmt]}" for fmt in row_formats]
+        pipe = RowPipe()
+        members = self.disk_writer.submit(self.archive_rows, paths, row_formats, pipe, cancel_token=self.cancel_token)
+        
+        rows = sheets_manager.iter_range_rows(self.worksheet, data_range, read_options.EXPORT, self.cancel_token)
+        try:
+            count = pipe.feed(rows, self.cancel_token)
+        except BrokenPipeError:
+            # Raise the archive writer's own error
+            members.result()
+            raise
+        return members, count
+    
+    def archive_rows(self, paths, row_formats, pipe):
+        """
+        Write piped rows into the archive (runs on the disk-writer threads)
+        The first row format streams straight into its open member. An archive takes one
+        member at a time, so further row formats are held in memory until it is done.
+        Returns: list of archive members
+        """
+        try:
+            writers = [ROW_WRITERS[fmt](path) for fmt, path in zip(row_formats, paths)]
+            buffers = [io.BytesIO() for _ in paths[1:]]
+            members = [self.archive.add(
+                os.path.basename(paths[0]),
+                lambda stream: write_rows(pipe, writers, streams=[stream] + buffers)
+            )]
+            for path, buffer in zip(paths[1:], buffers):
+                members.append(self.archive.add_bytes(os.path.basename(path), buffer.getvalue()))
+            return members
+        finally:
+            pipe.close()
+    
+    @staticmethod
+    def close_spools(data):
+        for _, spool in data['row_files']:
+            spool.close()
+    
+    def write_files(self, base_path, data):
+        """
+        Write the rest of the fetched data (runs on the disk-writer threads)
+        In archive mode the files become archive members named like the files would be.
+        Returns: dict with paths, files (archive members), bytes and seconds
+        """
+        started = time.time()
+        file_formats = self.job['file_formats']
+        written = {'paths': [], 'files': [], 'bytes': 0}
+        
+        # Rendered locally from the grid data (no export endpoint involved)
+        renders = [
+            (GRID_RENDERERS[fmt], f"{base_path}.{EXPORT_EXTENSIONS[fmt]}")
+            for fmt in file_formats if fmt in GRID_RENDERERS
+        ]
+        title = os.path.basename(base_path)
+        pdf_path = f"{base_path}.{EXPORT_EXTENSIONS['PDF']}" if data['pdf'] is not None else None
+        
+        if self.archive:
+            # Row members were written from the pipe while the range was read
+            if data['row_members']:
+                written['files'].extend(data['row_members'].result())
+            for renderer, path in renders:
+                member = self.archive.add(
+                    os.path.basename(path),
+                    lambda stream, renderer=renderer: renderer(data['grid'], stream, title)
+                )
+                written['files'].append(member)
+            if pdf_path:
+                written['files'].append(self.archive.add_bytes(os.path.basename(pdf_path), data['pdf']))
+            written['paths'] = [os.path.join(self.archive.path, member['name']) for member in written['files']]
+            written['bytes'] = sum(member['bytes'] for member in written['files'])
+        else:
+            try:
+                for path, spool in data['row_files']:
+                    spool.seek(0)
+                    write_stream(path, spool)
+                    written['paths'].append(path)
+            finally:
+                self.close_spools(data)
+            for renderer, path in renders:
+                write_rendered(path, renderer, data['grid'], title)
+                written['paths'].append(path)
+            if pdf_path:
+                write_bytes(pdf_path, data['pdf'])
+                written['paths'].append(pdf_path)
+            written['bytes'] = sum(os.path.getsize(path) for path in written['paths'] if os.path.exists(path))
+        
+        written['seconds'] = time.time() - started
+        if self.post_processor and not self.archive and written['paths']:
+            # Starts on the pool right away; collect_writes picks up the result
+            # Checked against what the writers wrote (trailing empty rows are not written)
+            written['post'] = self.post_processor.submit(written['paths'], {'rows': data['rows_written']})
+        return written
+    
+    def wait_for_change(self, worksheet, sentinel_range, initial_values, timeout,
+                        initial_delay=0, check_interval=0.5, started=None):
+        """
+        Wait for sentinel range to change (indicates sheet has updated)
+        Args:
+            initial_delay: Seconds to wait before the first poll
+            check_interval: Seconds between polls
+            started: Time the timeout is measured from (defaults to now)
+        """
+        start_time = started or time.time()
+        
+        if initial_delay > 0:
+            self.cancel_token.sleep(initial_delay)
+        
+        while time.time() - start_time < timeout:
+            try:
+                current_values = sheets_manager.read_range(worksheet, sentinel_range, self.cancel_token)
+                if current_values != initial_values:
+                    return True  # Change detected
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                self.log(f"  Warning: Error reading sentinel: {e}")
+            
+            self.cancel_token.sleep(check_interval)
+        
+        return False  # Timeout reached
+    
+    def find_last_row_backwards(self, worksheet, column_letter, start_row, max_row):
+        """Scan backwards from max_row to find last row with data"""
+        try:
+            # Only rows start_row..max_row are fetched (index 0 = start_row)
+            column_values = sheets_manager.read_column(worksheet, column_letter, start_row, max_row, self.cancel_token)
+            
+            # Scan backwards from max_row
+            for offset in range(len(column_values) - 1, -1, -1):
+                cell_value = column_values[offset]
+                if cell_value and str(cell_value).strip():
+                    return start_row + offset
+            
+            # If no data found, return start_row
+            return start_row
+        
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            self.log(f"  Error in backward scan: {e}")
+            return start_row
+    
+    def generate_basename(self, dropdown_value, index, naming_mode):
+        """File name without extension (shared by all formats of a component)"""
+        clean_value = "".join(c for c in dropdown_value if c.isalnum() or c in (' ', '_', '-')).strip()
+        clean_value = clean_value.replace(' ', '_')
+        
+        if naming_mode == "dropdown":
+            return clean_value
+        elif naming_mode == "sequential":
+            return f"Report_{index}"
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            return f"{timestamp}_{index}"
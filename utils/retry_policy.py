@@ -0,0 +1,120 @@
+"""
+Retry policies for failed components
+Failures are classified by type (quota, timeout, export HTTP error,
+no change detected) and requeued with increasing backoff at the end of a run.
+"""
+import heapq
+import re
+import time
+
+# Failure types
+FAILURE_QUOTA = "quota"
+FAILURE_TIMEOUT = "timeout"
+FAILURE_EXPORT_HTTP = "export_http"
+FAILURE_NO_CHANGE = "no_change"
+FAILURE_ERROR = "error"
+
+FAILURE_LABELS = {
+    FAILURE_QUOTA: "Quota exceeded",
+    FAILURE_TIMEOUT: "Timeout",
+    FAILURE_EXPORT_HTTP: "Export HTTP error",
+    FAILURE_NO_CHANGE: "No change detected",
+    FAILURE_ERROR: "Error",
+}
+
+class RetryPolicy:
+    def __init__(self, max_attempts, base_delay, multiplier=2.0, max_delay=120, timeout_multiplier=1.0):
+        """
+        Args:
+            max_attempts: Total attempts including the first one
+            base_delay: Seconds to wait before the first retry
+            multiplier: Backoff growth factor per retry
+            max_delay: Upper bound for the backoff delay
+            timeout_multiplier: Growth factor for the sentinel timeout per retry
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.timeout_multiplier = timeout_multiplier
+    
+    def delay_for(self, attempt):
+        """Backoff before the given attempt number (2 = first retry)"""
+        return min(self.max_delay, self.base_delay * self.multiplier ** max(0, attempt - 2))
+    
+    def timeout_for(self, attempt, base_timeout):
+        """Sentinel timeout to use for the given attempt number"""
+        return base_timeout * self.timeout_multiplier ** max(0, attempt - 1)
+
+DEFAULT_POLICIES = {
+    # Per-user quota refills every minute, so wait long enough for it to recover
+    FAILURE_QUOTA: RetryPolicy(max_attempts=4, base_delay=30, multiplier=2, max_delay=120),
+    FAILURE_TIMEOUT: RetryPolicy(max_attempts=3, base_delay=5, multiplier=2, max_delay=30, timeout_multiplier=1.5),
+    FAILURE_EXPORT_HTTP: RetryPolicy(max_attempts=3, base_delay=10, multiplier=2, max_delay=60),
+    # The sheet may just be slow to recalculate: retry once with a longer timeout
+    FAILURE_NO_CHANGE: RetryPolicy(max_attempts=2, base_delay=2, timeout_multiplier=2),
+    FAILURE_ERROR: RetryPolicy(max_attempts=2, base_delay=5),
+}
+
+def classify_failure(reason):
+    """Map an exception or failure message to a failure type"""
+    text = str(reason).lower()
+    
+    if "429" in text or "quota" in text or "rate limit" in text or "ratelimit" in text:
+        return FAILURE_QUOTA
+    if "timed out" in text or "timeout" in text:
+        return FAILURE_TIMEOUT
+    if re.search(r"export failed: \d{3}", text):
+        return FAILURE_EXPORT_HTTP
+    return FAILURE_ERROR
+
+class RetryQueue:
+    """Components waiting for a retry, ordered by when they are due"""
+    def __init__(self, policies=None):
+        self.policies = policies or DEFAULT_POLICIES
+        self._heap = []
+        self._counter = 0
+    
+    def __len__(self):
+        return len(self._heap)
+    
+    def policy_for(self, kind):
+        return self.policies.get(kind, self.policies[FAILURE_ERROR])
+    
+    def schedule(self, component, index, kind, attempt):
+        """
+        Queue the next attempt of a component
+        Args:
+            attempt: Number of the attempt that just failed
+        Returns: Backoff delay in seconds, or None if attempts are exhausted
+        """
+        policy = self.policy_for(kind)
+        next_attempt = attempt + 1
+        if next_attempt > policy.max_attempts:
+            return None
+        
+        delay = policy.delay_for(next_attempt)
+        self._counter += 1
+        heapq.heappush(self._heap, (time.time() + delay, self._counter, component, index, kind, next_attempt))
+        return delay
+    
+    def pop_due(self, cancel_token=None):
+        """
+        Wait until the next retry is due and return it
+        Returns: (component, index, kind, attempt)
+        """
+        # Sleep before popping so a cancelled wait leaves the item queued
+        wait = self._heap[0][0] - time.time()
+        if wait > 0:
+            if cancel_token:
+                cancel_token.sleep(wait)
+            else:
+                time.sleep(wait)
+        _, _, component, index, kind, attempt = heapq.heappop(self._heap)
+        return component, index, kind, attempt
+    
+    def drain(self):
+        """Remove and return all queued retries (used when the run is stopped)"""
+        items = [(component, index, kind, attempt) for _, _, component, index, kind, attempt in self._heap]
+        self._heap = []
+        return items
@@ -0,0 +1,435 @@
+"""
+Local run-history store (SQLite)
+Records every run with its parameters, component outcomes, per-phase timings,
+API call counts and output sizes, and compares the latest run of a
+spreadsheet with its rolling baseline to spot throughput regressions.
+"""
+from utils.config import RUN_HISTORY_DB
+from utils.concurrency_control import describe
+from utils import post_process
+import json
+import sqlite3
+import statistics
+import threading
+from datetime import datetime
+
+BASELINE_RUNS = 10         # Previous runs used for the rolling baseline
+REGRESSION_THRESHOLD = 0.7  # Flag when throughput drops below 70% of baseline
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    spreadsheet_id TEXT,
+    sheet_name TEXT,
+    menu_value TEXT,
+    params TEXT,
+    components INTEGER,
+    success_count INTEGER,
+    failed_count INTEGER,
+    cancelled INTEGER,
+    duration REAL,
+    reads INTEGER,
+    writes INTEGER,
+    exports INTEGER,
+    bytes_in INTEGER,
+    bytes_out INTEGER,
+    call_bytes TEXT,
+    throttled INTEGER,
+    concurrency TEXT,
+    post_processing TEXT,
+    options TEXT
+);
+CREATE TABLE IF NOT EXISTS component_results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    component TEXT NOT NULL,
+    success INTEGER,
+    kind TEXT,
+    reason TEXT,
+    attempts INTEGER,
+    duration REAL,
+    phases TEXT,
+    output_path TEXT,
+    output_bytes INTEGER,
+    bytes_in INTEGER,
+    rows INTEGER,
+    output_paths TEXT
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    scope TEXT PRIMARY KEY,
+    drive_version TEXT,
+    modified_time TEXT,
+    source_hash TEXT,
+    run_ids TEXT,
+    recorded_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_spreadsheet ON runs(spreadsheet_id, sheet_name, id);
+CREATE INDEX IF NOT EXISTS idx_results_run ON component_results(run_id);
+"""
+
+# Job settings worth keeping with each run
+PARAM_KEYS = [
+    'start_row', 'start_col', 'end_column', 'check_column', 'max_row',
+    'sentinel_range', 'timeout', 'save_location', 'file_formats', 'naming_mode',
+    'output_mode',
+]
+
+class RunHistory:
+    def __init__(self, path=RUN_HISTORY_DB):
+        self.path = path
+        self.lock = threading.Lock()
+        self._initialized = False
+    
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        if not self._initialized:
+            connection.executescript(SCHEMA)
+            connection.commit()
+            self._initialized = True
+        return connection
+    
+    def record_run(self, job, result, outcomes, attempt_history, started, finished, api_stats):
+        """
+        Store a finished run
+        Args:
+            outcomes: component -> final outcome dict from the runner
+            api_stats: API call counters for this run (reads, writes, exports, bytes_in, throttled)
+        Returns: run id
+        """
+        bytes_out = sum(outcome.get('output_bytes') or 0 for outcome in outcomes.values())
+        
+        with self.lock:
+            connection = self.connect()
+            try:
+                with connection:
+                    cursor = connection.execute(
+                        """INSERT INTO runs (started_at, finished_at, spreadsheet_id, sheet_name, menu_value,
+                               params, components, success_count, failed_count, cancelled, duration,
+                               reads, writes, exports, bytes_in, bytes_out, call_bytes, throttled, concurrency,
+                               post_processing, options)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        (
+                            datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+                            datetime.fromtimestamp(finished).isoformat(timespec='seconds'),
+                            job.get('spreadsheet_id'),
+                            job['sheet_name'],
+                            job.get('menu_value'),
+                            json.dumps({key: job.get(key) for key in PARAM_KEYS}),
+                            len(job['components']),
+                            result['success_count'],
+                            result['failed_count'],
+                            int(bool(result.get('cancelled'))),
+                            finished - started,
+                            api_stats.get('reads', 0),
+                            api_stats.get('writes', 0),
+                            api_stats.get('exports', 0),
+                            api_stats.get('bytes_in', 0),
+                            bytes_out,
+                            json.dumps(result.get('call_bytes', {})),
+                            api_stats.get('throttled', 0),
+                            json.dumps(result['concurrency']) if result.get('concurrency') else None,
+                            json.dumps(result['post_processing']) if result.get('post_processing') else None,
+                            # The whole dropdown list (a delta run only processes part of it)
+                            json.dumps(job.get('all_components') or job['components']),
+                        )
+                    )
+                    run_id = cursor.lastrowid
+                    connection.executemany(
+                        """INSERT INTO component_results (run_id, component, success, kind, reason, attempts,
+                               duration, phases, output_path, output_bytes, bytes_in, rows, output_paths)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        [
+                            (
+                                run_id,
+                                component,
+                                int(outcome['success']),
+                                outcome.get('kind'),
+                                outcome.get('reason'),
+                                len(attempt_history.get(component, [])),
+                                outcome.get('duration'),
+                                json.dumps(outcome.get('phases', {})),
+                                outcome.get('output_path'),
+                                outcome.get('output_bytes'),
+                                outcome.get('bytes_in'),
+                                outcome.get('rows'),
+                                json.dumps(outcome['output_paths']) if outcome.get('output_paths') else None,
+                            )
+                            for component, outcome in outcomes.items()
+                        ]
+                    )
+                return run_id
+            finally:
+                connection.close()
+    
+    def recent_runs(self, spreadsheet_id, sheet_name=None, limit=BASELINE_RUNS + 1):
+        """Most recent completed runs for a spreadsheet, newest first"""
+        with self.lock:
+            connection = self.connect()
+            try:
+                query = "SELECT * FROM runs WHERE spreadsheet_id = ? AND cancelled = 0"
+                args = [spreadsheet_id]
+                if sheet_name:
+                    query += " AND sheet_name = ?"
+                    args.append(sheet_name)
+                query += " ORDER BY id DESC LIMIT ?"
+                args.append(limit)
+                return [dict(row) for row in connection.execute(query, args)]
+            finally:
+                connection.close()
+    
+    def phase_medians(self, run_ids):
+        """Median seconds per phase over the successful components of the given runs"""
+        if not run_ids:
+            return {}
+        
+        with self.lock:
+            connection = self.connect()
+            try:
+                placeholders = ",".join("?" * len(run_ids))
+                rows = connection.execute(
+                    f"SELECT phases FROM component_results WHERE success = 1 AND run_id IN ({placeholders})",
+                    run_ids
+                ).fetchall()
+            finally:
+                connection.close()
+        
+        samples = {}
+        for row in rows:
+            for phase, seconds in json.loads(row['phases'] or "{}").items():
+                samples.setdefault(phase, []).append(seconds)
+        return {phase: statistics.median(values) for phase, values in samples.items()}
+    
+    def component_profile(self, spreadsheet_id, sheet_name=None):
+        """
+        Typical size and duration of each component over the recent runs
+        Returns: component -> dict with rows, output_bytes and duration (medians, None if unknown)
+                 and ok_last_run (succeeded in the latest run)
+        """
+        runs = self.recent_runs(spreadsheet_id, sheet_name)
+        if not runs:
+            return {}
+        
+        with self.lock:
+            connection = self.connect()
+            try:
+                placeholders = ",".join("?" * len(runs))
+                rows = connection.execute(
+                    f"""SELECT run_id, component, success, rows, output_bytes, duration FROM component_results
+                        WHERE run_id IN ({placeholders})""",
+                    [run['id'] for run in runs]
+                ).fetchall()
+            finally:
+                connection.close()
+        
+        samples = {}
+        for row in rows:
+            entry = samples.setdefault(row['component'], {'rows': [], 'output_bytes': [], 'duration': [], 'ok_last_run': False})
+            if not row['success']:
+                continue
+            if row['run_id'] == runs[0]['id']:
+                entry['ok_last_run'] = True
+            for key in ('rows', 'output_bytes', 'duration'):
+                if row[key] is not None:
+                    entry[key].append(row[key])
+        
+        median = lambda values: statistics.median(values) if values else None
+        return {
+            component: {
+                'rows': median(entry['rows']),
+                'output_bytes': median(entry['output_bytes']),
+                'duration': median(entry['duration']),
+                'ok_last_run': entry['ok_last_run'],
+            }
+            for component, entry in samples.items()
+        }
+    
+    def throughput_report(self, spreadsheet_id, sheet_name=None):
+        """
+        Compare the latest run with the rolling baseline of earlier runs
+        Returns: dict, or None if there is no run for the spreadsheet
+        """
+        runs = self.recent_runs(spreadsheet_id, sheet_name)
+        if not runs:
+            return None
+        
+        def throughput(run):
+            minutes = max(run['duration'] / 60, 1e-6)
+            return run['success_count'] / minutes
+        
+        latest = runs[0]
+        baseline_runs = runs[1:]
+        report = {
+            'latest': latest,
+            'latest_throughput': throughput(latest),
+            'baseline_runs': len(baseline_runs),
+            'baseline_throughput': None,
+            'ratio': None,
+            'regression': False,
+            'phases': {},
+        }
+        
+        if baseline_runs:
+            baseline = statistics.median(throughput(run) for run in baseline_runs)
+            report['baseline_throughput'] = baseline
+            if baseline > 0:
+                report['ratio'] = report['latest_throughput'] / baseline
+                report['regression'] = report['ratio'] < REGRESSION_THRESHOLD
+            
+            latest_phases = self.phase_medians([latest['id']])
+            baseline_phases = self.phase_medians([run['id'] for run in baseline_runs])
+            for phase, seconds in latest_phases.items():
+                report['phases'][phase] = (seconds, baseline_phases.get(phase))
+        
+        return report
+    
+    def last_options(self, spreadsheet_id, sheet_name, menu_value):
+        """
+        Latest completed run of a menu that recorded its dropdown list
+        Returns: run dict with options (list) and params (dict), or None
+        """
+        with self.lock:
+            connection = self.connect()
+            try:
+                row = connection.execute(
+                    """SELECT * FROM runs WHERE spreadsheet_id = ? AND sheet_name = ? AND menu_value IS ?
+                           AND cancelled = 0 AND options IS NOT NULL
+                       ORDER BY id DESC LIMIT 1""",
+                    (spreadsheet_id, sheet_name, menu_value)
+                ).fetchone()
+            finally:
+                connection.close()
+        if not row:
+            return None
+        run = dict(row)
+        run['options'] = json.loads(run['options'])
+        run['params'] = json.loads(run['params'] or "{}")
+        return run
+    
+    def latest_outputs(self, spreadsheet_id, sheet_name, menu_value):
+        """Output files of each component's most recent successful export for a menu"""
+        with self.lock:
+            connection = self.connect()
+            try:
+                rows = connection.execute(
+                    """SELECT r.component, r.output_paths FROM component_results r
+                       JOIN runs ON runs.id = r.run_id
+                       WHERE runs.spreadsheet_id = ? AND runs.sheet_name = ? AND runs.menu_value IS ?
+                           AND r.success = 1
+                       ORDER BY r.run_id""",
+                    (spreadsheet_id, sheet_name, menu_value)
+                ).fetchall()
+            finally:
+                connection.close()
+        
+        outputs = {}
+        for row in rows:
+            if row['output_paths']:
+                outputs[row['component']] = json.loads(row['output_paths'])
+        return outputs
+    
+    def save_fingerprint(self, scope, fingerprint, run_ids):
+        """Remember the spreadsheet state right after a fully successful run"""
+        with self.lock:
+            connection = self.connect()
+            try:
+                with connection:
+                    connection.execute(
+                        """INSERT OR REPLACE INTO fingerprints
+                               (scope, drive_version, modified_time, source_hash, run_ids, recorded_at)
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+                        (
+                            scope,
+                            fingerprint['version'],
+                            fingerprint['modified_time'],
+                            fingerprint['source_hash'],
+                            json.dumps(run_ids),
+                            datetime.now().isoformat(timespec='seconds'),
+                        )
+                    )
+            finally:
+                connection.close()
+    
+    def get_fingerprint(self, scope):
+        """Stored fingerprint for a scope, or None"""
+        with self.lock:
+            connection = self.connect()
+            try:
+                row = connection.execute("SELECT * FROM fingerprints WHERE scope = ?", (scope,)).fetchone()
+            finally:
+                connection.close()
+        if not row:
+            return None
+        fingerprint = dict(row)
+        fingerprint['run_ids'] = json.loads(fingerprint['run_ids'] or "[]")
+        return fingerprint
+    
+    def output_paths(self, run_ids):
+        """
+        Every output file of the successful components of the given runs
+        (all formats; archive members as <archive path>/<member name>)
+        """
+        if not run_ids:
+            return []
+        
+        with self.lock:
+            connection = self.connect()
+            try:
+                placeholders = ",".join("?" * len(run_ids))
+                rows = connection.execute(
+                    f"""SELECT output_paths FROM component_results
+                        WHERE success = 1 AND run_id IN ({placeholders}) AND output_paths IS NOT NULL""",
+                    run_ids
+                ).fetchall()
+            finally:
+                connection.close()
+        
+        return [path for row in rows for path in json.loads(row['output_paths'])]
+
+def format_report(report):
+    """Human-readable report lines for the log"""
+    if not report:
+        return ["No run history for this spreadsheet yet"]
+    
+    latest = report['latest']
+    lines = [
+        f"Latest run: {latest['started_at']} - {latest['success_count']}/{latest['components']} ok "
+        f"in {latest['duration'] / 60:.1f} min ({report['latest_throughput']:.1f} components/min)",
+        f"API calls: {latest['reads']} reads, {latest['writes']} writes, {latest['exports']} exports, "
+        f"{latest['bytes_in'] / 1024:.0f} KB in, {latest['bytes_out'] / 1024:.0f} KB written",
+    ]
+    if latest.get('throttled'):
+        lines.append(f"Throttled (429) responses: {latest['throttled']}")
+    if latest.get('concurrency'):
+        lines.append(describe(json.loads(latest['concurrency'])))
+    if latest.get('post_processing'):
+        lines.append(post_process.describe(json.loads(latest['post_processing'])))
+    
+    call_bytes = json.loads(latest.get('call_bytes') or "{}")
+    if call_bytes and latest['components']:
+        per_component = sum(entry['wire_bytes'] for entry in call_bytes.values()) / latest['components']
+        lines.append(f"Bytes over the wire per component: {per_component / 1024:.1f} KB")
+        for label, entry in sorted(call_bytes.items()):
+            lines.append(
+                f"  {label}: {entry['calls']} calls, {entry['wire_bytes'] / 1024:.1f} KB wire "
+                f"({entry['bytes'] / 1024:.1f} KB decoded)"
+            )
+    
+    if report['baseline_throughput'] is None:
+        lines.append("No earlier runs to compare with yet")
+        return lines
+    
+    lines.append(
+        f"Baseline ({report['baseline_runs']} runs): {report['baseline_throughput']:.1f} components/min"
+        + (f" - latest is {report['ratio'] * 100:.0f}% of baseline" if report['ratio'] is not None else "")
+    )
+    for phase, (seconds, baseline) in sorted(report['phases'].items()):
+        if baseline:
+            lines.append(f"  {phase}: {seconds:.2f}s (baseline {baseline:.2f}s)")
+    if report['regression']:
+        lines.append("⚠ Throughput regression: the latest run is much slower than usual")
+    return lines
+
+# Global instance
+run_history = RunHistory()
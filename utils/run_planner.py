@@ -0,0 +1,167 @@
+"""
+Dry-run planner for component report jobs
+Counts the reads, writes and exports a job will make, estimates wall time
+from past latency data and checks the Sheets API quota headroom.
+Nothing in the spreadsheet is changed.
+"""
+from utils.latency_model import latency_model
+from utils.export_writers import ROW_WRITERS
+from utils.grid_render import GRID_RENDERERS
+from utils.config import (
+    READ_QUOTA_PER_USER, WRITE_QUOTA_PER_USER, READ_QUOTA_PER_PROJECT
+)
+import math
+
+QUOTA_TARGET = 0.8  # Plan to stay below 80% of the quota
+
+# Fallback timings (seconds) when there is no history for the sheet
+API_ROUND_TRIP = 0.6
+PDF_EXPORT_SECONDS = 4.0
+DEFAULT_SETTLE = 2.0
+
+def estimate_component(job, sheet_key, component):
+    """
+    Estimate the calls and time needed for one component
+    Returns: dict with reads, writes, exports and seconds
+    """
+    plan = latency_model.plan(sheet_key, component, job['timeout'])
+    
+    if plan['expected'] is not None:
+        wait = max(plan['expected'], plan['initial_delay'])
+        polls = max(1, math.ceil((plan['expected'] - plan['initial_delay']) / plan['check_interval']) + 1)
+    else:
+        # Legacy behaviour: 2 s settle, then usually one poll sees the change
+        wait = DEFAULT_SETTLE
+        polls = 1
+    
+    reads = 1 + polls + 1  # initial sentinel, polls, backward scan
+    writes = 1
+    exports = 0
+    seconds = wait + (reads + writes) * API_ROUND_TRIP
+    
+    if "PDF" in job['file_formats']:
+        exports = 1
+        seconds += PDF_EXPORT_SECONDS
+    if any(fmt in ROW_WRITERS for fmt in job['file_formats']):
+        reads += 1  # one range read feeds every CSV / XLSX / JSON Lines writer
+        seconds += API_ROUND_TRIP
+    if any(fmt in GRID_RENDERERS for fmt in job['file_formats']):
+        reads += 1  # one grid-data read feeds every locally rendered format
+        seconds += API_ROUND_TRIP
+    
+    return {'reads': reads, 'writes': writes, 'exports': exports, 'seconds': seconds}
+
+def plan_job(job, spreadsheet_id, menu_count=1, accounts=1):
+    """
+    Build a dry-run plan for a job
+    Components on several spreadsheet copies (job['replicas'], also the number of
+    worker processes) run in parallel, so the time is divided between them.
+    Args:
+        menu_count: Number of menus for sweep mode (components are assumed similar per menu)
+        accounts: Service accounts in the pool (each adds its own per-user quota)
+    Returns: dict with totals, quota usage and suggestions
+    """
+    sheet_key = latency_model.sheet_key(spreadsheet_id, job['sheet_name'])
+    components = job['components']
+    
+    totals = {'reads': 0, 'writes': 0, 'exports': 0, 'seconds': 0.0}
+    known = 0
+    for component in components:
+        estimate = estimate_component(job, sheet_key, component)
+        for key in totals:
+            totals[key] += estimate[key]
+        if latency_model.expected(sheet_key, component) is not None:
+            known += 1
+    
+    # Scale to all menus, split the time between the copies and add per-run
+    # overhead (worksheet lookup, original value, restore)
+    parallel = max(1, min(job.get('replicas') or 1, len(components) * menu_count))
+    for key in totals:
+        totals[key] *= menu_count
+    totals['seconds'] /= parallel
+    totals['reads'] += 2
+    totals['writes'] += 1
+    totals['seconds'] += 3 * API_ROUND_TRIP
+    
+    component_total = len(components) * menu_count
+    minutes = max(totals['seconds'] / 60, 1 / 60)
+    read_rate = totals['reads'] / minutes
+    write_rate = totals['writes'] / minutes
+    
+    accounts = max(1, accounts)
+    read_quota = READ_QUOTA_PER_USER * accounts
+    write_quota = WRITE_QUOTA_PER_USER * accounts
+    read_budget = read_quota * QUOTA_TARGET
+    write_budget = write_quota * QUOTA_TARGET
+    per_worker = max(read_rate / parallel / read_budget, write_rate / parallel / write_budget, 1e-9)
+    suggested_workers = max(1, int(1 / per_worker))
+    
+    suggestions = []
+    if read_rate > read_budget or write_rate > write_budget:
+        pace = "Sequential pace" if parallel == 1 else f"The pace of {parallel} copies"
+        suggestions.append(
+            f"{pace} already exceeds 80% of the pooled per-user quota; expect 429 retries "
+            "or add service accounts" + (" or use fewer copies" if parallel > 1 else "")
+        )
+    elif suggested_workers > parallel:
+        suggestions.append(
+            f"Quota allows about {suggested_workers} parallel worker(s) with {accounts} service account(s)"
+        )
+    project_workers = max(1, int(READ_QUOTA_PER_PROJECT * QUOTA_TARGET / max(read_rate / parallel, 1e-9)))
+    if project_workers > suggested_workers:
+        suggestions.append(
+            f"Project quota caps parallelism at about {project_workers} worker(s) across all service accounts"
+        )
+    if known < len(components):
+        suggestions.append(
+            f"No latency history for {len(components) - known} component(s); "
+            "the estimate will improve after a run"
+        )
+    if "PDF" in job['file_formats'] and len(components) > 1:
+        suggestions.append(
+            "PDF goes through Google's rate-limited export endpoint; 'HTML (printable)' and "
+            "'Formatted Excel (XLSX)' are rendered locally from one grid read"
+        )
+    
+    return {
+        'components': component_total,
+        'menus': menu_count,
+        'reads': totals['reads'],
+        'writes': totals['writes'],
+        'exports': totals['exports'],
+        'seconds': totals['seconds'],
+        'parallel': parallel,
+        'read_rate': read_rate,
+        'write_rate': write_rate,
+        'accounts': accounts,
+        'read_headroom': 1 - read_rate / read_quota,
+        'write_headroom': 1 - write_rate / write_quota,
+        'suggested_workers': suggested_workers,
+        'history_coverage': known / len(components) if components else 0,
+        'suggestions': suggestions,
+    }
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {(seconds % 3600) // 60}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds}s"
+
+def format_plan(plan):
+    """Human-readable plan lines for the log"""
+    lines = [
+        f"Components: {plan['components']}" + (f" across {plan['menus']} menus" if plan['menus'] > 1 else ""),
+        f"Estimated duration: {format_duration(plan['seconds'])} "
+        + (f"on {plan['parallel']} copies in parallel " if plan['parallel'] > 1 else "")
+        + f"(latency history for {int(plan['history_coverage'] * 100)}% of components)",
+        f"API calls: {plan['reads']} reads, {plan['writes']} writes, {plan['exports']} PDF exports",
+        f"Read rate: {plan['read_rate']:.1f}/min of {READ_QUOTA_PER_USER * plan['accounts']}/min "
+        f"({plan['accounts']} service account(s), {int(plan['read_headroom'] * 100)}% headroom)",
+        f"Write rate: {plan['write_rate']:.1f}/min of {WRITE_QUOTA_PER_USER * plan['accounts']}/min "
+        f"({plan['accounts']} service account(s), {int(plan['write_headroom'] * 100)}% headroom)",
+    ]
+    for suggestion in plan['suggestions']:
+        lines.append(f"Suggestion: {suggestion}")
+    return lines
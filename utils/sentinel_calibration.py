@@ -0,0 +1,146 @@
+"""
+Automatic sentinel-range discovery
+Sets a few sample components, snapshots the report area once it has settled,
+and picks the smallest range that changed between every pair of samples -
+ideally a single fingerprint cell. Cells that just echo the component name are
+ignored, since they update before the rest of the report has recalculated.
+"""
+from utils.google_sheets import sheets_manager
+from utils import read_options
+import time
+
+SAMPLE_COMPONENTS = 4  # Components set during calibration
+CALIBRATION_ROWS = 30  # Report rows (from the start row) considered for the sentinel
+STABLE_READS = 2       # Identical reads in a row that count as settled
+
+def normalize(rows, width, height):
+    """Pad a ragged values response into a height x width grid of strings"""
+    grid = []
+    for r in range(height):
+        row = rows[r] if r < len(rows) else []
+        grid.append([str(row[c]) if c < len(row) and row[c] is not None else "" for c in range(width)])
+    return grid
+
+def choose_range(snapshots, echoes=()):
+    """
+    Smallest single-column block that differs between every consecutive pair of snapshots
+    Args:
+        snapshots: Grids (lists of rows) of the same size, one per sample
+        echoes: Per-snapshot component values; cells equal to them are skipped
+    Returns: (column_index, first_row_index, last_row_index), or None if nothing changes reliably
+    """
+    pairs = list(zip(snapshots, snapshots[1:]))
+    if not pairs:
+        return None
+    height = len(snapshots[0])
+    width = len(snapshots[0][0]) if height else 0
+    
+    def changes(r, c):
+        """Pairs in which a cell changed (echo cells never count)"""
+        if any(grid[r][c] and grid[r][c] == echo for grid, echo in zip(snapshots, echoes)):
+            return set()
+        return {i for i, (before, after) in enumerate(pairs) if before[r][c] != after[r][c]}
+    
+    best = None
+    for c in range(width):
+        column = [changes(r, c) for r in range(height)]
+        for first in range(height):
+            covered = set()
+            for last in range(first, height):
+                covered |= column[last]
+                if len(covered) == len(pairs):
+                    size = last - first + 1
+                    if best is None or size < best[0]:
+                        best = (size, c, first, last)
+                    break
+            if best and best[0] == 1:
+                break
+    return best[1:] if best else None
+
+class SentinelCalibration:
+    def __init__(self, job, cancel_token, log=print):
+        """
+        Args:
+            job: Job dict (dropdown cell, components, report columns and start row)
+        """
+        self.job = job
+        self.cancel_token = cancel_token
+        self.log = log
+    
+    def sample_components(self):
+        """A few components spread over the list"""
+        components = self.job['components']
+        count = min(SAMPLE_COMPONENTS, len(components))
+        if count < 2:
+            return list(components)
+        step = (len(components) - 1) / (count - 1)
+        return [components[round(i * step)] for i in range(count)]
+    
+    def snapshot(self, worksheet, area, width, height, before=None):
+        """
+        Read the area once it has settled (or the job timeout passes)
+        Args:
+            before: Previous sample; reads still equal to it are not trusted as settled
+        """
+        deadline = time.time() + self.job['timeout']
+        previous = None
+        stable = 0
+        while True:
+            rows = sheets_manager.read_range(worksheet, area, self.cancel_token, read_options.SENTINEL)
+            grid = normalize(rows, width, height)
+            stable = stable + 1 if grid == previous and grid != before else 1
+            if stable >= STABLE_READS or time.time() >= deadline:
+                return grid
+            previous = grid
+            self.cancel_token.sleep(0.5)
+    
+    def run(self):
+        """
+        Run the calibration (the component dropdown is restored afterwards)
+        Returns: dict with range, cells, samples and fingerprint, or None if nothing changed reliably
+        """
+        job = self.job
+        worksheet = sheets_manager.get_worksheet(job['sheet_name'])
+        if not worksheet:
+            raise RuntimeError("Could not access worksheet")
+        
+        start_col = job['start_col']
+        first_col = sheets_manager._col_letter_to_num(start_col)
+        width = sheets_manager._col_letter_to_num(job['end_column']) - first_col + 1
+        first_row = job['start_row']
+        last_row = min(job['max_row'], first_row + CALIBRATION_ROWS - 1)
+        height = last_row - first_row + 1
+        area = f"{start_col}{first_row}:{job['end_column']}{last_row}"
+        
+        samples = self.sample_components()
+        if len(samples) < 2:
+            raise ValueError("Calibration needs at least two components")
+        
+        original_value = sheets_manager.get_cell_value(worksheet, job['dropdown_cell'])
+        snapshots = []
+        try:
+            for value in samples:
+                self.cancel_token.check()
+                self.log(f"  Sampling '{value}'...")
+                if not sheets_manager.set_cell_value(worksheet, job['dropdown_cell'], value, self.cancel_token, settle=0):
+                    raise RuntimeError(f"Could not set {job['dropdown_cell']} to '{value}'")
+                snapshots.append(self.snapshot(worksheet, area, width, height, snapshots[-1] if snapshots else None))
+        finally:
+            if original_value:
+                self.cancel_token.wait_for_pending()
+                sheets_manager.set_cell_value(worksheet, job['dropdown_cell'], original_value, settle=0)
+        
+        block = choose_range(snapshots, echoes=samples)
+        if not block:
+            return None
+        
+        col_index, first_index, last_index = block
+        column = sheets_manager._col_num_to_letter(first_col + col_index)
+        top = first_row + first_index
+        bottom = first_row + last_index
+        return {
+            'range': f"{column}{top}" if top == bottom else f"{column}{top}:{column}{bottom}",
+            'cells': bottom - top + 1,
+            'samples': len(samples),
+            'fingerprint': top == bottom,
+        }
@@ -0,0 +1,139 @@
+"""
+Live menu watcher
+Polls the menu cell (B3) and the source range of the component dropdown
+(B6) in the background with one small batchGet and compares hashes of the
+values. The validation rule is only looked up when the watcher starts (and
+again after a failed read or every few minutes), so a poll costs a single
+read request. Polling speeds up right after a change and slows down while
+the sheet stays the same; nothing is read while a run is in progress or the
+screen is hidden.
+"""
+from utils.google_sheets import sheets_manager
+from utils import read_options
+import hashlib
+import json
+import threading
+import time
+
+MIN_INTERVAL = 3.0      # Seconds between polls right after a change
+MAX_INTERVAL = 60.0     # Seconds between polls once the sheet has been quiet for a while
+INTERVAL_GROWTH = 1.5   # Interval multiplier per unchanged poll
+RESOLVE_SECONDS = 600   # Look up the dropdown's validation rule again after this long
+
+def values_hash(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class SheetWatcher:
+    def __init__(self, sheet_name, menu_cell, dropdown_cell, on_change, is_busy=lambda: False, log=print):
+        """
+        Args:
+            on_change: Called from the watcher thread with (menu_value, component_values)
+            is_busy: Returns True while polling must wait (e.g. during a run)
+        """
+        self.sheet_name = sheet_name
+        self.menu_cell = menu_cell
+        self.dropdown_cell = dropdown_cell
+        self.on_change = on_change
+        self.is_busy = is_busy
+        self.log = log
+        self.spreadsheet_id = sheets_manager.spreadsheet_id
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.paused = False
+        self.thread = None
+        self.source_range = None
+        self.resolved_at = 0.0
+        self.menu_hash = None
+        self.source_hash = None
+        self.interval = MIN_INTERVAL
+        self.polls = 0
+        self.failing = False
+    
+    def start(self, menu_value, component_values):
+        """Start watching from the values the screen currently shows"""
+        self.reset(menu_value, component_values)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+    
+    def reset(self, menu_value, component_values):
+        """Take the shown values as the new baseline (after a load or a manual refresh)"""
+        with self.lock:
+            self.menu_hash = values_hash(menu_value)
+            self.source_hash = values_hash(component_values)
+            self.interval = MIN_INTERVAL
+    
+    def pause(self):
+        self.paused = True
+    
+    def resume(self):
+        """Resume and poll right away (the sheet may have changed while paused)"""
+        self.paused = False
+        self.interval = MIN_INTERVAL
+        self.wake_event.set()
+    
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+    
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.wake_event.wait(self.interval)
+            self.wake_event.clear()
+            if self.stop_event.is_set():
+                break
+            if self.paused or self.is_busy():
+                continue
+            self._poll()
+    
+    def _resolve_source(self):
+        """Find the dropdown's source range (the only validations read)"""
+        self.source_range = sheets_manager.find_dropdown_source(self.sheet_name, self.dropdown_cell)
+        self.resolved_at = time.time()
+        if not self.source_range:
+            raise ValueError(f"No list validation found for {self.dropdown_cell}")
+    
+    def _poll(self):
+        try:
+            if not self.source_range or time.time() - self.resolved_at > RESOLVE_SECONDS:
+                self._resolve_source()
+            
+            menu_range = f"{sheets_manager._quote_sheet_name(self.sheet_name)}!{self.menu_cell}"
+            menu_rows, source_rows = sheets_manager.batch_get_values(
+                self.spreadsheet_id, [menu_range, self.source_range], read_options.WATCH
+            )
+            self.polls += 1
+            if self.failing:
+                self.failing = False
+                self.log("Sheet watcher: reading again")
+        except Exception as e:
+            # Quota or network trouble: back off fully and look the rule up again next time
+            if not self.failing:
+                self.failing = True
+                self.log(f"Sheet watcher: could not read {self.menu_cell}/{self.dropdown_cell} ({e})")
+            self.source_range = None
+            self.interval = MAX_INTERVAL
+            return
+        
+        menu_value = menu_rows[0][0] if menu_rows and menu_rows[0] else None
+        component_values = sheets_manager.unique_values(source_rows)
+        menu_hash = values_hash(menu_value)
+        source_hash = values_hash(component_values)
+        
+        with self.lock:
+            changed = menu_hash != self.menu_hash or source_hash != self.source_hash
+            self.menu_hash = menu_hash
+            self.source_hash = source_hash
+            # Edits tend to come in bursts: poll quickly after a change, back off while quiet
+            if changed:
+                self.interval = MIN_INTERVAL
+            else:
+                self.interval = min(MAX_INTERVAL, self.interval * INTERVAL_GROWTH)
+        
+        if changed:
+            print(f"[DEBUG] Sheet watcher: change after {self.polls} polls ({len(component_values)} components)")
+            try:
+                self.on_change(menu_value, component_values)
+            except Exception as e:
+                print(f"[DEBUG] Sheet watcher callback failed: {e}")
@@ -0,0 +1,303 @@
+"""
+Local component work queue (SQLite)
+A job's components become tasks that any number of worker processes claim
+with a lease. Workers renew the leases of the tasks they hold; a task whose
+lease runs out (the worker crashed or hung) goes back to the queue for
+another worker. The database can sit on a disk shared by several machines.
+A job can carry a concurrency limit: only that many live workers (in the
+order they joined) may claim tasks, the others wait until it is raised.
+"""
+from utils.config import WORK_QUEUE_DB
+from datetime import datetime
+import json
+import sqlite3
+import time
+
+LEASE_SECONDS = 120     # A task returns to the queue if its lease is not renewed in time
+RENEW_SECONDS = 30      # Workers renew their leases this often
+STALE_SECONDS = 60      # A lease not renewed for this long probably belongs to a dead worker
+MAX_TASK_ATTEMPTS = 3   # Leases per task before it is marked failed (worker lost each time)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    job TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'running',
+    concurrency INTEGER
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    idx INTEGER NOT NULL,
+    component TEXT NOT NULL,
+    position INTEGER,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    leases INTEGER NOT NULL DEFAULT 0,
+    outcome TEXT,
+    attempts TEXT,
+    finished_at REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE TABLE IF NOT EXISTS workers (
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    worker TEXT NOT NULL,
+    api_stats TEXT,
+    call_bytes TEXT,
+    seen_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (job_id, worker)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks(job_id, state);
+"""
+
+class WorkQueue:
+    def __init__(self, path=WORK_QUEUE_DB):
+        self.path = path
+        self._initialized = False
+    
+    def connect(self):
+        # Rollback journal (not WAL) so the file also works on network shares
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        if not self._initialized:
+            connection.executescript(SCHEMA)
+            self._initialized = True
+        return connection
+    
+    def _transaction(self, func):
+        """Run func(connection) inside a write transaction taken up front"""
+        connection = self.connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(connection)
+                connection.execute("COMMIT")
+                return result
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        finally:
+            connection.close()
+    
+    def create_job(self, job, order=None):
+        """
+        Queue every component of a job
+        Args:
+            order: (index, component) list in claim order; defaults to dropdown order
+        Returns: job id
+        """
+        order = order or list(enumerate(job['components'], 1))
+        def create(connection):
+            cursor = connection.execute(
+                "INSERT INTO jobs (created_at, job) VALUES (?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), json.dumps(job))
+            )
+            job_id = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO tasks (job_id, idx, component, position) VALUES (?, ?, ?, ?)",
+                [(job_id, idx, component, position) for position, (idx, component) in enumerate(order, 1)]
+            )
+            return job_id
+        return self._transaction(create)
+    
+    def get_job(self, job_id):
+        """Job dict and state ('running', 'cancelled' or 'finished')"""
+        connection = self.connect()
+        try:
+            row = connection.execute("SELECT job, state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            connection.close()
+        if not row:
+            raise KeyError(f"No queued job {job_id}")
+        return json.loads(row['job']), row['state']
+    
+    def job_state(self, job_id):
+        connection = self.connect()
+        try:
+            row = connection.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            connection.close()
+        return row['state'] if row else None
+    
+    def set_job_state(self, job_id, state):
+        self._transaction(lambda connection: connection.execute(
+            "UPDATE jobs SET state = ? WHERE id = ?", (state, job_id)
+        ))
+    
+    def set_concurrency(self, job_id, limit):
+        """Number of workers allowed to claim tasks (None = all)"""
+        self._transaction(lambda connection: connection.execute(
+            "UPDATE jobs SET concurrency = ? WHERE id = ?", (limit, job_id)
+        ))
+    
+    def _within_limit(self, connection, job_id, worker, limit, now):
+        """Mark the worker alive and check whether it ranks inside the job's concurrency limit"""
+        connection.execute("INSERT OR IGNORE INTO workers (job_id, worker) VALUES (?, ?)", (job_id, worker))
+        connection.execute("UPDATE workers SET seen_at = ? WHERE job_id = ? AND worker = ?", (now, job_id, worker))
+        if limit is None:
+            return True
+        # Workers that stopped checking in do not hold a place
+        ahead = connection.execute(
+            """SELECT COUNT(*) AS n FROM workers
+               WHERE job_id = ? AND finished_at IS NULL AND seen_at > ?
+               AND rowid < (SELECT rowid FROM workers WHERE job_id = ? AND worker = ?)""",
+            (job_id, now - STALE_SECONDS, job_id, worker)
+        ).fetchone()['n']
+        return ahead < limit
+    
+    def claim(self, job_id, worker, lease_seconds=LEASE_SECONDS):
+        """
+        Lease the next pending (or expired) task
+        Tasks whose lease ran out MAX_TASK_ATTEMPTS times are marked failed instead.
+        Returns: (index, component), or None when nothing is left, the job is no longer
+                 running or the worker is outside the concurrency limit (see held_back)
+        """
+        def claim_next(connection):
+            job = connection.execute("SELECT state, concurrency FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not job or job['state'] != 'running':
+                return None
+            
+            now = time.time()
+            if not self._within_limit(connection, job_id, worker, job['concurrency'], now):
+                return None
+            
+            connection.execute(
+                """UPDATE tasks SET state = 'failed', finished_at = ?, outcome = ?
+                   WHERE job_id = ? AND state = 'leased' AND lease_until < ? AND leases >= ?""",
+                (now, json.dumps({'success': False, 'kind': None, 'reason': "Worker lost (lease expired)"}),
+                 job_id, now, MAX_TASK_ATTEMPTS)
+            )
+            row = connection.execute(
+                """SELECT idx, component FROM tasks
+                   WHERE job_id = ? AND (state = 'pending' OR (state = 'leased' AND lease_until < ?))
+                   ORDER BY leases, COALESCE(position, idx) LIMIT 1""",
+                (job_id, now)
+            ).fetchone()
+            if not row:
+                return None
+            
+            connection.execute(
+                """UPDATE tasks SET state = 'leased', worker = ?, lease_until = ?, leases = leases + 1
+                   WHERE job_id = ? AND idx = ?""",
+                (worker, now + lease_seconds, job_id, row['idx'])
+            )
+            return row['idx'], row['component']
+        return self._transaction(claim_next)
+    
+    def renew(self, job_id, worker, lease_seconds=LEASE_SECONDS):
+        """
+        Extend every lease a worker holds
+        Returns: Job state, so workers notice a cancelled job
+        """
+        def renew_leases(connection):
+            now = time.time()
+            connection.execute(
+                "UPDATE tasks SET lease_until = ? WHERE job_id = ? AND worker = ? AND state = 'leased'",
+                (now + lease_seconds, job_id, worker)
+            )
+            connection.execute("UPDATE workers SET seen_at = ? WHERE job_id = ? AND worker = ?", (now, job_id, worker))
+            return connection.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()['state']
+        return self._transaction(renew_leases)
+    
+    def held_back(self, job_id, worker):
+        """True if tasks are waiting but the concurrency limit keeps this worker from claiming them"""
+        def check(connection):
+            job = connection.execute("SELECT state, concurrency FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not job or job['state'] != 'running':
+                return False
+            pending = connection.execute(
+                "SELECT COUNT(*) AS n FROM tasks WHERE job_id = ? AND state = 'pending'", (job_id,)
+            ).fetchone()['n']
+            return bool(pending) and not self._within_limit(connection, job_id, worker, job['concurrency'], time.time())
+        return self._transaction(check)
+    
+    def stale_leases(self, job_id, worker):
+        """Tasks leased by other workers that stopped renewing (worth waiting for)"""
+        connection = self.connect()
+        try:
+            row = connection.execute(
+                """SELECT COUNT(*) AS n FROM tasks
+                   WHERE job_id = ? AND state = 'leased' AND worker != ? AND lease_until < ?""",
+                (job_id, worker, time.time() + LEASE_SECONDS - STALE_SECONDS)
+            ).fetchone()
+        finally:
+            connection.close()
+        return row['n']
+    
+    def complete(self, job_id, idx, worker, outcome, attempts):
+        """
+        Store a task's final outcome (ignored if the lease was lost to another worker)
+        Returns: True if the outcome was stored
+        """
+        state = 'done' if outcome['success'] else 'failed'
+        def store(connection):
+            cursor = connection.execute(
+                """UPDATE tasks SET state = ?, outcome = ?, attempts = ?, finished_at = ?
+                   WHERE job_id = ? AND idx = ? AND worker = ? AND state = 'leased'""",
+                (state, json.dumps(outcome, default=str), json.dumps(attempts, default=str),
+                 time.time(), job_id, idx, worker)
+            )
+            return cursor.rowcount == 1
+        return self._transaction(store)
+    
+    def release(self, job_id, worker):
+        """Put a worker's unfinished tasks back (e.g. on cancel)"""
+        self._transaction(lambda connection: connection.execute(
+            """UPDATE tasks SET state = 'pending', worker = NULL, lease_until = NULL
+               WHERE job_id = ? AND worker = ? AND state = 'leased'""",
+            (job_id, worker)
+        ))
+    
+    def finish_worker(self, job_id, worker, api_stats, call_bytes):
+        """Store a worker's API counters for the merged run report"""
+        self._transaction(lambda connection: connection.execute(
+            "INSERT OR REPLACE INTO workers (job_id, worker, api_stats, call_bytes, finished_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, worker, json.dumps(api_stats), json.dumps(call_bytes), time.time())
+        ))
+    
+    def counts(self, job_id):
+        """Tasks per state, e.g. {'pending': 3, 'leased': 2, 'done': 10}"""
+        connection = self.connect()
+        try:
+            rows = connection.execute(
+                "SELECT state, COUNT(*) AS n FROM tasks WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall()
+        finally:
+            connection.close()
+        return {row['state']: row['n'] for row in rows}
+    
+    def finished_since(self, job_id, since):
+        """Tasks finished after a time, oldest first (for live progress)"""
+        connection = self.connect()
+        try:
+            rows = connection.execute(
+                """SELECT idx, component, state, worker, outcome, finished_at FROM tasks
+                   WHERE job_id = ? AND finished_at > ? ORDER BY finished_at""",
+                (job_id, since)
+            ).fetchall()
+        finally:
+            connection.close()
+        return [dict(row, outcome=json.loads(row['outcome'])) for row in rows]
+    
+    def results(self, job_id):
+        """
+        Everything needed for the merged run report
+        Returns: (tasks, workers) as lists of dicts with decoded JSON fields
+        """
+        connection = self.connect()
+        try:
+            tasks = connection.execute(
+                "SELECT * FROM tasks WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+            workers = connection.execute(
+                "SELECT * FROM workers WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        finally:
+            connection.close()
+        
+        decode = lambda value: json.loads(value) if value else None
+        tasks = [dict(row, outcome=decode(row['outcome']), attempts=decode(row['attempts'])) for row in tasks]
+        workers = [dict(row, api_stats=decode(row['api_stats']), call_bytes=decode(row['call_bytes'])) for row in workers]
+        return tasks, workers